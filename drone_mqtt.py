@@ -10,15 +10,97 @@ import os
 import datetime
 import uuid
 from util.timing_logger import TimingLogger
+from util.timing_log import format_stages
+from util.binary_timing_log import BinaryTimingLog, binary_log_path
+from util.timing_log_rotation import RotatingTimingLogHandler, segment_dir
+from util.timing_sampling import SamplingPolicy, TIMED_KEY, is_timed, sampling_spec
+from util.command_tracker import AckCache, make_ack, ACK_OK, ACK_IGNORED, ACK_ERROR, ACK_FAILED
+from util.mavlink_commands import MavlinkCommandTracker, command_ack, mode_reached, mission_ack
+from util.vehicle_state import VehicleState
+from util.mavlink_streams import required_streams, request_streams, LinkStats, format_stats
+from util.mavlink_ingest import BatchReader, native_parser_available
+from util.telemetry_spool import TelemetrySpool, SpoolFlusher
+from util.payload_crypto import PayloadCipher, PayloadAuthError, load_master_key, ALGORITHMS, DEFAULT_KEY_FILE
+from util.command_auth import CommandVerifier, CommandAuthError, command_key
+from util.publish_tracker import PublishTracker, format_histogram
+from util.mission_upload import MissionUpload, parse_waypoints, format_upload
+from util.perf_profile import PerformanceProfile
 
 # Parse command-line arguments
 parser = argparse.ArgumentParser(description='Drone MQTT bridge')
 parser.add_argument('--no-tls', action='store_true', help='Disable TLS encryption')
 parser.add_argument('--test-time-encryption', action='store_true', help='Run automated test for encryption timing analysis')
+parser.add_argument('--rotate-timing-log', action='store_true', help='Write the timing log as per-process, size/time rotated and compressed segments')
+parser.add_argument('--timing-sample', type=sampling_spec, help='Timing sampling policy: all (default), ratio:N, rate:R (per second per type) or commands:N')
+parser.add_argument('--telemetry', default='position,attitude,battery', help='Comma-separated telemetry types to publish, only their MAVLink messages are requested')
+parser.add_argument('--stream-all', action='store_true', help='Legacy stream request (MAV_DATA_STREAM_ALL at 4 Hz), to compare the MAVLink link load')
+parser.add_argument('--no-spool', action='store_true', help='Drop telemetry while the broker is unreachable instead of spooling it to disk')
+parser.add_argument('--spool-max-mb', type=float, default=64, help='Size cap of the telemetry spool, the oldest messages are dropped beyond it')
+parser.add_argument('--spool-flush-rate', type=float, help='Messages per second replayed from the spool after a reconnect (default 200)')
+parser.add_argument('--aead', choices=list(ALGORITHMS), help='Seal telemetry, acks and commands with an AEAD cipher on top of (or instead of) TLS')
+parser.add_argument('--command-auth', action='store_true', help='Only execute commands signed by the ground station (HMAC and replay window)')
+parser.add_argument('--aead-key', default=DEFAULT_KEY_FILE, help='Pre-shared key file of --aead and --command-auth (python -m util.payload_crypto creates one)')
+parser.add_argument('--binary-timing-log', action='store_true', help='Write SEND/RECV timing events to a fixed-width binary log instead of the text log')
+parser.add_argument('--legacy-telemetry-topic', action='store_true', help='Also publish every telemetry frame on drone/telemetry, for subscribers of the single topic')
+parser.add_argument('--profile', help='Performance profile file (JSON or YAML): rates, QoS, encoding, sampling, buffer sizes, broker settings')
 args = parser.parse_args()
 
+# Tunable settings: built-in defaults, overridden by --profile, then by the flags given, then changed live on drone/control
+PROFILE_FLAGS = {'timing_sample': '--timing-sample', 'spool_flush_rate': '--spool-flush-rate'}
+try:
+    profile = PerformanceProfile.load(args.profile) if args.profile else PerformanceProfile()
+except (OSError, ValueError) as e:
+    parser.error(f"--profile: {e}")
+for setting, flag in PROFILE_FLAGS.items():
+    if getattr(args, setting) is not None:
+        try:
+            profile.update({setting: getattr(args, setting)}, live=False)
+        except ValueError as e:
+            parser.error(f"{flag}: {e}")
+
 # rate limit for telemetry messages (in seconds)
-RATE_LIMIT = 0.5
+RATE_LIMIT = profile['rate_limit']
+# The flight controller streams at the publish rate, tolerate its jitter when rate limiting
+RATE_LIMIT_JITTER = 0.05
+
+# Published telemetry types: MAVLink source message and the rate it is requested at (Hz)
+TELEMETRY_STREAMS = {
+    'position': ('GLOBAL_POSITION_INT', 1.0 / RATE_LIMIT),
+    'attitude': ('ATTITUDE', 1.0 / RATE_LIMIT),
+    'battery': ('BATTERY_STATUS', 1.0),
+}
+# Messages the bridge consumes itself (vehicle state mirror); HEARTBEAT is always sent
+INTERNAL_STREAMS = {'SYS_STATUS': 1.0}
+TELEMETRY_TYPES = [t for t in args.telemetry.split(',') if t]
+for telemetry_type in TELEMETRY_TYPES:
+    if telemetry_type not in TELEMETRY_STREAMS:
+        parser.error(f"Unknown telemetry type: {telemetry_type} (choose from {', '.join(TELEMETRY_STREAMS)})")
+# Built-in rates; position and attitude follow RATE_LIMIT unless the profile sets stream_rates
+BASE_STREAMS = dict(TELEMETRY_STREAMS)
+RATE_LIMITED_STREAMS = ('position', 'attitude')
+
+def configure_streams():
+    """Rate of each telemetry type: stream_rates, else one frame per RATE_LIMIT, else the built-in rate"""
+    for telemetry_type, (name, hz) in BASE_STREAMS.items():
+        if telemetry_type in profile['stream_rates']:
+            hz = profile['stream_rates'][telemetry_type]
+        elif telemetry_type in RATE_LIMITED_STREAMS:
+            hz = 1.0 / RATE_LIMIT
+        TELEMETRY_STREAMS[telemetry_type] = (name, hz)
+
+unknown_streams = set(profile['stream_rates']) - set(TELEMETRY_STREAMS)
+if unknown_streams:
+    parser.error(f"--profile: stream_rates: unknown telemetry types {', '.join(sorted(unknown_streams))}")
+configure_streams()
+PUBLISHED_MESSAGES = {TELEMETRY_STREAMS[t][0] for t in TELEMETRY_TYPES}
+# QoS of the live telemetry and ack publishes
+TELEMETRY_QOS = profile['telemetry_qos']
+ACK_QOS = profile['ack_qos']
+# The backlog is only removed from the spool once the broker acknowledged it (PUBACK)
+BACKLOG_QOS = 1
+# json.dumps separators: None is the default encoding, compact drops the spaces
+JSON_SEPARATORS = (',', ':') if profile['encoding'] == 'compact' else None
+STREAM_ALL = args.stream_all
 
 # Create logs directory if it doesn't exist
 LOG_DIR = "logs"
@@ -46,14 +128,42 @@ timing_logger.propagate = False  # Prevent propagation to root logger
 timing_logger.handlers.clear()
 
 # Add file handler for timing log
-timing_file_handler = logging.FileHandler(timing_log_filename)
+if args.rotate_timing_log:
+    # One writer per process: segments go to logs/mqtt_timing_<date>_<tls>/drone.<seq>.log[.gz]
+    timing_file_handler = RotatingTimingLogHandler(segment_dir(timing_log_filename), "drone")
+else:
+    timing_file_handler = logging.FileHandler(timing_log_filename)
 timing_formatter = logging.Formatter('%(asctime)s - %(message)s')
 timing_file_handler.setFormatter(timing_formatter)
 timing_logger.addHandler(timing_file_handler)
 
+# Optional binary log for SEND/RECV events (one file per process)
+binary_timing_log = BinaryTimingLog(binary_log_path(timing_log_filename, "drone")) if args.binary_timing_log else None
+
+def log_timing_event(kind, message_id, message_type, timestamp):
+    """Record a SEND/RECV timing event in the binary log if enabled, otherwise in the text log"""
+    if binary_timing_log:
+        binary_timing_log.record(kind, "DRONE", message_type, message_id, timestamp)
+    else:
+        verb = "sent" if kind == "SEND" else "received"
+        timing_logger.info(f"DRONE-{kind}: Message ID {message_id} type {message_type} {verb} at {timestamp:.6f}")
+
 # Dictionary to store message send times
 message_times = {}
 
+def log_publish_histograms(histograms):
+    for kind, histogram in histograms.items():
+        timing_logger.info(format_histogram("DRONE", kind, histogram))
+
+def log_published(kind, message_id, message_type, latency_ms):
+    timing_logger.info(f"DRONE-PUBLISHED: Message ID {message_id} type {message_type} {kind} left paho after {latency_ms:.3f}ms")
+
+# publish() -> on_publish latency (paho's local queueing at QoS 0), per message kind
+publish_tracker = PublishTracker(on_report=log_publish_histograms, on_complete=log_published)
+
+# Which messages get timing instrumentation
+timing_sampling = SamplingPolicy.parse(profile['timing_sample'])
+
 # Add global flags for termination control
 first_command_executed = False
 should_terminate = False
@@ -65,20 +175,60 @@ logger.info(f"TLS encryption: {'Enabled' if USE_TLS else 'Disabled'}")
 if TEST_TIME_ENCRYPTION:
     logger.info("Test time encryption mode: Enabled")
 timing_logger.info(f"Drone MQTT started - TLS: {'Enabled' if USE_TLS else 'Disabled'} - Test: {'Enabled' if TEST_TIME_ENCRYPTION else 'Disabled'}")
+if timing_sampling.enabled:
+    timing_logger.info(f"Drone timing sampling: {timing_sampling}")
+
+# Application-layer AEAD, end to end between the drone and the ground station
+payload_cipher = PayloadCipher.for_drone(load_master_key(args.aead_key), args.aead) if args.aead else None
+if payload_cipher:
+    logger.info(f"Payload AEAD: {args.aead}")
+    timing_logger.info(f"Drone payload AEAD: {args.aead}")
+# Command signatures checked before anything is parsed
+command_verifier = CommandVerifier(command_key(load_master_key(args.aead_key))) if args.command_auth else None
+if command_verifier:
+    logger.info("Command authentication: Enabled")
 
 # MQTT Configuration
-BROKER = "localhost"
-PORT_TLS = 8883
-PORT_NO_TLS = 1883  # Standard MQTT port without TLS
+BROKER = profile['broker']
+PORT_TLS = profile['port_tls']
+PORT_NO_TLS = profile['port']  # Standard MQTT port without TLS
 PORT = PORT_TLS if USE_TLS else PORT_NO_TLS
+KEEPALIVE = profile['keepalive']
 TOPIC_TELEMETRY = "drone/telemetry"
+# One topic per telemetry type (drone/telemetry/<type>) so subscribers filter at the broker
+TELEMETRY_TOPICS = {telemetry_type: f"{TOPIC_TELEMETRY}/{telemetry_type}" for telemetry_type in TELEMETRY_STREAMS}
+# Mirror of every frame on the single legacy topic
+LEGACY_TELEMETRY_TOPIC = args.legacy_telemetry_topic
 TOPIC_COMMAND = "drone/command"
-CERT_CA = "/etc/mosquitto/ca_certificates/ca.crt"
-CERT_FILE = "/etc/mosquitto/certs/client.crt"
-KEY_FILE = "/etc/mosquitto/certs/client.key"
+TOPIC_ACK = "drone/ack"
+# Telemetry replayed from the spool after an outage, kept apart from the live stream
+TOPIC_TELEMETRY_BACKLOG = "drone/backlog/telemetry"
+# Live performance profile changes, acknowledged on their own topic
+TOPIC_CONTROL = "drone/control"
+TOPIC_CONTROL_ACK = "drone/control/ack"
+CERT_CA = profile['cert_ca']
+CERT_FILE = profile['cert_file']
+KEY_FILE = profile['key_file']
+
+# Bounded queue inside paho: beyond it publish() fails and the frame goes to the spool
+MAX_QUEUED_MESSAGES = profile['max_queued_messages']
+# Telemetry published while the broker is unreachable, replayed when it is back
+SPOOL_DIR = "spool"
+telemetry_spool = None if args.no_spool else TelemetrySpool(SPOOL_DIR, max_bytes=int(args.spool_max_mb * 1024 * 1024))
+spool_flusher = None
 
 # MAVLink connection
 connection = None
+# pymavlink's C parser when it is installed (MAVLink 1 only, pymavlink falls back to Python otherwise)
+USE_NATIVE_PARSER = native_parser_available()
+# Commands waiting for the vehicle's confirmation, resolved by the telemetry loop
+mavlink_commands = MavlinkCommandTracker()
+# Flight mode, armed flag and health mirrored from HEARTBEAT/SYS_STATUS, to skip no-op transitions
+vehicle_state = VehicleState()
+# Seconds to wait for each takeoff/mode/goto step to be confirmed
+MAVLINK_STEP_TIMEOUT = 3.0
+GUIDED_MODE = 4
+AUTO_MODE = 3
 
 def connect_to_vehicle():
     """Establish connection to the drone"""
@@ -91,13 +241,14 @@ def connect_to_vehicle():
     
     while retry_count < max_retries:
         try:
-            connection = mavutil.mavlink_connection('tcp:127.0.0.1:5762')
-            logger.info("MAVLink connection established")
+            connection = mavutil.mavlink_connection('tcp:127.0.0.1:5762', use_native=USE_NATIVE_PARSER)
+            logger.info(f"MAVLink connection established ({'native' if USE_NATIVE_PARSER else 'Python'} parser)")
             
             # Wait for heartbeat to ensure connection is valid
             logger.info("Waiting for heartbeat...")
             connection.wait_heartbeat()
             logger.info(f"Connected to system: {connection.target_system} component: {connection.target_component}")
+            vehicle_state.target_system = connection.target_system
             return True
         except Exception as e:
             retry_count += 1
@@ -108,11 +259,20 @@ def connect_to_vehicle():
     return False
 
 def request_data_streams():
-    """Request all needed data streams from the drone"""
+    """Request only the MAVLink messages that are published or used by the bridge, at the rate they are needed"""
     if not connection:
         logger.error("Cannot request data streams - no connection")
         return
-        
+    if STREAM_ALL:
+        request_all_data_streams()
+        return
+    
+    rates = required_streams(TELEMETRY_TYPES, TELEMETRY_STREAMS, INTERNAL_STREAMS)
+    request_streams(connection, rates)
+    logger.info("Requested " + ", ".join(f"{name} at {hz:g}Hz" for name, hz in rates.items()) + ", other streams stopped")
+
+def request_all_data_streams():
+    """Legacy request: three message intervals plus every data stream at 4 Hz"""
     # Request position data using the SET_MESSAGE_INTERVAL command
     connection.mav.command_long_send(
         connection.target_system,
@@ -164,20 +324,98 @@ def on_connect(client, userdata, flags, rc):
     if rc == 0:
         logger.info("Connected to MQTT broker")
         client.subscribe(TOPIC_COMMAND)
-        logger.info(f"Subscribed to {TOPIC_COMMAND}")
+        client.subscribe(TOPIC_CONTROL)
+        logger.info(f"Subscribed to {TOPIC_COMMAND} and {TOPIC_CONTROL}")
     else:
         logger.error(f"Failed to connect to MQTT broker, return code {rc}")
 
+# Recent acks by message ID, a retransmitted command is answered without executing it twice
+ack_cache = AckCache()
+
+def encode_json(data):
+    return json.dumps(data, separators=JSON_SEPARATORS)
+
+def seal_payload(payload):
+    """Encoded JSON payload as published: sealed with --aead, unchanged otherwise"""
+    return payload_cipher.seal(payload.encode()) if payload_cipher else payload
+
+def open_payload(payload):
+    """Received payload bytes to JSON bytes, PayloadAuthError if a sealed payload does not authenticate"""
+    return payload_cipher.open(payload) if payload_cipher else payload
+
+def send_ack(client, message_id, status, reason=None):
+    """Publish the compact ack of a command to the ground station"""
+    if not message_id:
+        return
+    ack = make_ack(message_id, status, time.time(), reason)
+    ack_cache.put(message_id, ack)
+    payload = seal_payload(encode_json(ack))
+    publish_start = time.perf_counter()
+    publish_tracker.track(client.publish(TOPIC_ACK, payload, qos=ACK_QOS), 'ack', publish_start)
+
+def confirm_step(pending, timeout=MAVLINK_STEP_TIMEOUT):
+    """Wait until the vehicle confirmed (or refused) a step, log the outcome and return it"""
+    ok = pending.wait(timeout)
+    elapsed_ms = pending.elapsed * 1000
+    if ok:
+        logger.info(f"{pending.name} confirmed in {elapsed_ms:.0f}ms")
+    else:
+        logger.error(f"{pending.name} failed: {pending.detail}")
+    timing_logger.info(f"DRONE-MAVCMD: {pending.name} {'confirmed' if ok else 'failed'} ({pending.detail}) in {elapsed_ms:.2f}ms")
+    return pending
+
+def set_mode(mode_id):
+    name = f"mode {mode_id}"
+    if vehicle_state.in_mode(mode_id):
+        return confirm_step(mavlink_commands.resolved(name, "already active"))
+    pending = mavlink_commands.expect(name, mode_reached(mode_id, connection.target_system))
+    connection.mav.set_mode_send(
+        connection.target_system,
+        mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
+        mode_id
+    )
+    step = confirm_step(pending)
+    if step.ok:
+        vehicle_state.assume(custom_mode=mode_id)
+    return step
+
+def set_armed(arm):
+    name = "arm" if arm else "disarm"
+    if vehicle_state.is_armed(bool(arm)):
+        return confirm_step(mavlink_commands.resolved(name, f"already {name}ed"))
+    step = send_command_long(mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM, name,
+                             arm, 0, 0, 0, 0, 0, 0)
+    if step.ok:
+        vehicle_state.assume(armed=bool(arm))
+    return step
+
+def send_command_long(command_id, name, *params):
+    """COMMAND_LONG with the 7 params, confirmed by its COMMAND_ACK"""
+    pending = mavlink_commands.expect(name, command_ack(command_id, connection.target_system))
+    connection.mav.command_long_send(
+        connection.target_system,
+        connection.target_component,
+        command_id,
+        0,
+        *params
+    )
+    return confirm_step(pending)
+
 def on_command(client, userdata, msg):
     """Handle commands received from ground station via MQTT"""
     global first_command_executed, should_terminate, TEST_TIME_ENCRYPTION
     
+    message_id = None
     try:
         # Record receive time immediately
         receive_time = time.time()
         
         logger.info(f"Received command: {msg.payload}")
-        command = json.loads(msg.payload.decode())
+        body = open_payload(msg.payload)
+        if command_verifier:
+            body = command_verifier.verify(body)
+        command = json.loads(body)
+        decode_done = time.time()
         
         # Check for test termination command
         if command.get('command') == '--test-time-encryption':
@@ -190,8 +428,16 @@ def on_command(client, userdata, msg):
                 logger.info("Test termination command received but no previous command executed yet. Ignoring...")
                 return
         
-        # Extract message ID for timing if present
+        # Extract message ID for timing if present, and whether the sender sampled it for timing
         message_id = command.get('message_id')
+        timed = bool(message_id) and is_timed(command)
+        
+        # Retransmission of a command already handled: repeat the ack only
+        cached_ack = ack_cache.get(message_id) if message_id else None
+        if cached_ack:
+            logger.info(f"Duplicate command {message_id}, re-sending ack")
+            client.publish(TOPIC_ACK, seal_payload(encode_json(cached_ack)), qos=ACK_QOS)
+            return
         
         # Try to determine message type
         message_type = "unknown"
@@ -201,6 +447,8 @@ def on_command(client, userdata, msg):
             message_type = "velocity"
         elif 'position' in command:
             message_type = "position"
+        elif 'mission' in command:
+            message_type = "mission"
         elif 'rc_override' in command:
             message_type = "rc_override"
         elif 'takeoff_alt' in command:
@@ -208,19 +456,22 @@ def on_command(client, userdata, msg):
         elif 'arm' in command:
             message_type = "arm"
         
-        # Log receive time if message has ID
-        if message_id:
-            timing_logger.info(f"DRONE-RECV: Message ID {message_id} type {message_type} received at {receive_time:.6f}")
+        # Log receive time if message is timed
+        if timed:
+            log_timing_event("RECV", message_id, message_type, receive_time)
             
             # Process start time
             process_start = time.time()
         
         if not connection:
             logger.error("Cannot process command - no MAVLink connection")
+            send_ack(client, message_id, ACK_IGNORED)
             return
         
         # Mark that we've executed our first command (before processing any actual commands)
         command_executed = False
+        # Reason the vehicle refused or did not confirm a step, reported in the ack
+        failure = None
         
         # RC override command
         if 'rc_override' in command:
@@ -246,76 +497,55 @@ def on_command(client, userdata, msg):
                 'LAND': 9
             }
             
-            if isinstance(mode, str) and mode in mode_mapping:
-                # Set mode by name
-                connection.mav.set_mode_send(
-                    connection.target_system,
-                    mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
-                    mode_mapping.get(mode, 0)
-                )
-                logger.info(f"Setting flight mode to {mode}")
-            else:
+            mode_id = mode_mapping.get(mode) if isinstance(mode, str) else None
+            if mode_id is None:
                 # Try direct mode number
                 try:
                     mode_id = int(mode)
-                    connection.mav.set_mode_send(
-                        connection.target_system,
-                        mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
-                        mode_id
-                    )
-                    logger.info(f"Setting flight mode to ID {mode_id}")
                 except ValueError:
                     logger.error(f"Unknown flight mode: {mode}")
-            command_executed = True
+                    failure = f"unknown flight mode {mode}"
+            if mode_id is not None:
+                logger.info(f"Setting flight mode to {mode}")
+                step = set_mode(mode_id)
+                if step.ok:
+                    command_executed = True
+                else:
+                    failure = f"{step.name}: {step.detail}"
         
         # Arm/disarm command
-        if 'arm' in command:
+        if 'arm' in command and not failure:
             arm = int(bool(command['arm']))
-            connection.mav.command_long_send(
-                connection.target_system,
-                connection.target_component,
-                mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM,
-                0,
-                arm, 0, 0, 0, 0, 0, 0
-            )
             logger.info(f"{'Arming' if arm else 'Disarming'} vehicle")
-            command_executed = True
+            step = set_armed(arm)
+            if step.ok:
+                command_executed = True
+            else:
+                failure = f"{step.name}: {step.detail}"
         
-        # Takeoff command
-        if 'takeoff_alt' in command:
+        # Takeoff command: each step starts as soon as the vehicle confirmed the previous one
+        if 'takeoff_alt' in command and not failure:
             alt = float(command['takeoff_alt'])
             # First make sure we're in GUIDED mode
-            connection.mav.set_mode_send(
-                connection.target_system,
-                connection.target_component,
-                mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
-                4  # GUIDED mode
-            )
-            time.sleep(1)  # Give time for mode change
+            step = set_mode(GUIDED_MODE)
             
             # Then arm if needed
-            connection.mav.command_long_send(
-                connection.target_system,
-                connection.target_component,
-                mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM,
-                0,
-                1, 0, 0, 0, 0, 0, 0  # 1 = arm
-            )
-            time.sleep(1)  # Give time for arming
+            if step.ok:
+                step = set_armed(1)
             
             # Then takeoff
-            connection.mav.command_long_send(
-                connection.target_system,
-                connection.target_component,
-                mavutil.mavlink.MAV_CMD_NAV_TAKEOFF,
-                0,
-                0, 0, 0, 0, 0, 0, alt
-            )
-            logger.info(f"Takeoff command sent - target altitude: {alt}m")
-            command_executed = True
+            if step.ok:
+                step = send_command_long(mavutil.mavlink.MAV_CMD_NAV_TAKEOFF, "takeoff",
+                                         0, 0, 0, 0, 0, 0, alt)
+            
+            if step.ok:
+                logger.info(f"Takeoff command sent - target altitude: {alt}m")
+                command_executed = True
+            else:
+                failure = f"{step.name}: {step.detail}"
         
         # Position command (new format with position object)
-        if 'position' in command:
+        if 'position' in command and not failure:
             pos = command['position']
             if all(k in pos for k in ['lat', 'lon', 'alt']):
                 lat = float(pos['lat'])
@@ -323,15 +553,47 @@ def on_command(client, userdata, msg):
                 alt = float(pos['alt'])
                 
                 # First switch to GUIDED mode
-                connection.mav.set_mode_send(
-                    connection.target_system,
-                    connection.target_component,
-                    mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
-                    4  # GUIDED mode
-                )
-                time.sleep(0.5)
+                step = set_mode(GUIDED_MODE)
+                if step.ok:
+                    step = mavlink_commands.expect("waypoint", mission_ack(connection.target_system))
+                    # MISSION_ITEM_INT only: one item, one MISSION_ACK (and better precision)
+                    connection.mav.mission_item_int_send(
+                        connection.target_system,
+                        connection.target_component,
+                        0,   # seq
+                        0,   # frame
+                        mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
+                        2,   # current (2 means guided mode)
+                        0,   # autocontinue
+                        0,   # param1: hold time
+                        0,   # param2: accept radius
+                        0,   # param3: pass radius
+                        0,   # param4: yaw
+                        int(lat * 1e7),  # param5: lat (scaled to int)
+                        int(lon * 1e7),  # param6: lon (scaled to int)
+                        alt   # param7: alt
+                    )
+                    confirm_step(step)
                 
-                # Send waypoint using mission_item command
+                if step.ok:
+                    logger.info(f"Sent position command: lat={lat}, lon={lon}, alt={alt}")
+                    command_executed = True
+                else:
+                    failure = f"{step.name}: {step.detail}"
+            else:
+                logger.error("Incomplete position data in command")
+                failure = "incomplete position data"
+        
+        # Go to location command (old format, lat, lon, alt at top level)
+        elif all(k in command for k in ['lat', 'lon', 'alt']) and not failure:
+            lat = float(command['lat'])
+            lon = float(command['lon']) 
+            alt = float(command['alt'])
+            
+            step = set_mode(GUIDED_MODE)
+            if step.ok:
+                # Send waypoint
+                step = mavlink_commands.expect("waypoint", mission_ack(connection.target_system))
                 connection.mav.mission_item_send(
                     connection.target_system,
                     connection.target_component,
@@ -348,63 +610,34 @@ def on_command(client, userdata, msg):
                     lon, # param6: lon
                     alt  # param7: alt
                 )
-                
-                # Alternative method using MISSION_ITEM_INT for better precision
-                connection.mav.mission_item_int_send(
-                    connection.target_system,
-                    connection.target_component,
-                    0,   # seq
-                    0,   # frame
-                    mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
-                    2,   # current
-                    0,   # autocontinue
-                    0,   # param1: hold time
-                    0,   # param2: accept radius
-                    0,   # param3: pass radius
-                    0,   # param4: yaw
-                    int(lat * 1e7),  # param5: lat (scaled to int)
-                    int(lon * 1e7),  # param6: lon (scaled to int)
-                    alt   # param7: alt
-                )
-                
-                logger.info(f"Sent position command: lat={lat}, lon={lon}, alt={alt}")
+                confirm_step(step)
+            
+            if step.ok:
+                logger.info(f"Sent waypoint command: lat={lat}, lon={lon}, alt={alt}")
                 command_executed = True
             else:
-                logger.error("Incomplete position data in command")
+                failure = f"{step.name}: {step.detail}"
         
-        # Go to location command (old format, lat, lon, alt at top level)
-        elif all(k in command for k in ['lat', 'lon', 'alt']):
-            lat = float(command['lat'])
-            lon = float(command['lon']) 
-            alt = float(command['alt'])
-            
-            connection.mav.set_mode_send(
-                connection.target_system,
-                connection.target_component,
-                mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED,
-                4  # GUIDED mode
-            )
-            time.sleep(0.5)
-            
-            # Send waypoint
-            connection.mav.mission_item_send(
-                connection.target_system,
-                connection.target_component,
-                0,   # seq
-                0,   # frame
-                mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
-                2,   # current (2 means guided mode)
-                0,   # autocontinue
-                0,   # param1: hold time
-                0,   # param2: accept radius
-                0,   # param3: pass radius
-                0,   # param4: yaw
-                lat, # param5: lat
-                lon, # param6: lon
-                alt  # param7: alt
-            )
-            logger.info(f"Sent waypoint command: lat={lat}, lon={lon}, alt={alt}")
-            command_executed = True
+        # Mission command: the whole route in one upload, optionally started in AUTO
+        if 'mission' in command and not failure:
+            try:
+                waypoints = parse_waypoints(command['mission'])
+            except (TypeError, ValueError) as e:
+                logger.error(f"Invalid mission: {e}")
+                failure = str(e)
+            else:
+                upload = MissionUpload(connection, waypoints)
+                step = mavlink_commands.expect("mission upload", upload.match)
+                upload.start()
+                confirm_step(step, timeout=upload.timeout)
+                timing_logger.info(format_upload(upload.stats(), step.ok))
+                if step.ok and command.get('start'):
+                    step = set_mode(AUTO_MODE)
+                if step.ok:
+                    logger.info(f"Uploaded mission with {len(waypoints)} waypoints")
+                    command_executed = True
+                else:
+                    failure = f"{step.name}: {step.detail}"
         
         # Velocity command
         if 'velocity' in command:
@@ -428,16 +661,29 @@ def on_command(client, userdata, msg):
             logger.info(f"Sent velocity command: vx={vx}, vy={vy}, vz={vz}")
             command_executed = True
         
+        if failure:
+            send_ack(client, message_id, ACK_FAILED, failure)
+        else:
+            send_ack(client, message_id, ACK_OK if command_executed else ACK_IGNORED)
+        
         # Update first command flag if any command was executed
         if command_executed:
             first_command_executed = True
             
-        # Log execution completion and timing if message has ID
-        if message_id:
+        # Log execution completion and timing if message is timed
+        if timed:
             execute_time = time.time()
             processing_time_ms = (execute_time - process_start) * 1000
-            transit_time_ms = (receive_time - message_times.get(message_id, receive_time)) * 1000 if message_id in message_times else 0
-            total_time_ms = (execute_time - message_times.get(message_id, receive_time)) * 1000 if message_id in message_times else processing_time_ms
+            # The ground station stamps its send time in the command, message_times only holds our own telemetry IDs
+            sent_at = command.get('sent_at')
+            transit_time_ms = (receive_time - sent_at) * 1000 if sent_at else 0
+            total_time_ms = (execute_time - sent_at) * 1000 if sent_at else processing_time_ms
+            
+            timing_logger.info(format_stages("DRONE", message_id, message_type, {
+                'recv': receive_time,
+                'decode_done': decode_done,
+                'handler_done': execute_time
+            }))
             
             timing_logger.info(f"DRONE-EXEC: Message ID {message_id} type {message_type} executed - "
                             f"Transit: {transit_time_ms:.2f}ms, Processing: {processing_time_ms:.2f}ms, "
@@ -452,8 +698,93 @@ def on_command(client, userdata, msg):
             
     except json.JSONDecodeError:
         logger.error("Invalid JSON in command payload")
+    except PayloadAuthError as e:
+        logger.error(f"Rejected command: {e}")
+    except CommandAuthError as e:
+        logger.error(f"Rejected command: {e}")
+        timing_logger.info(f"DRONE-AUTH: rejected command ({e}), {command_verifier.rejected} rejected so far")
     except Exception as e:
         logger.error(f"Error processing command: {str(e)}")
+        send_ack(client, message_id, ACK_ERROR)
+
+# Handlers of the live profile settings, run by profile.update() in the MQTT thread
+def apply_rate_limit(value):
+    global RATE_LIMIT
+    RATE_LIMIT = value
+    configure_streams()
+    request_data_streams()
+
+def apply_stream_rates(rates):
+    configure_streams()
+    request_data_streams()
+
+def apply_telemetry_qos(value):
+    global TELEMETRY_QOS
+    TELEMETRY_QOS = value
+
+def apply_ack_qos(value):
+    global ACK_QOS
+    ACK_QOS = value
+
+def apply_encoding(value):
+    global JSON_SEPARATORS
+    JSON_SEPARATORS = (',', ':') if value == 'compact' else None
+
+def apply_timing_sample(value):
+    global timing_sampling
+    timing_sampling = SamplingPolicy.parse(value)
+    timing_logger.info(f"Drone timing sampling: {timing_sampling}")
+
+def apply_spool_flush():
+    if spool_flusher:
+        spool_flusher.batch_size = profile['spool_flush_batch']
+        spool_flusher.interval = profile['spool_flush_batch'] / profile['spool_flush_rate']
+
+def apply_batch_reader():
+    if batch_reader:
+        batch_reader.read_chunk = profile['mavlink_read_chunk']
+        batch_reader.max_batch_bytes = profile['mavlink_max_batch_bytes']
+
+profile.on_change('rate_limit', apply_rate_limit)
+profile.on_change('stream_rates', apply_stream_rates)
+profile.on_change('telemetry_qos', apply_telemetry_qos)
+profile.on_change('ack_qos', apply_ack_qos)
+profile.on_change('encoding', apply_encoding)
+profile.on_change('timing_sample', apply_timing_sample)
+profile.on_change('max_queued_messages', lambda value: mqtt_client.max_queued_messages_set(value))
+profile.on_change('spool_flush_rate', lambda value: apply_spool_flush())
+profile.on_change('spool_flush_batch', lambda value: apply_spool_flush())
+profile.on_change('mavlink_read_chunk', lambda value: apply_batch_reader())
+profile.on_change('mavlink_max_batch_bytes', lambda value: apply_batch_reader())
+
+def on_control(client, userdata, msg):
+    """Live profile change (drone/control): validated, applied, answered with the resulting live settings"""
+    message_id = None
+    try:
+        body = open_payload(msg.payload)
+        if command_verifier:
+            body = command_verifier.verify(body)
+        request = json.loads(body)
+        message_id = request.get('message_id')
+        changes = request.get('profile')
+        rates = changes.get('stream_rates') if isinstance(changes, dict) else None
+        unknown = sorted(set(rates) - set(TELEMETRY_STREAMS)) if isinstance(rates, dict) else []
+        if unknown:
+            raise ValueError(f"stream_rates: unknown telemetry types {', '.join(unknown)}")
+        changed = profile.update(changes)
+        ack = make_ack(message_id, ACK_OK if changed else ACK_IGNORED, time.time())
+        logger.info(f"Performance profile updated: {changed or 'no change'}")
+        timing_logger.info(f"DRONE-PROFILE: applied {json.dumps(changed)}")
+    except (PayloadAuthError, CommandAuthError) as e:
+        logger.error(f"Rejected profile change: {e}")
+        return
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.error(f"Invalid profile change: {e}")
+        timing_logger.info(f"DRONE-PROFILE: rejected ({e})")
+        ack = make_ack(message_id, ACK_ERROR, time.time(), str(e))
+    if message_id:
+        ack['profile'] = profile.live_values()
+        client.publish(TOPIC_CONTROL_ACK, seal_payload(encode_json(ack)), qos=ACK_QOS)
 
 def setup_mqtt():
     """Set up MQTT client with optional TLS security"""
@@ -461,6 +792,9 @@ def setup_mqtt():
         client = mqtt.Client()
         client.on_connect = on_connect
         client.on_message = on_command
+        client.message_callback_add(TOPIC_CONTROL, on_control)
+        client.on_publish = publish_tracker.on_publish
+        client.max_queued_messages_set(MAX_QUEUED_MESSAGES)
         
         if USE_TLS:
             logger.info("Configuring MQTT with TLS security")
@@ -473,20 +807,155 @@ def setup_mqtt():
         else:
             logger.info("Configuring MQTT without TLS security")
         
-        client.connect(BROKER, PORT, 60)
+        client.connect(BROKER, PORT, KEEPALIVE)
         client.loop_start()
         return client
     except Exception as e:
         logger.error(f"MQTT setup failed: {e}")
         return None
 
+def publish_telemetry(message_type, fields, mavlink_recv_time):
+    """Encode and publish one telemetry message, with timing instrumentation if it is sampled"""
+    # Add message ID for timing tracking
+    message_id = str(uuid.uuid4())
+    timed = timing_sampling.should_time(message_id, message_type)
+    send_time = time.time()
+    
+    data = {
+        'type': message_type,
+        'timestamp': int(send_time * 1000),
+        'message_id': message_id
+    }
+    if timing_sampling.enabled:
+        data[TIMED_KEY] = int(timed)
+    data.update(fields)
+    payload = encode_json(data)
+    sealed = seal_payload(payload)
+    encode_done = time.time()
+    
+    if not mqtt_client.is_connected():
+        # Broker unreachable: keep the frame for the backlog replay, it is not timed
+        if telemetry_spool:
+            telemetry_spool.append(payload)
+        return
+    
+    if timed:
+        message_times[message_id] = send_time
+        # Log send timing info
+        log_timing_event("SEND", message_id, message_type, send_time)
+    
+    publish_start = time.perf_counter()
+    info = mqtt_client.publish(TELEMETRY_TOPICS[message_type], sealed, qos=TELEMETRY_QOS)
+    publish_tracker.track(info, 'telemetry', publish_start, message_id if timed else None, message_type)
+    if LEGACY_TELEMETRY_TOPIC:
+        mqtt_client.publish(TOPIC_TELEMETRY, sealed, qos=TELEMETRY_QOS)
+    if info.rc != mqtt.MQTT_ERR_SUCCESS and telemetry_spool:
+        # Connection lost meanwhile or paho queue full
+        telemetry_spool.append(payload)
+    
+    if timed:
+        timing_logger.info(format_stages("DRONE", message_id, message_type, {
+            'mavlink_recv': mavlink_recv_time,
+            'encode_done': encode_done,
+            'publish_done': time.time()
+        }))
+
+def publish_backlog(payload, on_delivered):
+    """Replay one spooled frame, False if paho did not take it; on_delivered() runs on the PUBACK"""
+    publish_start = time.perf_counter()
+    info = mqtt_client.publish(TOPIC_TELEMETRY_BACKLOG, seal_payload(payload), qos=BACKLOG_QOS)
+    publish_tracker.track(info, 'backlog', publish_start, on_delivered=on_delivered)
+    return info.rc == mqtt.MQTT_ERR_SUCCESS
+
+# MAVLink bytes/s, messages/s and decode CPU, logged as DRONE-LINK
+link_stats = LinkStats()
+# Time of the last publish per MAVLink message type, for rate limiting
+last_publish_time = {}
+
+def rate_limited(msg_type):
+    """True if a message of this type was published less than RATE_LIMIT ago"""
+    current_time = time.time()
+    if current_time - last_publish_time.get(msg_type, 0) < RATE_LIMIT - RATE_LIMIT_JITTER:
+        return True
+    last_publish_time[msg_type] = current_time
+    return False
+
+def handle_mavlink_message(msg, mavlink_recv_time):
+    """Update the vehicle state and pending commands, then publish the message if it is telemetry"""
+    # Mirror the vehicle state, then resolve the commands waiting for this COMMAND_ACK/HEARTBEAT/MISSION_ACK
+    if vehicle_state.update(msg):
+        logger.info("Vehicle heartbeat resumed, requesting data streams again")
+        request_data_streams()
+    mavlink_commands.feed(msg, mavlink_recv_time)
+    
+    # Skip heartbeats and every message that is not published
+    msg_type = msg.get_type()
+    if msg_type not in PUBLISHED_MESSAGES:
+        return
+    
+    # Rate limit to avoid flooding MQTT
+    if rate_limited(msg_type):
+        return
+    
+    # Process GLOBAL_POSITION_INT messages
+    if msg_type == 'GLOBAL_POSITION_INT':
+        # Extract position data
+        lat = msg.lat / 1e7  # Convert to degrees
+        lon = msg.lon / 1e7
+        alt = msg.alt / 1000.0  # Convert to meters
+        relative_alt = msg.relative_alt / 1000.0
+        
+        publish_telemetry('position', {
+            'lat': lat,
+            'lon': lon,
+            'alt': alt,
+            'relative_alt': relative_alt,
+            'heading': msg.hdg / 100.0,  # Convert to degrees
+            'vx': msg.vx / 100.0,  # Convert to m/s
+            'vy': msg.vy / 100.0,
+            'vz': msg.vz / 100.0
+        }, mavlink_recv_time)
+        logger.debug(f"Published position: lat={lat:.6f}, lon={lon:.6f}, alt={alt:.1f}m")
+        
+    # Process ATTITUDE messages
+    elif msg_type == 'ATTITUDE':
+        # Convert radians to degrees
+        roll = msg.roll * 57.2958
+        pitch = msg.pitch * 57.2958
+        yaw = msg.yaw * 57.2958
+        
+        publish_telemetry('attitude', {
+            'roll': roll,
+            'pitch': pitch,
+            'yaw': yaw,
+            'rollspeed': msg.rollspeed,
+            'pitchspeed': msg.pitchspeed,
+            'yawspeed': msg.yawspeed
+        }, mavlink_recv_time)
+        logger.debug(f"Published attitude: roll={roll:.1f}, pitch={pitch:.1f}, yaw={yaw:.1f}")
+        
+    # Process BATTERY_STATUS messages
+    elif msg_type == 'BATTERY_STATUS':
+        # Extract battery data
+        battery_remaining = msg.battery_remaining  # Percentage 0-100
+        voltage = msg.voltages[0] / 1000.0 if msg.voltages and msg.voltages[0] != 65535 else 0.0  # Convert mV to V
+        current = msg.current_battery / 100.0 if msg.current_battery != -1 else 0.0  # Convert cA to A
+        
+        publish_telemetry('battery', {
+            'battery_remaining': battery_remaining,
+            'voltage': voltage,
+            'current': current,
+            'battery_id': msg.id
+        }, mavlink_recv_time)
+        logger.debug(f"Published battery: {battery_remaining}%, {voltage:.1f}V, {current:.1f}A")
+
+# Reader of the MAVLink link, rebuilt on reconnection
+batch_reader = None
+
 def telemetry_loop():
     """Main loop for receiving MAVLink messages and publishing telemetry"""
-    global connection, should_terminate
+    global connection, should_terminate, batch_reader
     
-    last_pos_time = 0
-    last_attitude_time = 0
-    last_battery_time = 0  # Aggiunto per rate limiting della batteria
     
     while not should_terminate:
         try:
@@ -497,132 +966,29 @@ def telemetry_loop():
                 else:
                     time.sleep(5)
                     continue
+            if batch_reader is None or batch_reader.connection is not connection:
+                batch_reader = BatchReader(connection, read_chunk=profile['mavlink_read_chunk'],
+                                           max_batch_bytes=profile['mavlink_max_batch_bytes'])
             
-            # Receive MAVLink message with timeout
-            msg = connection.recv_match(blocking=True, timeout=1.0)
-            if not msg:
-                continue
-                
-            # Check for termination flag
-            if should_terminate:
-                break
-                
-            # Skip heartbeats and other common messages to reduce log noise
-            if msg.get_type() == 'HEARTBEAT':
+            # Read every buffered MAVLink message at once, counting the CPU spent reading and decoding them
+            cpu_start = time.thread_time()
+            batch = batch_reader.read_batch(timeout=1.0)
+            link_stats.record_batch(batch, time.thread_time() - cpu_start)
+            if link_stats.due():
+                timing_logger.info(format_stats("all" if STREAM_ALL else "demand", link_stats.report()))
+            if not batch:
                 continue
-                
-            # Debug info for position messages
-            if ('POSITION' in msg.get_type()) or ('GLOBAL' in msg.get_type()):
-                logger.debug(f"Received position message: {msg.get_type()}")
-                
-            # Process GLOBAL_POSITION_INT messages
-            if msg.get_type() == 'GLOBAL_POSITION_INT':
-                # Rate limit to avoid flooding MQTT
-                current_time = time.time()
-                if current_time - last_pos_time < RATE_LIMIT:
-                    continue
-                last_pos_time = current_time
-                
-                # Extract position data
-                lat = msg.lat / 1e7  # Convert to degrees
-                lon = msg.lon / 1e7
-                alt = msg.alt / 1000.0  # Convert to meters
-                relative_alt = msg.relative_alt / 1000.0
-                
-                # Add message ID for timing tracking
-                message_id = str(uuid.uuid4())
-                send_time = time.time()
-                message_times[message_id] = send_time
-                
-                payload = json.dumps({
-                    'type': 'position',
-                    'timestamp': int(time.time() * 1000),
-                    'message_id': message_id,
-                    'lat': lat,
-                    'lon': lon,
-                    'alt': alt,
-                    'relative_alt': relative_alt,
-                    'heading': msg.hdg / 100.0,  # Convert to degrees
-                    'vx': msg.vx / 100.0,  # Convert to m/s
-                    'vy': msg.vy / 100.0,
-                    'vz': msg.vz / 100.0
-                })
-                
-                # Log send timing info
-                timing_logger.info(f"DRONE-SEND: Message ID {message_id} type position sent at {send_time:.6f}")
-                
-                mqtt_client.publish(TOPIC_TELEMETRY, payload)
-                logger.debug(f"Published position: lat={lat:.6f}, lon={lon:.6f}, alt={alt:.1f}m")
-                
-            # Process ATTITUDE messages
-            elif msg.get_type() == 'ATTITUDE':
-                # Rate limit
-                current_time = time.time()
-                if current_time - last_attitude_time < RATE_LIMIT:
-                    continue
-                last_attitude_time = current_time
-                
-                # Convert radians to degrees
-                roll = msg.roll * 57.2958
-                pitch = msg.pitch * 57.2958
-                yaw = msg.yaw * 57.2958
-                
-                # Add message ID for timing tracking
-                message_id = str(uuid.uuid4())
-                send_time = time.time()
-                message_times[message_id] = send_time
-                
-                payload = json.dumps({
-                    'type': 'attitude',
-                    'timestamp': int(time.time() * 1000),
-                    'message_id': message_id,
-                    'roll': roll,
-                    'pitch': pitch,
-                    'yaw': yaw,
-                    'rollspeed': msg.rollspeed,
-                    'pitchspeed': msg.pitchspeed,
-                    'yawspeed': msg.yawspeed
-                })
-                
-                # Log send timing info
-                timing_logger.info(f"DRONE-SEND: Message ID {message_id} type attitude sent at {send_time:.6f}")
-                
-                mqtt_client.publish(TOPIC_TELEMETRY, payload)
-                logger.debug(f"Published attitude: roll={roll:.1f}, pitch={pitch:.1f}, yaw={yaw:.1f}")
-                
-            # Process BATTERY_STATUS messages
-            elif msg.get_type() == 'BATTERY_STATUS':
-                # Rate limit - battery info ogni 2 secondi
-                current_time = time.time()
-                if current_time - last_battery_time < RATE_LIMIT:
-                    continue
-                last_battery_time = current_time
-                
-                # Extract battery data
-                battery_remaining = msg.battery_remaining  # Percentage 0-100
-                voltage = msg.voltages[0] / 1000.0 if msg.voltages and msg.voltages[0] != 65535 else 0.0  # Convert mV to V
-                current = msg.current_battery / 100.0 if msg.current_battery != -1 else 0.0  # Convert cA to A
-                
-                # Add message ID for timing tracking
-                message_id = str(uuid.uuid4())
-                send_time = time.time()
-                message_times[message_id] = send_time
-                
-                payload = json.dumps({
-                    'type': 'battery',
-                    'timestamp': int(time.time() * 1000),
-                    'message_id': message_id,
-                    'battery_remaining': battery_remaining,
-                    'voltage': voltage,
-                    'current': current,
-                    'battery_id': msg.id
-                })
-                
-                # Log send timing info
-                timing_logger.info(f"DRONE-SEND: Message ID {message_id} type battery sent at {send_time:.6f}")
-                
-                mqtt_client.publish(TOPIC_TELEMETRY, payload)
-                logger.debug(f"Published battery: {battery_remaining}%, {voltage:.1f}V, {current:.1f}A")
+            mavlink_recv_time = time.time()
+            
+            for msg in batch:
+                # Check for termination flag
+                if should_terminate:
+                    break
+                try:
+                    handle_mavlink_message(msg, mavlink_recv_time)
+                except Exception as e:
+                    # One bad message must not drop the rest of the batch (e.g. a COMMAND_ACK)
+                    logger.error(f"Error handling {msg.get_type()}: {str(e)}")
                 
         except KeyboardInterrupt:
             logger.info("Telemetry loop stopped by user")
@@ -646,6 +1012,17 @@ if __name__ == "__main__":
             # Request data streams from vehicle
             request_data_streams()
             
+            if telemetry_spool:
+                # Replay what was spooled (also by a previous run) in rate-limited batches on its own topic
+                spool_flusher = SpoolFlusher(
+                    telemetry_spool,
+                    publish_backlog,
+                    mqtt_client.is_connected,
+                    rate=profile['spool_flush_rate'],
+                    batch_size=profile['spool_flush_batch']
+                )
+                spool_flusher.start()
+            
             # Start telemetry loop
             try:
                 telemetry_loop()
@@ -653,6 +1030,10 @@ if __name__ == "__main__":
                 logger.info("Program terminated by user")
             finally:
                 # Clean shutdown
+                if spool_flusher:
+                    spool_flusher.stop()
+                if telemetry_spool:
+                    telemetry_spool.close()
                 if mqtt_client:
                     mqtt_client.loop_stop()
                     mqtt_client.disconnect()
@@ -7,17 +7,54 @@ import termios
 import tty
 import logging
 import random
+import math
 import time
 import argparse
 import os
 from datetime import datetime
 import uuid
+import copy
+from util.timing_log import format_stages
+from util.telemetry_history import TelemetryHistory
+from util.timing_sampling import SamplingPolicy, TIMED_KEY, is_timed, sampling_spec
+from util.status_screen import StatusScreen
+from util.workload import load_workload, WorkloadScheduler, format_report
+from util.binary_timing_log import BinaryTimingLog, binary_log_path
+from util.timing_log_rotation import RotatingTimingLogHandler, segment_dir
+from util.command_tracker import CommandTracker, ACK_OK, ACK_ERROR
+from util import stress
+from util.flight_recorder import FlightRecorder, session_dir, safe_name
+from util.payload_crypto import PayloadCipher, load_master_key, ALGORITHMS, DEFAULT_KEY_FILE
+from util.command_auth import CommandSigner, command_key
+from util.publish_tracker import PublishTracker, format_histogram
+from util.perf_profile import SETTINGS as PROFILE_SETTINGS
+from util.mission_upload import upload_timeout
 
 # Parse command-line arguments
 parser = argparse.ArgumentParser(description='Ground station MQTT client')
 parser.add_argument('--no-tls', action='store_true', help='Disable TLS encryption')
 parser.add_argument('--automated', action='store_true', help='Run in automated mode')
 parser.add_argument('--test-time-encryption', action='store_true', help='Run automated test for encryption timing analysis')
+parser.add_argument('--rotate-timing-log', action='store_true', help='Write the timing log as per-process, size/time rotated and compressed segments')
+parser.add_argument('--stress', action='store_true', help='Ramp zero-velocity setpoints up to --stress-max-rate and report where command latency explodes')
+parser.add_argument('--stress-start-rate', type=float, default=stress.DEFAULT_START_RATE, help='First stress level (Hz)')
+parser.add_argument('--stress-max-rate', type=float, default=stress.DEFAULT_MAX_RATE, help='Last stress level (Hz)')
+parser.add_argument('--stress-growth', type=float, default=stress.DEFAULT_GROWTH, help='Rate multiplier between stress levels')
+parser.add_argument('--stress-level-duration', type=float, default=stress.DEFAULT_LEVEL_DURATION, help='Seconds spent at each stress level')
+parser.add_argument('--workload', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'workloads', 'default.json'),
+                    help='Workload file (JSON/YAML) executed in automated mode')
+parser.add_argument('--status-fps', type=float, default=4.0, help='Refresh rate of the status screen (0 for the legacy single status line)')
+parser.add_argument('--timing-sample', type=sampling_spec, default='all', help='Timing sampling policy: all, ratio:N, rate:R (per second per type) or commands:N')
+parser.add_argument('--ack-timeout', type=float, default=0.5, help='Seconds to wait for a command ack before retransmitting it')
+parser.add_argument('--ack-retries', type=int, default=2, help='Retransmissions of an unacknowledged command before it is reported as failed')
+parser.add_argument('--no-record', action='store_true', help='Do not record telemetry to recordings/<session>/')
+parser.add_argument('--aead', choices=list(ALGORITHMS), help='Seal commands and open telemetry/acks with an AEAD cipher on top of (or instead of) TLS')
+parser.add_argument('--command-auth', action='store_true', help='Sign every command (HMAC and sequence number), for a drone started with --command-auth')
+parser.add_argument('--aead-key', default=DEFAULT_KEY_FILE, help='Pre-shared key file of --aead and --command-auth (python -m util.payload_crypto creates one)')
+parser.add_argument('--binary-timing-log', action='store_true', help='Write SEND/RECV timing events to a fixed-width binary log instead of the text log')
+parser.add_argument('--telemetry', default='position,attitude,battery', help='Comma-separated telemetry types to subscribe to (drone/telemetry/<type>)')
+parser.add_argument('--legacy-telemetry-topic', action='store_true', help='Subscribe to the single drone/telemetry topic, for a drone started with --legacy-telemetry-topic')
+parser.add_argument('--drone-profile', help='Profile file (JSON) whose live settings are sent to the running drone bridge at startup')
 args = parser.parse_args()
 
 # Create logs directory if it doesn't exist
@@ -42,23 +79,83 @@ timing_logger.propagate = False  # Prevent propagation to root logger
 timing_logger.handlers.clear()
 
 # Add file handler for timing log
-timing_file_handler = logging.FileHandler(timing_log_filename)
+if args.rotate_timing_log:
+    # One writer per process: segments go to logs/mqtt_timing_<date>_<tls>/gs.<seq>.log[.gz]
+    timing_file_handler = RotatingTimingLogHandler(segment_dir(timing_log_filename), "gs")
+else:
+    timing_file_handler = logging.FileHandler(timing_log_filename)
 timing_formatter = logging.Formatter('%(asctime)s - %(message)s')
 timing_file_handler.setFormatter(timing_formatter)
 timing_logger.addHandler(timing_file_handler)
 
+# Optional binary log for SEND/RECV events (one file per process)
+binary_timing_log = BinaryTimingLog(binary_log_path(timing_log_filename, "gs")) if args.binary_timing_log else None
+
+def log_timing_event(kind, message_id, message_type, timestamp):
+    """Record a SEND/RECV timing event in the binary log if enabled, otherwise in the text log"""
+    if binary_timing_log:
+        binary_timing_log.record(kind, "GS", message_type, message_id, timestamp)
+    else:
+        verb = "sent" if kind == "SEND" else "received"
+        timing_logger.info(f"GS-{kind}: Message ID {message_id} type {message_type} {verb} at {timestamp:.6f}")
+
 # Dictionary to store message send times
 message_times = {}
 
+def log_publish_histograms(histograms):
+    for kind, histogram in histograms.items():
+        timing_logger.info(format_histogram("GS", kind, histogram))
+
+def log_published(kind, message_id, message_type, latency_ms):
+    timing_logger.info(f"GS-PUBLISHED: Message ID {message_id} type {message_type} {kind} left paho after {latency_ms:.3f}ms")
+
+# publish() -> on_publish latency (paho's local queueing at QoS 0), per message kind
+publish_tracker = PublishTracker(on_report=log_publish_histograms, on_complete=log_published)
+
+# Which messages get timing instrumentation
+timing_sampling = SamplingPolicy.parse(args.timing_sample)
+
 # TLS Configuration - can be disabled via command-line
 USE_TLS = not args.no_tls
 AUTOMATED_MODE = args.automated or args.test_time_encryption
+WORKLOAD_FILE = args.workload
 TEST_TIME_ENCRYPTION = args.test_time_encryption
+STRESS_MODE = args.stress
+# Set during a stress run, acks of stress commands go to it instead of the command tracker
+stress_recorder = None
 logging.info(f"TLS encryption: {'Enabled' if USE_TLS else 'Disabled'}")
 logging.info(f"Automated mode: {'Enabled' if AUTOMATED_MODE else 'Disabled'}")
 if TEST_TIME_ENCRYPTION:
     logging.info("Test time encryption mode: Enabled")
 timing_logger.info(f"Ground Station started - TLS: {'Enabled' if USE_TLS else 'Disabled'} - Automated: {'Enabled' if AUTOMATED_MODE else 'Disabled'} - Test: {'Enabled' if TEST_TIME_ENCRYPTION else 'Disabled'}")
+if timing_sampling.enabled:
+    timing_logger.info(f"Ground Station timing sampling: {timing_sampling}")
+
+# Application-layer AEAD, end to end between the ground station and the drone
+payload_cipher = PayloadCipher.for_ground_station(load_master_key(args.aead_key), args.aead) if args.aead else None
+if payload_cipher:
+    logging.info(f"Payload AEAD: {args.aead}")
+    timing_logger.info(f"Ground Station payload AEAD: {args.aead}")
+
+def seal_payload(payload):
+    """Encoded JSON payload as published: sealed with --aead, unchanged otherwise"""
+    return payload_cipher.seal(payload.encode()) if payload_cipher else payload
+
+# Command signatures, checked by the drone before it parses the command
+command_signer = CommandSigner(command_key(load_master_key(args.aead_key))) if args.command_auth else None
+if command_signer:
+    logging.info("Command authentication: Enabled")
+
+def encode_command(body):
+    """JSON command as published: signed with --command-auth (a new sequence number each time), then sealed with --aead"""
+    if not command_signer:
+        return seal_payload(body)
+    signed = command_signer.sign(body.encode())
+    return payload_cipher.seal(signed) if payload_cipher else signed
+
+def open_payload(payload):
+    """Received payload bytes to JSON bytes, PayloadAuthError if a sealed payload does not authenticate"""
+    return payload_cipher.open(payload) if payload_cipher else payload
 
 # MQTT parameters
 BROKER = "127.0.0.1"
@@ -66,16 +163,42 @@ PORT_TLS = 8883
 PORT_NO_TLS = 1883  # Standard MQTT port without TLS
 PORT = PORT_TLS if USE_TLS else PORT_NO_TLS
 TOPIC_TELEMETRY = "drone/telemetry"
+# Telemetry types the drone publishes, each on drone/telemetry/<type>
+TELEMETRY_TYPES = ('position', 'attitude', 'battery')
+SUBSCRIBED_TYPES = [t for t in args.telemetry.split(',') if t]
+for telemetry_type in SUBSCRIBED_TYPES:
+    if telemetry_type not in TELEMETRY_TYPES:
+        parser.error(f"Unknown telemetry type: {telemetry_type} (choose from {', '.join(TELEMETRY_TYPES)})")
+# Only the streams we use: the broker does not forward (and we do not decode) the others
+TELEMETRY_TOPICS = [TOPIC_TELEMETRY] if args.legacy_telemetry_topic else [f"{TOPIC_TELEMETRY}/{t}" for t in SUBSCRIBED_TYPES]
 TOPIC_COMMAND = "drone/command"
+TOPIC_ACK = "drone/ack"
+# Telemetry the drone spooled during a broker outage, replayed after reconnecting
+TOPIC_TELEMETRY_BACKLOG = "drone/backlog/telemetry"
+# Live performance profile changes for the drone bridge, and its answers
+TOPIC_CONTROL = "drone/control"
+TOPIC_CONTROL_ACK = "drone/control/ack"
+LIVE_PROFILE_SETTINGS = {name for name, (_, _, live) in PROFILE_SETTINGS.items() if live}
 CERT_CA = "/etc/mosquitto/ca_certificates/ca.crt"
 CERT_FILE = "/etc/mosquitto/certs/client.crt"
 KEY_FILE = "/etc/mosquitto/certs/client.key"
 
+# Command acknowledgement deadlines (seconds); mode, arm, takeoff and goto are acked once the vehicle confirmed each step
+ACK_TIMEOUT = args.ack_timeout
+SLOW_ACK_TIMEOUT = 10.0
+SLOW_COMMAND_KEYS = ('mode', 'arm', 'takeoff_alt', 'position', 'lat', 'mission')
+
 # Parameters for random positions
 MAX_DISTANCE = 50  # meters
 MIN_ALTITUDE = 10   # meters
 MAX_ALTITUDE = 30   # meters
 
+# Survey mission (V key): a lawnmower grid of rows x columns waypoints from the current position
+SURVEY_ROWS = 10
+SURVEY_COLUMNS = 10
+SURVEY_SPACING = 10.0  # meters
+SURVEY_ALTITUDE = 20.0  # meters
+
 # Global variable to store current drone altitude
 current_altitude = 0.0
 relative_altitude = 0.0
@@ -83,108 +206,129 @@ relative_altitude = 0.0
 battery_remaining = 100  # Percentage
 battery_voltage = 0.0    # Volts
 battery_current = 0.0    # Amperes
+# Bounded per-vehicle history of every telemetry field (for rates and window stats)
+DEFAULT_VEHICLE_ID = "drone"
+telemetry_history = TelemetryHistory()
+CLIMB_RATE_WINDOW = 2.0        # seconds
+BATTERY_DRAIN_WINDOW = 60.0    # seconds
+LINK_STATS_WINDOW = 5.0        # seconds
+COMMAND_RTT_WINDOW = 60.0      # seconds
+# Status screen: one header row plus one row per vehicle
+MAX_STATUS_VEHICLES = 4
+STATUS_ROWS = 1 + MAX_STATUS_VEHICLES
+# Columnar recording of every telemetry message (live and backlog) for post-flight analysis
+flight_recorder = None if args.no_record else FlightRecorder(session_dir(USE_TLS))
+# Backlog messages received, progress is logged every BACKLOG_LOG_EVERY
+backlog_received = 0
+BACKLOG_LOG_EVERY = 500
 # Flag to track vertical movement
 vertical_movement = False
 # Flag to control altitude monitoring thread
 altitude_monitoring = False
 
 def automated_sequence(client):
-    global vertical_movement, altitude_monitoring, current_altitude, relative_altitude
-    logging.info("Starting automated sequence...")
-    meter_per_second = 5.0
-    
-    # Wait 2 minutes (120 seconds)
-    logging.info("Waiting 1 minutes before starting sequence...")
-    time.sleep(60)
-    
-    # Press C 1 times (move down)
-    logging.info("Executing C command (GUIDED mode)")
-    cmd = {'mode': 'GUIDED', 'takeoff_alt': 10}
-    vertical_movement = True
-    send_command(client, cmd, f"mode_{cmd['mode']}")
-    
-    # Wait 10 seconds
-    logging.info("Waiting 30 seconds...")
-    time.sleep(30)
-
-    # Press Q 2 times (move down)
-    logging.info("Executing Q command 2 times (move down)")
-    for i in range(2):
-        cmd = {'velocity': {"vx": 0.0, "vy": 0.0, "vz": -meter_per_second/2}}
-        vertical_movement = True
-        send_command(client, cmd, "velocity_down")
-        logging.info(f"Q command {i+1}/2 - Moving down from altitude - absolute: {current_altitude:.1f}m, relative: {relative_altitude:.1f}m")
-        time.sleep(1)  # Small delay between commands
-    
-    # Wait 10 seconds
-    logging.info("Waiting 10 seconds...")
-    time.sleep(10)
-    
-    # Press W 10 times (move forward)
-    logging.info("Executing W command 10 times (move forward)")
-    for i in range(10):
-        cmd = {'velocity': {"vx": meter_per_second, "vy": 0.0, "vz": 0.0}}
-        send_command(client, cmd, "velocity_forward")
-        logging.info(f"W command {i+1}/10")
-        time.sleep(1)
-    
-    # Wait 10 seconds
-    logging.info("Waiting 10 seconds...")
-    time.sleep(10)
+    global vertical_movement, altitude_monitoring
+    logging.info(f"Starting automated sequence from {WORKLOAD_FILE}...")
+    workload = load_workload(WORKLOAD_FILE)
     
-    # Press D 10 times (move right)
-    logging.info("Executing D command 10 times (move right)")
-    for i in range(10):
-        cmd = {'velocity': {"vx": 0.0, "vy": meter_per_second, "vz": 0.0}}
-        send_command(client, cmd, "velocity_right")
-        logging.info(f"D command {i+1}/10")
-        time.sleep(1)
+    def execute(step, index):
+        global vertical_movement
+        if index == 0 and 'log' in step:
+            logging.info(step['log'])
+        if 'vertical_movement' in step:
+            vertical_movement = step['vertical_movement']
+        if 'profile' in step:
+            send_profile(client, step['profile'])
+            return
+        # send_command adds message_id/sent_at, never mutate the workload itself
+        cmd = copy.deepcopy(step['command'])
+        send_command(client, cmd, step.get('type', 'unknown'))
+        if step.get('repeat', 1) > 1:
+            logging.info(f"{step.get('type', 'command')} {index + 1}/{step['repeat']} - altitude absolute: {current_altitude:.1f}m, relative: {relative_altitude:.1f}m")
     
-    # Wait 10 seconds
-    logging.info("Waiting 10 seconds...")
-    time.sleep(10)
+    report = WorkloadScheduler().run(workload, execute)
+    logging.info(f"Scheduler jitter: {format_report(report)}")
+    timing_logger.info(f"GS-SCHEDULER: Workload {workload.get('name', WORKLOAD_FILE)} - {format_report(report)}")
     
-    # Press S (move backward)
-    logging.info("Executing S command (move backward)")
-    cmd = {'velocity': {"vx": -meter_per_second, "vy": 0.0, "vz": 0.0}}
-    send_command(client, cmd, "velocity_backward")
+    # Terminate program
+    logging.info("Automated sequence completed. Terminating program...")
+    altitude_monitoring = False
+    client.loop_stop()
+    sys.exit(0)
     
-    # Wait 10 seconds
-    logging.info("Waiting 10 seconds...")
-    time.sleep(10)
+def stress_sequence(client):
+    global stress_recorder, altitude_monitoring
+    rates = stress.ramp_rates(args.stress_start_rate, args.stress_max_rate, args.stress_growth)
+    logging.info(f"Starting command stress: {', '.join(f'{r:g}' for r in rates)} Hz, {args.stress_level_duration:g}s per level")
+    stress_recorder = stress.StressRecorder(rates)
     
-    # Press W 25 times (move forward)
-    logging.info("Executing W command 25 times (move forward)")
-    for i in range(25):
-        cmd = {'velocity': {"vx": meter_per_second, "vy": 0.0, "vz": 0.0}}
-        send_command(client, cmd, "velocity_forward")
-        logging.info(f"W command {i+1}/25")
-        time.sleep(1)
+    def execute(step, index):
+        if index == 0:
+            logging.info(f"Stress level {step['level'] + 1}/{len(rates)}: {step['rate']:g} Hz")
+        cmd = copy.deepcopy(step['command'])
+        # Not tracked for retransmission, a late resend would only add load to the level being measured
+        send_command(client, cmd, step['type'], track=False,
+                     before_publish=lambda message_id, sent_at: stress_recorder.sent(message_id, step['level'], sent_at))
     
-    # Press space (stop)
-    logging.info("Executing SPACE command (stop)")
-    cmd = {'velocity': {"vx": 0.0, "vy": 0.0, "vz": 0.0}}
-    vertical_movement = False
-    send_command(client, cmd, "velocity_stop")
+    report = WorkloadScheduler().run(stress.build_workload(rates, args.stress_level_duration), execute)
+    timing_logger.info(f"GS-SCHEDULER: Stress ramp - {format_report(report)}")
+    time.sleep(stress.ACK_GRACE)
     
-    # Terminate program
-    logging.info("Automated sequence completed. Terminating program...")
+    results = stress_recorder.results()
+    for level in results:
+        logging.info(stress.format_level(level))
+        timing_logger.info(f"GS-STRESS: {stress.format_level(level)}, TLS: {USE_TLS}")
+    knee = stress.find_knee(results)
+    knee_text = f"{results[knee]['target_rate']:g}Hz" if knee is not None else f"not reached up to {rates[-1]:g}Hz"
+    logging.info(f"Knee: {knee_text}")
+    timing_logger.info(f"GS-STRESS: Knee {knee_text}, TLS: {USE_TLS}")
+    result_path = stress.stress_result_path(timing_log_filename)
+    stress.save_results(result_path, results, USE_TLS)
+    logging.info(f"Stress results saved to {result_path}, compare runs with: python -m util.stress {result_path} ...")
+
     altitude_monitoring = False
     client.loop_stop()
     sys.exit(0)
-    
-def send_command(client, cmd, command_type="unknown"):
+
+def send_command(client, cmd, command_type="unknown", track=True, before_publish=None):
+    """Publish `cmd`, return its message ID; `before_publish(message_id, send_time)` registers it ahead of any ack"""
     global message_times, timing_logger, TOPIC_COMMAND
     message_id = str(uuid.uuid4())
     cmd['message_id'] = message_id
+    timed = timing_sampling.should_time(message_id, command_type, is_command=True)
+    if timing_sampling.enabled:
+        cmd[TIMED_KEY] = int(timed)
     
     send_time = time.time()
-    message_times[message_id] = send_time
+    # Lets the drone compute the real transit time of the command
+    cmd['sent_at'] = send_time
     
-    payload = json.dumps(cmd)
-    client.publish(TOPIC_COMMAND, payload)
+    body = json.dumps(cmd)
+    payload = encode_command(body)
+    encode_done = time.time()
+    if track:
+        # Registered before publishing: the ack can arrive before publish() returns
+        timeout = SLOW_ACK_TIMEOUT if any(k in cmd for k in SLOW_COMMAND_KEYS) else ACK_TIMEOUT
+        if 'mission' in cmd:
+            # The drone allows the upload its own deadline, then the other steps (mode change)
+            timeout += upload_timeout(len(cmd['mission']))
+        command_tracker.track(message_id, command_type, body, timeout, sent_at=send_time)
+    if before_publish:
+        before_publish(message_id, send_time)
+    publish_start = time.perf_counter()
+    info = client.publish(TOPIC_COMMAND, payload)
+    publish_done = time.time()
+    publish_tracker.track(info, 'command', publish_start, message_id if timed else None, command_type)
     
-    timing_logger.info(f"GS-SEND: Message ID {message_id} type {command_type} sent at {send_time:.6f}")
+    if timed:
+        message_times[message_id] = send_time
+        log_timing_event("SEND", message_id, command_type, send_time)
+        timing_logger.info(format_stages("GS", message_id, command_type, {
+            'created': send_time,
+            'encode_done': encode_done,
+            'publish_done': publish_done
+        }))
+    return message_id
 
 
 # Function to generate a random position
@@ -194,18 +338,46 @@ def generate_random_position():
     z = random.uniform(MIN_ALTITUDE, MAX_ALTITUDE)
     return {"lat": x, "lon": y, "alt": z}
 
+def generate_survey(rows=SURVEY_ROWS, columns=SURVEY_COLUMNS, spacing=SURVEY_SPACING, alt=SURVEY_ALTITUDE):
+    """Lawnmower pattern starting at the vehicle's last reported position, None before any position"""
+    lat = telemetry_history.buffer(DEFAULT_VEHICLE_ID, 'lat').latest()
+    lon = telemetry_history.buffer(DEFAULT_VEHICLE_ID, 'lon').latest()
+    if lat is None or lon is None:
+        return None
+    lat, lon = float(lat[1]), float(lon[1])
+    # Meters to degrees, flat-earth approximation over a few hundred meters
+    dlat = spacing / 111320.0
+    dlon = spacing / (111320.0 * math.cos(math.radians(lat)))
+    waypoints = []
+    for row in range(rows):
+        cols = range(columns) if row % 2 == 0 else reversed(range(columns))
+        for col in cols:
+            waypoints.append({"lat": lat + row * dlat, "lon": lon + col * dlon, "alt": alt})
+    return waypoints
+
 # Telemetry callback
 def on_message(client, userdata, message):
     global current_altitude, relative_altitude, battery_remaining, battery_voltage, battery_current
     try:
-        telemetry_data = json.loads(message.payload.decode())
+        # Record receive time before decoding so decode cost is attributed separately
+        receive_time = time.time()
+        telemetry_data = json.loads(open_payload(message.payload))
+        decode_done = time.time()
         
-        # Check for message_id to calculate timing
-        message_id = telemetry_data.get('message_id')
+        # Check for message_id to calculate timing, only for messages the sender sampled
+        message_id = telemetry_data.get('message_id') if is_timed(telemetry_data) else None
         if message_id:
-            receive_time = time.time()
             message_type = telemetry_data.get('type', 'unknown')
-            timing_logger.info(f"GS-RECV: Message ID {message_id} type {message_type} received at {receive_time:.6f}")
+            log_timing_event("RECV", message_id, message_type, receive_time)
+        
+        vehicle_id = safe_name(telemetry_data.get('vehicle_id'), DEFAULT_VEHICLE_ID)
+        telemetry_history.record(vehicle_id, telemetry_data, receive_time)
+        if flight_recorder:
+            flight_recorder.record(vehicle_id, telemetry_data, receive_time)
+        if 'timestamp' in telemetry_data:
+            # Drone send timestamp has 1 ms resolution, enough for the live display
+            latency_ms = receive_time * 1000 - telemetry_data['timestamp']
+            telemetry_history.buffer(vehicle_id, 'latency_ms').append(receive_time, latency_ms)
         
         # Update altitude data
         if 'alt' in telemetry_data:
@@ -218,10 +390,84 @@ def on_message(client, userdata, message):
             battery_voltage = telemetry_data.get('voltage', 0.0)
             battery_current = telemetry_data.get('current', 0.0)
             #logging.info(f"Battery update: {battery_remaining}%, {battery_voltage:.1f}V, {battery_current:.1f}A")
+        
+        if message_id:
+            timing_logger.info(format_stages("GS", message_id, message_type, {
+                'recv': receive_time,
+                'decode_done': decode_done,
+                'handler_done': time.time()
+            }))
             
     except Exception as e:
         logging.error(f"Error parsing telemetry data: {e}")
 
+# Backlog callback (drone/backlog/telemetry)
+def on_backlog(client, userdata, message):
+    """Telemetry replayed by the drone after an outage: part of the flight history, never shown as live"""
+    global backlog_received
+    try:
+        receive_time = time.time()
+        telemetry_data = json.loads(open_payload(message.payload))
+        backlog_received += 1
+        if flight_recorder:
+            flight_recorder.record(safe_name(telemetry_data.get('vehicle_id'), DEFAULT_VEHICLE_ID), telemetry_data, receive_time, backlog=True)
+        if backlog_received % BACKLOG_LOG_EVERY == 0:
+            sent_at = datetime.fromtimestamp(telemetry_data.get('timestamp', 0) / 1000).strftime("%H:%M:%S")
+            logging.info(f"Telemetry backlog: {backlog_received} messages received, replay at {sent_at}")
+    except Exception as e:
+        logging.error(f"Error parsing backlog telemetry: {e}")
+
+# Command ack callback (drone/ack)
+def on_ack(client, userdata, message):
+    try:
+        receive_time = time.time()
+        ack = json.loads(open_payload(message.payload))
+        if stress_recorder and stress_recorder.ack(ack, receive_time):
+            return
+        result = command_tracker.ack(ack['id'], receive_time)
+        if result is None:
+            # Ack of a retransmission that arrived after the first one, or of a command given up on
+            return
+        command_type, rtt, retries = result
+        rtt_ms = rtt * 1000
+        telemetry_history.buffer(DEFAULT_VEHICLE_ID, 'command_rtt_ms').append(receive_time, rtt_ms)
+        timing_logger.info(f"GS-ACK: Message ID {ack['id']} type {command_type} status {ack['s']} "
+                           f"RTT: {rtt_ms:.2f}ms, retries: {retries}, TLS: {USE_TLS}")
+        if ack['s'] != ACK_OK:
+            logging.warning(f"Command {command_type} ({ack['id']}) not executed by the drone: {ack['s']} {ack.get('r', '')}")
+    except Exception as e:
+        logging.error(f"Error parsing command ack: {e}")
+
+def on_command_failure(message_id, command_type, reason, retries):
+    logging.warning(f"Command {command_type} ({message_id}) not acknowledged: {reason} after {retries} retransmissions")
+    timing_logger.info(f"GS-ACK-FAIL: Message ID {message_id} type {command_type} {reason} after {retries} retries, TLS: {USE_TLS}")
+
+# Profile changes waiting for the drone's answer: {message_id: (send time, changes)}
+pending_profiles = {}
+
+def send_profile(client, changes):
+    """Ask the drone bridge to apply performance settings live, answered on drone/control/ack"""
+    message_id = str(uuid.uuid4())
+    pending_profiles[message_id] = (time.time(), changes)
+    client.publish(TOPIC_CONTROL, encode_command(json.dumps({'profile': changes, 'message_id': message_id})))
+    logging.info(f"Sent profile change {message_id}: {changes}")
+    return message_id
+
+# Profile change answer callback (drone/control/ack)
+def on_control_ack(client, userdata, message):
+    try:
+        receive_time = time.time()
+        ack = json.loads(open_payload(message.payload))
+        sent_at, changes = pending_profiles.pop(ack['id'], (None, None))
+        rtt = f"{(receive_time - sent_at) * 1000:.2f}ms" if sent_at else "unknown"
+        if ack['s'] == ACK_ERROR:
+            logging.warning(f"Drone rejected profile change {changes}: {ack.get('r', '')}")
+        else:
+            logging.info(f"Drone profile {'updated' if ack['s'] == ACK_OK else 'unchanged'}: {ack.get('profile')}")
+        timing_logger.info(f"GS-PROFILE: Message ID {ack['id']} status {ack['s']} RTT: {rtt} changes {json.dumps(changes)} {ack.get('r', '')}")
+    except Exception as e:
+        logging.error(f"Error parsing profile ack: {e}")
+
 # Read keys without enter
 def getch():
     fd = sys.stdin.fileno()
@@ -265,7 +511,11 @@ def monitor_altitude():
             else:
                 battery_color = "\033[31m"  # Red
                 
+            climb_rate = telemetry_history.rate(DEFAULT_VEHICLE_ID, 'relative_alt', CLIMB_RATE_WINDOW)
+            
             status_line = f"Altitude: {current_altitude:.1f}m (rel: {relative_altitude:.1f}m) | "
+            if climb_rate is not None:
+                status_line += f"Climb: {climb_rate:+.1f}m/s | "
             status_line += f"Battery: {battery_color}{battery_remaining:.0f}%{reset_color} "
             status_line += f"({battery_voltage:.1f}V, {battery_current:.1f}A)"
             
@@ -274,6 +524,45 @@ def monitor_altitude():
             previous_battery = battery_remaining
             
         time.sleep(0.5)
+
+def battery_style(level):
+    if level > 50:
+        return "32"  # Green
+    elif level > 20:
+        return "33"  # Yellow
+    return "31"      # Red
+
+def build_status_frame():
+    """Rows of (text, style) spans for the status screen: telemetry, link stats and latency per vehicle"""
+    now = time.time()
+    rtt = telemetry_history.buffer(DEFAULT_VEHICLE_ID, 'command_rtt_ms').percentiles([50, 99], COMMAND_RTT_WINDOW, now)
+    commands = (f"  Cmd RTT p50/p99: {f'{rtt[0]:.1f}/{rtt[1]:.1f}ms' if rtt is not None else '-'}"
+                f"  pending {len(command_tracker)} retx {command_tracker.retransmitted} failed {command_tracker.failed}")
+    frame = [[(f"{'Vehicle':<10}{'Alt':>8}{'Rel':>8}{'Climb':>8}  {'Battery':<20}{'Msg/s':>7}{'Age':>7}{'p50/p99 ms':>14}", "1"),
+              (commands, "31" if command_tracker.failed else "")]]
+    for vehicle_id in (telemetry_history.vehicles() or [DEFAULT_VEHICLE_ID])[:MAX_STATUS_VEHICLES]:
+        def latest(field, default=0.0):
+            sample = telemetry_history.buffer(vehicle_id, field).latest()
+            return sample[1] if sample else default
+        
+        climb = telemetry_history.rate(vehicle_id, 'relative_alt', CLIMB_RATE_WINDOW)
+        level = latest('battery_remaining', 100)
+        link = telemetry_history.buffer(vehicle_id, 'latency_ms')
+        last_msg = link.latest()
+        msg_rate = len(link.window(LINK_STATS_WINDOW, now)[0]) / LINK_STATS_WINDOW
+        age = f"{now - last_msg[0]:.1f}s" if last_msg else "-"
+        pct = link.percentiles([50, 99], LINK_STATS_WINDOW, now)
+        latency = f"{pct[0]:.1f}/{pct[1]:.1f}" if pct is not None else "-"
+        
+        frame.append([
+            (f"{vehicle_id:<10}{latest('alt'):>7.1f}m{latest('relative_alt'):>7.1f}m"
+             f"{(f'{climb:+.1f}' if climb is not None else '-'):>8}  ", ""),
+            (f"{level:>3.0f}%", battery_style(level)),
+            (f" {latest('voltage'):>5.1f}V {latest('current'):>5.1f}A  ", ""),
+            (f"{msg_rate:>7.1f}{age:>7}{latency:>14}", ""),
+        ])
+    return frame
+
 # Automated sequence function
 
 
@@ -281,21 +570,29 @@ def monitor_altitude():
 def keyboard_loop(client):
     global vertical_movement, altitude_monitoring
     
+    if STRESS_MODE:
+        stress_sequence(client)
+        return
+    
     # Check if automated mode is enabled
     if AUTOMATED_MODE:
         automated_sequence(client)
         return
     
     logging.info("Drone control: WASD for movement, Q/E up/down, C takeoff, X land, SPACE to stop.")
-    logging.info("G to enter manual coordinates, R to generate random position.")
+    logging.info("G to enter manual coordinates, R to generate random position, V to upload and fly a survey mission.")
     logging.info("Battery status will be displayed in real-time (Green: >50%, Yellow: 20-50%, Red: <20%)")
     logging.info("Press 'B' for detailed battery status, '.' to exit.")
     meter_per_second = 5.0
     
-    # Start altitude monitoring thread
-    alt_thread = threading.Thread(target=monitor_altitude)
-    alt_thread.daemon = True
-    alt_thread.start()
+    if STATUS_FPS > 0:
+        # Diff-based status screen at a capped frame rate
+        status_screen.start()
+    else:
+        # Start altitude monitoring thread
+        alt_thread = threading.Thread(target=monitor_altitude)
+        alt_thread.daemon = True
+        alt_thread.start()
     
     while True:
         key = getch().lower()
@@ -358,6 +655,13 @@ def keyboard_loop(client):
             random_pos = generate_random_position()
             cmd = {'position': random_pos}
             logging.info(f"Generated random position: {random_pos}")
+        elif key == 'v':
+            survey = generate_survey()
+            if survey is None:
+                logging.error("No position received yet, cannot plan a survey")
+                continue
+            cmd = {'mission': survey, 'start': True}
+            logging.info(f"Uploading survey mission: {len(survey)} waypoints, {SURVEY_SPACING:g}m spacing at {SURVEY_ALTITUDE:g}m")
         elif key == 'b':
             # Display detailed battery status
             battery_color = ""
@@ -374,6 +678,12 @@ def keyboard_loop(client):
             print(f"Level: {battery_color}{battery_remaining:.1f}%{reset_color}")
             print(f"Voltage: {battery_voltage:.2f}V")
             print(f"Current: {battery_current:.2f}A")
+            drain_rate = telemetry_history.rate(DEFAULT_VEHICLE_ID, 'battery_remaining', BATTERY_DRAIN_WINDOW)
+            if drain_rate is not None:
+                print(f"Drain: {-drain_rate * 60:.2f}%/min (last {BATTERY_DRAIN_WINDOW:.0f}s)")
+            voltage_stats = telemetry_history.stats(DEFAULT_VEHICLE_ID, 'voltage', BATTERY_DRAIN_WINDOW)
+            if voltage_stats:
+                print(f"Voltage min/mean/max: {voltage_stats['min']:.2f}/{voltage_stats['mean']:.2f}/{voltage_stats['max']:.2f}V")
             print(f"---------------------\n")
             continue
         elif key == '.':
@@ -389,13 +699,21 @@ def keyboard_loop(client):
             message_type = f"mode_{cmd['mode']}"
         elif 'position' in cmd:
             message_type = "position"
+        elif 'mission' in cmd:
+            message_type = "mission"
         elif 'takeoff_alt' in cmd:
             message_type = "takeoff"
         
         send_command(client, cmd, message_type)
 
+STATUS_FPS = args.status_fps
+status_screen = StatusScreen(STATUS_ROWS, build_status_frame, fps=STATUS_FPS) if STATUS_FPS > 0 else None
+
 # Setup MQTT
 client = mqtt.Client()
+# Outstanding commands: retransmitted with the same message ID until acked, then reported as failed
+command_tracker = CommandTracker(lambda body: client.publish(TOPIC_COMMAND, encode_command(body)),
+                                 on_failure=on_command_failure, max_retries=args.ack_retries)
 
 # Apply TLS settings only if enabled
 if USE_TLS:
@@ -410,10 +728,21 @@ else:
     logging.info("Configuring MQTT without TLS security")
     
 client.on_message = on_message
+client.on_publish = publish_tracker.on_publish
+client.message_callback_add(TOPIC_ACK, on_ack)
+client.message_callback_add(TOPIC_TELEMETRY_BACKLOG, on_backlog)
+client.message_callback_add(TOPIC_CONTROL_ACK, on_control_ack)
 client.connect(BROKER, PORT, 60)
-client.subscribe(TOPIC_TELEMETRY)
+client.subscribe([(topic, 0) for topic in TELEMETRY_TOPICS] + [(TOPIC_ACK, 0), (TOPIC_TELEMETRY_BACKLOG, 0), (TOPIC_CONTROL_ACK, 0)])
 client.loop_start()
-logging.info(f"Ground Station connected, subscribed to {TOPIC_TELEMETRY}")
+command_tracker.start()
+logging.info(f"Ground Station connected, subscribed to {', '.join(TELEMETRY_TOPICS)} and {TOPIC_ACK}")
+
+if args.drone_profile:
+    with open(args.drone_profile, 'r') as f:
+        drone_profile = json.load(f)
+    # Settings applied at startup only (broker, ports, certificates) would be rejected by the running bridge
+    send_profile(client, {k: v for k, v in drone_profile.items() if k in LIVE_PROFILE_SETTINGS})
 
 # Start keyboard thread
 keyboard_thread = threading.Thread(target=keyboard_loop, args=(client,))
@@ -427,5 +756,10 @@ try:
 except KeyboardInterrupt:
     logging.info("Closing Ground Station")
     altitude_monitoring = False  # Stop altitude monitoring thread
+    command_tracker.stop()
+    if flight_recorder:
+        flight_recorder.close()
+    if status_screen:
+        status_screen.stop()
     client.loop_stop()
     sys.exit(0)
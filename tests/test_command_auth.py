@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from util import command_auth
+from util.command_auth import CommandSigner, CommandVerifier, CommandAuthError, command_key
+
+KEY = command_key(b"\0" * 32)
+
+
+def test_replayed_command_is_rejected():
+    signer, verifier = CommandSigner(KEY), CommandVerifier(KEY)
+    signed = signer.sign(b'{"mode": "GUIDED"}')
+    assert verifier.verify(signed) == b'{"mode": "GUIDED"}'
+    with pytest.raises(CommandAuthError):
+        verifier.verify(signed)
+
+
+def test_command_signed_before_restart_is_rejected(monkeypatch):
+    clock = [1_700_000_000_000_000_000]
+    monkeypatch.setattr(command_auth.time, 'time_ns', lambda: clock[0])
+    signer = CommandSigner(KEY)
+    captured = signer.sign(b'{"arm": true}')
+    assert CommandVerifier(KEY).verify(captured) == b'{"arm": true}'
+
+    # The drone restarts a minute later: its new verifier has seen nothing yet
+    clock[0] += 60 * 10**9
+    restarted = CommandVerifier(KEY)
+    with pytest.raises(CommandAuthError):
+        restarted.verify(captured)
+    assert restarted.verify(signer.sign(b'{"arm": true}')) == b'{"arm": true}'
+
+
+def test_clock_skew_is_tolerated(monkeypatch):
+    clock = [1_700_000_000_000_000_000]
+    monkeypatch.setattr(command_auth.time, 'time_ns', lambda: clock[0])
+    signed = CommandSigner(KEY).sign(b'{}')
+    # Drone clock half the tolerance ahead of the ground station's
+    clock[0] += command_auth.CLOCK_SKEW_US * 1000 // 2
+    assert CommandVerifier(KEY).verify(signed) == b'{}'
+
+
+def test_out_of_order_commands_inside_the_window_are_accepted_once(monkeypatch):
+    clock = [1_700_000_000_000_000_000]
+    monkeypatch.setattr(command_auth.time, 'time_ns', lambda: clock[0])
+    signer, verifier = CommandSigner(KEY), CommandVerifier(KEY)
+    older = signer.sign(b'{"retransmit": 1}')
+    clock[0] += 2 * 10**6  # 2 ms later
+    newer = signer.sign(b'{"velocity": {}}')
+    assert verifier.verify(newer) == b'{"velocity": {}}'
+    assert verifier.verify(older) == b'{"retransmit": 1}'
+    with pytest.raises(CommandAuthError):
+        verifier.verify(older)
+
+
+def test_command_older_than_the_window_is_rejected(monkeypatch):
+    clock = [1_700_000_000_000_000_000]
+    monkeypatch.setattr(command_auth.time, 'time_ns', lambda: clock[0])
+    signer, verifier = CommandSigner(KEY), CommandVerifier(KEY)
+    stale = signer.sign(b'{}')
+    clock[0] += (command_auth.REPLAY_WINDOW_US + 1) * 1000
+    verifier.verify(signer.sign(b'{}'))
+    with pytest.raises(CommandAuthError):
+        verifier.verify(stale)
+
+
+def test_commands_signed_on_several_threads_in_any_order():
+    signer, verifier = CommandSigner(KEY), CommandVerifier(KEY)
+    signed = []
+
+    def sign_many():
+        for _ in range(500):
+            signed.append(signer.sign(b'{"velocity": {}}'))
+
+    threads = [threading.Thread(target=sign_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Published in another order than signed: newest first
+    for payload in reversed(signed):
+        verifier.verify(payload)
+    assert verifier.rejected == 0
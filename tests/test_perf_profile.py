@@ -0,0 +1,28 @@
+import pytest
+
+from util.perf_profile import PerformanceProfile
+
+
+def test_bool_is_not_a_qos():
+    profile = PerformanceProfile()
+    for value in (True, False, 1.0, "1"):
+        with pytest.raises(ValueError):
+            profile.update({'telemetry_qos': value})
+    assert profile['telemetry_qos'] == 0
+
+
+def test_valid_choices_are_applied():
+    profile = PerformanceProfile()
+    assert profile.update({'telemetry_qos': 1, 'encoding': 'compact'}) == {'telemetry_qos': 1, 'encoding': 'compact'}
+
+
+def test_invalid_change_leaves_profile_untouched():
+    profile = PerformanceProfile()
+    with pytest.raises(ValueError):
+        profile.update({'ack_qos': 2, 'telemetry_qos': True})
+    assert profile['ack_qos'] == 0
+
+
+def test_startup_setting_is_not_live():
+    with pytest.raises(ValueError):
+        PerformanceProfile().update({'port': 1884})
@@ -0,0 +1,52 @@
+import time
+from types import SimpleNamespace
+
+from util import publish_tracker
+from util.publish_tracker import PublishTracker
+
+
+def info(mid):
+    return SimpleNamespace(rc=0, mid=mid)
+
+
+def test_reused_mid_ignores_a_stale_early_completion():
+    completed = []
+    tracker = PublishTracker(on_complete=lambda *args: completed.append(args))
+    # An untracked publish (control ack) completes with mid 7
+    tracker.on_publish(None, None, 7)
+    time.sleep(0.002)
+    # paho reuses mid 7 for a timed publish
+    tracker.track(info(7), 'telemetry', time.perf_counter(), 'id', 'position')
+    assert completed == []
+    time.sleep(0.002)
+    tracker.on_publish(None, None, 7)
+    assert len(completed) == 1
+    assert completed[0][3] >= 1.0  # ms, the real completion, not the stale one
+
+
+def test_completion_before_track_is_matched():
+    completed = []
+    tracker = PublishTracker(on_complete=lambda *args: completed.append(args))
+    start = time.perf_counter()
+    tracker.on_publish(None, None, 3)
+    tracker.track(info(3), 'telemetry', start, 'id', 'attitude')
+    assert len(completed) == 1 and 0 <= completed[0][3] < 100
+
+
+def test_untracked_completions_expire(monkeypatch):
+    tracker = PublishTracker()
+    now = [100.0]
+    monkeypatch.setattr(publish_tracker.time, 'perf_counter', lambda: now[0])
+    tracker.on_publish(None, None, 1)
+    now[0] += publish_tracker.EARLY_TTL + 1
+    tracker.on_publish(None, None, 2)
+    assert list(tracker._early) == [2]
+
+
+def test_on_delivered_runs_once_completed():
+    delivered = []
+    tracker = PublishTracker()
+    tracker.track(info(9), 'backlog', time.perf_counter(), on_delivered=lambda: delivered.append(9))
+    assert delivered == []
+    tracker.on_publish(None, None, 9)
+    assert delivered == [9]
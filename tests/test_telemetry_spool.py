@@ -0,0 +1,108 @@
+import os
+
+from util.telemetry_spool import TelemetrySpool, SpoolFlusher
+
+
+def payloads(spool, count=1000):
+    return [payload for payload, _ in spool.read(count)]
+
+
+def test_segments_rotate_at_segment_size(tmp_path):
+    spool = TelemetrySpool(str(tmp_path), segment_bytes=100)
+    for i in range(10):
+        spool.append(f'{{"n": {i:02d}, "pad": "{"x" * 20}"}}')
+    segments = sorted(name for name in os.listdir(tmp_path) if name.startswith("spool."))
+    assert len(segments) > 1
+    assert payloads(spool) == [f'{{"n": {i:02d}, "pad": "{"x" * 20}"}}' for i in range(10)]
+
+
+def test_cap_drops_the_oldest_segment(tmp_path):
+    spool = TelemetrySpool(str(tmp_path), max_bytes=300, segment_bytes=100)
+    for i in range(30):
+        spool.append(f'{{"n": {i:02d}, "pad": "{"x" * 20}"}}')
+    kept = payloads(spool)
+    assert spool.size <= 300
+    assert spool.dropped == 30 - len(kept)
+    # The most recent history is kept, in order
+    assert kept == [f'{{"n": {i:02d}, "pad": "{"x" * 20}"}}' for i in range(30 - len(kept), 30)]
+
+
+def test_cursor_is_reloaded_after_a_restart(tmp_path):
+    spool = TelemetrySpool(str(tmp_path), segment_bytes=100)
+    for i in range(10):
+        spool.append(f'{{"n": {i}}}')
+    batch = spool.read(4)
+    spool.commit(batch[-1][1])
+    spool.close()
+
+    restarted = TelemetrySpool(str(tmp_path), segment_bytes=100)
+    assert payloads(restarted) == [f'{{"n": {i}}}' for i in range(4, 10)]
+
+
+def test_commit_of_a_dropped_segment_is_ignored(tmp_path):
+    spool = TelemetrySpool(str(tmp_path), max_bytes=300, segment_bytes=100)
+    for i in range(3):
+        spool.append(f'{{"n": {i:02d}, "pad": "{"x" * 20}"}}')
+    stale = spool.read(1)[0][1]
+    for i in range(3, 30):
+        spool.append(f'{{"n": {i:02d}, "pad": "{"x" * 20}"}}')
+    before = payloads(spool)
+    spool.commit(stale)
+    assert payloads(spool) == before
+
+
+class FakeClient:
+    def __init__(self):
+        self.connected = True
+        self.published = []  # [(payload, on_delivered)]
+
+    def publish(self, payload, on_delivered):
+        if not self.connected:
+            return False
+        self.published.append((payload, on_delivered))
+        return True
+
+
+def test_cursor_only_moves_on_delivery_in_order(tmp_path):
+    spool = TelemetrySpool(str(tmp_path))
+    for i in range(5):
+        spool.append(f'{{"n": {i}}}')
+    client = FakeClient()
+    flusher = SpoolFlusher(spool, client.publish, lambda: client.connected, batch_size=5)
+    assert flusher.flush_batch() == 5
+    # Accepted by the client but not acknowledged: nothing leaves the spool
+    assert len(payloads(spool)) == 5
+    client.published[1][1]()
+    flusher.commit_delivered()
+    assert len(payloads(spool)) == 5
+    client.published[0][1]()
+    flusher.commit_delivered()
+    assert payloads(spool) == ['{"n": 2}', '{"n": 3}', '{"n": 4}']
+    assert flusher.flushed == 2
+
+
+def test_unconfirmed_messages_are_sent_again_after_a_disconnection(tmp_path):
+    spool = TelemetrySpool(str(tmp_path))
+    for i in range(4):
+        spool.append(f'{{"n": {i}}}')
+    client = FakeClient()
+    flusher = SpoolFlusher(spool, client.publish, lambda: client.connected, batch_size=10)
+    flusher.flush_batch()
+    client.published[0][1]()
+    # The link dropped with the other three still queued in the client
+    flusher.reset()
+    client.published.clear()
+    flusher.flush_batch()
+    assert [payload for payload, _ in client.published] == ['{"n": 1}', '{"n": 2}', '{"n": 3}']
+
+
+def test_stalled_delivery_is_retried(tmp_path):
+    spool = TelemetrySpool(str(tmp_path))
+    spool.append('{"n": 0}')
+    client = FakeClient()
+    flusher = SpoolFlusher(spool, client.publish, lambda: client.connected, delivery_timeout=30.0)
+    flusher.flush_batch(now=0.0)
+    assert flusher.flush_batch(now=10.0) == 0
+    flusher.flush_batch(now=31.0)
+    assert flusher.flush_batch(now=31.0) == 1
+    assert [payload for payload, _ in client.published] == ['{"n": 0}', '{"n": 0}']
@@ -0,0 +1,72 @@
+import os
+import threading
+
+from util import timing_log_rotation
+from util.timing_log_rotation import compress_segment, iter_window
+
+LINES = [f"2025-06-05 12:00:{i:02d},000 - GS-SEND: Message ID {i} type velocity sent at 0\n" for i in range(30)]
+
+
+def write_segment(directory, seq=0):
+    path = os.path.join(directory, f"gs.{seq:05d}.log")
+    with open(path, 'w') as f:
+        f.writelines(LINES)
+    return path
+
+
+def index_path(directory):
+    return os.path.join(directory, "gs.index.jsonl")
+
+
+def test_segment_being_compressed_is_read_once(tmp_path):
+    directory = str(tmp_path)
+    plain = write_segment(directory)
+    # The .gz is partly written and not indexed yet
+    with open(plain + ".gz", 'wb') as f:
+        f.write(b"\x1f\x8b")
+    assert list(iter_window(directory)) == LINES
+
+
+def test_segment_indexed_but_not_yet_removed_is_read_once(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    plain = write_segment(directory)
+    # Stop compress_segment between the index append and the removal of the plain file
+    monkeypatch.setattr(timing_log_rotation.os, 'remove', lambda path: None)
+    compress_segment(plain, index_path(directory), threading.Lock())
+    assert os.path.exists(plain)
+    assert list(iter_window(directory)) == LINES
+
+
+def test_segment_removed_after_the_index_was_read(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    plain = write_segment(directory)
+    read_index = timing_log_rotation.read_index
+    calls = []
+
+    def racing_read_index(path):
+        calls.append(path)
+        if len(calls) == 1:
+            # The reader sees no index entry, then the compression finishes
+            entries = read_index(path)
+            compress_segment(plain, index_path(directory), threading.Lock())
+            return entries
+        return read_index(path)
+
+    monkeypatch.setattr(timing_log_rotation, 'read_index', racing_read_index)
+    assert list(iter_window(directory)) == LINES
+
+
+def test_segment_removed_after_it_was_listed(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    plain = write_segment(directory)
+    glob = timing_log_rotation.glob.glob
+
+    def racing_glob(pattern):
+        paths = glob(pattern)
+        if pattern.endswith(".*.log") and os.path.exists(plain):
+            # Listed as a plain segment, then compressed before it is opened
+            compress_segment(plain, index_path(directory), threading.Lock())
+        return paths
+
+    monkeypatch.setattr(timing_log_rotation.glob, 'glob', racing_glob)
+    assert list(iter_window(directory)) == LINES
@@ -0,0 +1,27 @@
+import re
+import argparse
+
+import pytest
+
+from util.timing_sampling import SamplingPolicy, sampling_spec
+
+
+@pytest.mark.parametrize('spec', ['ratio:', 'ratio:x', 'rate:', 'commands:1.5', 'ratio:0', 'rate:-1', 'every:x', 'every'])
+def test_malformed_specs_name_the_spec(spec):
+    with pytest.raises(ValueError, match=re.escape(repr(spec))):
+        SamplingPolicy.parse(spec)
+
+
+@pytest.mark.parametrize('spec, expected', [('all', 'all'), ('ratio:10', 'ratio:10'), ('rate:2.5', 'rate:2.5'),
+                                            ('commands:4', 'commands:4')])
+def test_valid_specs(spec, expected):
+    assert str(SamplingPolicy.parse(spec)) == expected
+
+
+def test_argparse_reports_a_usage_error(capsys):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--timing-sample', type=sampling_spec, default='all')
+    assert parser.parse_args(['--timing-sample', 'rate:5']).timing_sample == 'rate:5'
+    with pytest.raises(SystemExit):
+        parser.parse_args(['--timing-sample', 'ratio:'])
+    assert "invalid timing sampling policy 'ratio:'" in capsys.readouterr().err
@@ -0,0 +1,26 @@
+import pytest
+
+from util.workload import validate_steps, schedule
+
+
+@pytest.mark.parametrize('repeat', [0, -1, '3', 2.5, True])
+def test_group_repeat_must_be_a_positive_integer(repeat):
+    with pytest.raises(ValueError, match="repeat"):
+        validate_steps([{'repeat': repeat, 'steps': [{'wait': 1}]}], "workload")
+
+
+@pytest.mark.parametrize('repeat', [0, '3', 2.5])
+def test_command_repeat_must_be_a_positive_integer(repeat):
+    with pytest.raises(ValueError, match="repeat"):
+        validate_steps([{'command': {}, 'repeat': repeat}], "workload")
+
+
+def test_nested_group_is_validated():
+    with pytest.raises(ValueError, match="group 0"):
+        validate_steps([{'repeat': 2, 'steps': [{'repeat': 0, 'steps': []}]}], "workload")
+
+
+def test_valid_group_is_scheduled():
+    steps = [{'repeat': 2, 'steps': [{'command': {}, 'repeat': 2, 'rate': 2.0}]}]
+    validate_steps(steps, "workload")
+    assert [offset for offset, _, _ in schedule(steps)] == [0.0, 0.5, 1.0, 1.5]
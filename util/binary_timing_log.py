@@ -0,0 +1,215 @@
+import os
+import sys
+import time
+import uuid
+import atexit
+import struct
+import logging
+import hashlib
+import argparse
+import datetime
+from threading import Lock
+
+from util.timing_log import parse_event
+
+# Record layout (little endian, 32 bytes):
+#   kind u8 | source u8 | type code u16 | pad 4 | message ID 16 bytes | timestamp int64 ns
+RECORD_STRUCT = struct.Struct("<BBH4x16sq")
+RECORD_SIZE = RECORD_STRUCT.size
+# File header, padded to one record so records stay aligned for the mmap reader
+MAGIC = b"MQTTBIN1"
+HEADER = MAGIC.ljust(RECORD_SIZE, b"\0")
+
+KINDS = ("SEND", "RECV")
+SOURCES = ("DRONE", "GS")
+
+# Message type codes are the index in this tuple. Append only: never reorder,
+# otherwise existing binary logs would decode to the wrong types.
+MESSAGE_TYPES = (
+    "unknown",
+    "position", "attitude", "battery",
+    "velocity", "takeoff", "arm", "rc_override",
+    "mode_STABILIZE", "mode_GUIDED", "mode_LOITER", "mode_RTL", "mode_AUTO", "mode_LAND",
+    "velocity_forward", "velocity_backward", "velocity_left", "velocity_right",
+    "velocity_up", "velocity_down", "velocity_stop",
+    "mission",
+    "velocity_stress",
+)
+TYPE_CODES = {name: code for code, name in enumerate(MESSAGE_TYPES)}
+
+# Flush the write buffer when it reaches this size or this age
+FLUSH_BYTES = 4096
+FLUSH_INTERVAL = 1.0
+
+
+def binary_log_path(text_log_path, component):
+    """Per-process binary log next to the text log, e.g. mqtt_timing_<date>_<tls>_drone.bin"""
+    root, _ = os.path.splitext(text_log_path)
+    return f"{root}_{component}.bin"
+
+
+def encode_message_id(message_id):
+    """UUIDs are stored losslessly, any other ID as a 128-bit hash"""
+    try:
+        return uuid.UUID(message_id).bytes
+    except ValueError:
+        return hashlib.blake2b(message_id.encode(), digest_size=16).digest()
+
+
+def decode_message_id(raw):
+    return str(uuid.UUID(bytes=bytes(raw)))
+
+
+class BinaryTimingLog:
+    """
+    Appends fixed-size timing records to a per-process binary file.
+    Records are packed into an in-memory buffer and written with a single
+    write() when the buffer is full or older than FLUSH_INTERVAL.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        if new_file:
+            os.write(self._fd, HEADER)
+        self._buffer = bytearray()
+        self._last_flush = time.monotonic()
+        self._lock = Lock()
+        self._unmapped = set()  # Types recorded as "unknown", warned about once each
+        atexit.register(self.close)
+
+    def record(self, kind, source, message_type, message_id, timestamp):
+        """Record a SEND/RECV event, `timestamp` is epoch seconds as returned by time.time()"""
+        code = TYPE_CODES.get(message_type)
+        if code is None:
+            code = 0
+            if message_type not in self._unmapped:
+                self._unmapped.add(message_type)
+                logging.getLogger(__name__).warning(
+                    f"Message type {message_type!r} has no binary code, recorded as 'unknown' in {self.path} "
+                    f"(append it to MESSAGE_TYPES in util/binary_timing_log.py)")
+        packed = RECORD_STRUCT.pack(
+            KINDS.index(kind),
+            SOURCES.index(source),
+            code,
+            encode_message_id(message_id),
+            round(timestamp * 1e9)
+        )
+        with self._lock:
+            self._buffer += packed
+            if len(self._buffer) >= FLUSH_BYTES or time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+                self._flush()
+
+    def _flush(self):
+        if self._buffer and self._fd is not None:
+            os.write(self._fd, self._buffer)
+            self._buffer.clear()
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._fd is None:
+                return
+            self._flush()
+            os.close(self._fd)
+            self._fd = None
+
+
+def record_dtype():
+    import numpy as np
+    return np.dtype([
+        ('kind', 'u1'),
+        ('source', 'u1'),
+        ('type', '<u2'),
+        ('pad', 'V4'),
+        ('id', 'V16'),
+        ('timestamp_ns', '<i8'),
+    ])
+
+
+def load_binary_log(path):
+    """
+    Memory-map a binary timing log as a NumPy structured array.
+    No data is copied: columns like records['timestamp_ns'] are read from
+    the page cache on demand.
+    """
+    import numpy as np
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a binary timing log")
+    size = os.path.getsize(path)
+    count = (size - RECORD_SIZE) // RECORD_SIZE  # A trailing partial record is ignored
+    if count <= 0:
+        return np.empty(0, dtype=record_dtype())
+    return np.memmap(path, dtype=record_dtype(), mode='r', offset=RECORD_SIZE, shape=(count,))
+
+
+def format_text_line(kind, source, message_type, message_id, timestamp):
+    """Rebuild the exact line drone_mqtt.py / ground_station.py write to the text timing log"""
+    dt = datetime.datetime.fromtimestamp(timestamp)
+    asctime = dt.strftime("%Y-%m-%d %H:%M:%S") + f",{dt.microsecond // 1000:03d}"
+    verb = "sent" if kind == "SEND" else "received"
+    return f"{asctime} - {source}-{kind}: Message ID {message_id} type {message_type} {verb} at {timestamp:.6f}"
+
+
+def binary_to_text(binary_paths, out_path):
+    """Merge one or more binary logs, ordered by timestamp, into the text format"""
+    import numpy as np
+    arrays = [load_binary_log(p) for p in binary_paths]
+    records = np.concatenate(arrays) if arrays else np.empty(0, dtype=record_dtype())
+    order = np.argsort(records['timestamp_ns'], kind='stable')
+    with open(out_path, 'w') as out:
+        for rec in records[order]:
+            type_code = int(rec['type'])
+            message_type = MESSAGE_TYPES[type_code] if type_code < len(MESSAGE_TYPES) else "unknown"
+            out.write(format_text_line(
+                KINDS[rec['kind']],
+                SOURCES[rec['source']],
+                message_type,
+                decode_message_id(rec['id']),
+                int(rec['timestamp_ns']) / 1e9
+            ) + "\n")
+    return len(records)
+
+
+def text_to_binary(text_path, out_path):
+    """Convert the SEND/RECV events of a text timing log into a binary log"""
+    count = 0
+    log = BinaryTimingLog(out_path)
+    with open(text_path, 'r') as f:
+        for line in f:
+            event = parse_event(line)
+            if not event:
+                continue
+            event_type, message_id, message_type, timestamp = event
+            source, kind = event_type.split("-")
+            log.record(kind, source, message_type, message_id, timestamp)
+            count += 1
+    log.close()
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert timing logs between text and binary format')
+    subparsers = parser.add_subparsers(dest='direction', required=True)
+    to_text = subparsers.add_parser('to-text', help='Binary log(s) -> text log')
+    to_text.add_argument('inputs', nargs='+', help='Binary log files (e.g. the _drone.bin and _gs.bin of a run)')
+    to_text.add_argument('-o', '--output', required=True, help='Text log to write')
+    to_binary = subparsers.add_parser('to-binary', help='Text log -> binary log')
+    to_binary.add_argument('input', help='Text timing log')
+    to_binary.add_argument('-o', '--output', required=True, help='Binary log to write')
+    args = parser.parse_args()
+
+    if args.direction == 'to-text':
+        n = binary_to_text(args.inputs, args.output)
+    else:
+        if os.path.exists(args.output):
+            print(f"Refusing to append to existing file: {args.output}")
+            sys.exit(1)
+        n = text_to_binary(args.input, args.output)
+    print(f"Converted {n} records to {args.output}")
@@ -0,0 +1,137 @@
+import time
+import threading
+from collections import OrderedDict
+
+# Outstanding commands kept at most; the oldest is given up when full
+MAX_OUTSTANDING = 256
+# Default ack deadline (seconds), and retransmissions before a command is flagged
+ACK_TIMEOUT = 0.5
+MAX_RETRIES = 2
+CHECK_INTERVAL = 0.02
+
+# Ack status values sent by the drone
+ACK_OK = "ok"          # Command executed
+ACK_IGNORED = "nop"    # Understood, nothing to execute (no MAVLink link, unknown command...)
+ACK_ERROR = "err"      # Handler raised
+ACK_FAILED = "fail"    # The vehicle refused or did not confirm a step, reason in 'r'
+
+
+def make_ack(message_id, status, exec_time, reason=None):
+    """Compact ack payload published by the drone"""
+    ack = {'id': message_id, 's': status, 't': round(exec_time, 6)}
+    if reason:
+        ack['r'] = reason
+    return ack
+
+
+class AckCache:
+    """
+    Drone side: the last acks sent, by message ID. A retransmitted command
+    is answered from here instead of being executed a second time.
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self._acks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, message_id):
+        with self._lock:
+            return self._acks.get(message_id)
+
+    def put(self, message_id, ack):
+        with self._lock:
+            self._acks[message_id] = ack
+            if len(self._acks) > self.capacity:
+                self._acks.popitem(last=False)
+
+
+class CommandTracker:
+    """
+    Ground station side table of commands waiting for an ack.
+
+    track() is called right after a command is published. ack() removes it
+    and returns the round-trip time; a background thread republishes the
+    same payload (same message ID, the drone deduplicates) when the deadline
+    passes, up to max_retries times, then reports the command as failed
+    through on_failure(message_id, command_type, reason, retries).
+    """
+
+    def __init__(self, republish, on_failure=None, max_outstanding=MAX_OUTSTANDING,
+                 max_retries=MAX_RETRIES, check_interval=CHECK_INTERVAL):
+        self.republish = republish
+        self.on_failure = on_failure
+        self.max_outstanding = max_outstanding
+        self.max_retries = max_retries
+        self.check_interval = check_interval
+        self._outstanding = OrderedDict()  # {message_id: [type, payload, first send, deadline, timeout, retries]}
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+        self.acked = 0
+        self.retransmitted = 0
+        self.failed = 0
+
+    def __len__(self):
+        return len(self._outstanding)
+
+    def track(self, message_id, command_type, payload, timeout=ACK_TIMEOUT, sent_at=None):
+        sent_at = time.time() if sent_at is None else sent_at
+        evicted = None
+        with self._lock:
+            self._outstanding[message_id] = [command_type, payload, sent_at, sent_at + timeout, timeout, 0]
+            if len(self._outstanding) > self.max_outstanding:
+                evicted = self._outstanding.popitem(last=False)
+                self.failed += 1
+        if evicted and self.on_failure:
+            old_id, entry = evicted
+            self.on_failure(old_id, entry[0], "evicted", entry[5])
+
+    def ack(self, message_id, receive_time=None):
+        """Returns (command_type, rtt in seconds, retries), or None for unknown/duplicate acks"""
+        receive_time = time.time() if receive_time is None else receive_time
+        with self._lock:
+            entry = self._outstanding.pop(message_id, None)
+            if entry is None:
+                return None
+            self.acked += 1
+        return entry[0], receive_time - entry[2], entry[5]
+
+    def check(self, now=None):
+        """Retransmit or give up on every command past its deadline"""
+        now = time.time() if now is None else now
+        resend, failed = [], []
+        with self._lock:
+            for message_id, entry in list(self._outstanding.items()):
+                if now < entry[3]:
+                    continue
+                if entry[5] < self.max_retries:
+                    entry[5] += 1
+                    entry[3] = now + entry[4]
+                    resend.append(entry[1])
+                    self.retransmitted += 1
+                else:
+                    del self._outstanding[message_id]
+                    failed.append((message_id, entry[0], entry[5]))
+                    self.failed += 1
+        # Publish and report outside the lock, paho may block
+        for payload in resend:
+            self.republish(payload)
+        if self.on_failure:
+            for message_id, command_type, retries in failed:
+                self.on_failure(message_id, command_type, "timeout", retries)
+
+    def _loop(self):
+        while self._running:
+            self.check()
+            time.sleep(self.check_interval)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
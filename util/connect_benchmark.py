@@ -0,0 +1,202 @@
+import os
+import ssl
+import json
+import time
+import socket
+import struct
+import argparse
+import datetime
+import statistics
+
+BROKER = "127.0.0.1"
+PORT_NO_TLS = 1883
+# name: (broker TLS port, CA, client certificate, client key). The ecdsa and ed25519
+# profiles are what `util/creation_certs.sh <profile> <profile>` installs, each behind its own listener
+PROFILES = {
+    'rsa': (8883, "/etc/mosquitto/ca_certificates/ca.crt", "/etc/mosquitto/certs/client.crt", "/etc/mosquitto/certs/client.key"),
+    'ecdsa': (8884, "/etc/mosquitto/ca_certificates/ecdsa/ca.crt", "/etc/mosquitto/certs/ecdsa/client.crt", "/etc/mosquitto/certs/ecdsa/client.key"),
+    'ed25519': (8885, "/etc/mosquitto/ca_certificates/ed25519/ca.crt", "/etc/mosquitto/certs/ed25519/client.crt", "/etc/mosquitto/certs/ed25519/client.key"),
+}
+TLS_VERSIONS = {'1.2': ssl.TLSVersion.TLSv1_2, '1.3': ssl.TLSVersion.TLSv1_3}
+# tls_cpu: client CPU time of the handshake, the part that weighs on the drone's processor
+PHASES = ('tcp', 'tls', 'tls_cpu', 'connack', 'suback', 'total')
+TOPIC = "drone/command"
+DEFAULT_ITERATIONS = 200
+SOCKET_TIMEOUT = 5.0
+
+
+def encode_length(length):
+    """MQTT variable-length 'remaining length'"""
+    out = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        out.append(byte | (0x80 if length else 0))
+        if not length:
+            return bytes(out)
+
+
+def mqtt_string(value):
+    data = value.encode()
+    return struct.pack(">H", len(data)) + data
+
+
+def connect_packet(client_id, keepalive=60):
+    """MQTT 3.1.1 CONNECT with a clean session, as paho sends it by default"""
+    body = mqtt_string("MQTT") + bytes([4, 0x02]) + struct.pack(">H", keepalive) + mqtt_string(client_id)
+    return b"\x10" + encode_length(len(body)) + body
+
+
+def subscribe_packet(topic, packet_id=1, qos=0):
+    body = struct.pack(">H", packet_id) + mqtt_string(topic) + bytes([qos])
+    return b"\x82" + encode_length(len(body)) + body
+
+
+DISCONNECT = b"\xe0\x00"
+
+
+def read_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Broker closed the connection")
+        data += chunk
+    return data
+
+
+def read_packet(sock):
+    """(packet type, body) of the next MQTT packet"""
+    packet_type = read_exactly(sock, 1)[0] >> 4
+    length, shift = 0, 0
+    while True:
+        byte = read_exactly(sock, 1)[0]
+        length |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            break
+    return packet_type, read_exactly(sock, length)
+
+
+def tls_context(ca, cert, key, version):
+    """mTLS client context pinned to one TLS version, same verification as paho's tls_set()"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.load_verify_locations(ca)
+    context.load_cert_chain(cert, key)
+    context.minimum_version = context.maximum_version = TLS_VERSIONS[version]
+    return context
+
+
+def connect_once(port, context=None, host=BROKER, topic=TOPIC):
+    """
+    Seconds spent in each phase of one connection: TCP connect, TLS
+    handshake (0 without TLS), CONNECT -> CONNACK, SUBSCRIBE -> SUBACK.
+    Every iteration is a full handshake: like paho, no TLS session is
+    resumed. With TLS 1.3 the broker checks the client certificate after
+    the client considers the handshake done, so part of that cost shows up
+    in the CONNACK phase.
+    """
+    start = time.perf_counter()
+    sock = socket.create_connection((host, port), timeout=SOCKET_TIMEOUT)
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        tcp_done = time.perf_counter()
+        cpu_start = time.thread_time()
+        if context:
+            sock = context.wrap_socket(sock, server_hostname=host)
+        tls_cpu = time.thread_time() - cpu_start
+        tls_done = time.perf_counter()
+        sock.sendall(connect_packet(f"bench-{os.getpid()}"))
+        packet_type, body = read_packet(sock)
+        if packet_type != 2 or body[1] != 0:
+            raise ConnectionError(f"Connection refused (packet type {packet_type}, return code {body[1] if len(body) > 1 else '?'})")
+        connack_done = time.perf_counter()
+        sock.sendall(subscribe_packet(topic))
+        packet_type, body = read_packet(sock)
+        if packet_type != 9 or body[2] == 0x80:
+            raise ConnectionError("Subscription refused")
+        suback_done = time.perf_counter()
+        sock.sendall(DISCONNECT)
+    finally:
+        sock.close()
+    return {
+        'tcp': tcp_done - start,
+        'tls': tls_done - tcp_done,
+        'tls_cpu': tls_cpu,
+        'connack': connack_done - tls_done,
+        'suback': suback_done - connack_done,
+        'total': suback_done - start,
+    }
+
+
+def run(port, context, iterations, pause=0.0):
+    """{phase: [ms per iteration]}"""
+    samples = {phase: [] for phase in PHASES}
+    for _ in range(iterations):
+        for phase, seconds in connect_once(port, context).items():
+            samples[phase].append(seconds * 1000)
+        if pause:
+            time.sleep(pause)
+    return samples
+
+
+def distribution(values):
+    ordered = sorted(values)
+    at = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {'mean': statistics.fmean(ordered), 'p50': at(0.5), 'p90': at(0.9), 'p99': at(0.99), 'max': ordered[-1]}
+
+
+def parse_profile(text):
+    """name=port:ca:cert:key, for a broker listener serving another certificate type"""
+    name, _, spec = text.partition('=')
+    port, ca, cert, key = spec.split(':')
+    return name, (int(port), ca, cert, key)
+
+
+def result_path(directory="logs", now=None):
+    now = now or datetime.datetime.now()
+    return os.path.join(directory, f"connect_benchmark_{now:%Y-%m-%d_%H%M%S}.json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Time TCP connect, TLS handshake, CONNACK and SUBACK of repeated MQTT connections')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help='Connections per configuration')
+    parser.add_argument('--profiles', default=','.join(PROFILES), help=f'Certificate profiles to run (default: {",".join(PROFILES)})')
+    parser.add_argument('--profile', action='append', default=[], type=parse_profile, metavar='NAME=PORT:CA:CERT:KEY',
+                        help='Add or override a certificate profile')
+    parser.add_argument('--tls-versions', default=','.join(TLS_VERSIONS), help='Comma-separated TLS versions (default: 1.2,1.3)')
+    parser.add_argument('--no-plain', action='store_true', help='Skip the baseline without TLS')
+    parser.add_argument('--pause', type=float, default=0.0, help='Seconds between two connections')
+    args = parser.parse_args()
+
+    profiles = dict(PROFILES)
+    profiles.update(args.profile)
+    configurations = [] if args.no_plain else [('plain', '-', PORT_NO_TLS, None)]
+    names = [p for p in args.profiles.split(',') if p]
+    names += [n for n, _ in args.profile if n not in names]
+    for name in names:
+        port, ca, cert, key = profiles[name]
+        missing = [path for path in (ca, cert, key) if not os.path.exists(path)]
+        if missing:
+            print(f"Skipping {name}: {', '.join(missing)} not found")
+            continue
+        for version in [v for v in args.tls_versions.split(',') if v]:
+            configurations.append((name, version, port, tls_context(ca, cert, key, version)))
+
+    results = {}
+    print(f"{'certs':<8}{'TLS':<5}{'phase':<9}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}  (ms)")
+    for name, version, port, context in configurations:
+        try:
+            samples = run(port, context, args.iterations, args.pause)
+        except (OSError, ssl.SSLError, ConnectionError) as e:
+            print(f"{name:<8}{version:<5}failed: {e}")
+            continue
+        stats = {phase: distribution(values) for phase, values in samples.items()}
+        results[f"{name}/{version}"] = {'port': port, 'stats': stats, 'samples': samples}
+        for phase, d in stats.items():
+            print(f"{name:<8}{version:<5}{phase:<9}{d['mean']:>9.3f}{d['p50']:>9.3f}{d['p90']:>9.3f}{d['p99']:>9.3f}{d['max']:>9.3f}")
+
+    path = result_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'iterations': args.iterations, 'results': results}, f, indent=2)
+    print(f"\nResults written to {path}")
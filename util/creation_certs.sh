@@ -1,9 +1,31 @@
 #!/usr/bin/env bash
 set -euo pipefail
 
+# Uso: creation_certs.sh [rsa|ecdsa|ed25519] [sottocartella]
+#   Senza sottocartella i certificati sostituiscono quelli usati dai client
+#   (stessi percorsi, nessuna modifica al codice). Con una sottocartella
+#   (es. "ecdsa") vengono installati accanto, per il benchmark degli handshake.
+PROFILE="${1:-rsa}"
+SUBDIR="${2:-}"
+
+# Algoritmo delle chiavi (CA, broker e client usano lo stesso profilo)
+DIGEST="-sha256"
+case "$PROFILE" in
+  rsa)     KEYGEN=(-algorithm RSA -pkeyopt rsa_keygen_bits:2048) ;;
+  ecdsa)   KEYGEN=(-algorithm EC -pkeyopt ec_paramgen_curve:P-256 -pkeyopt ec_param_enc:named_curve) ;;
+  ed25519) KEYGEN=(-algorithm ED25519)
+           # Ed25519 firma senza digest separato
+           DIGEST="" ;;
+  *) echo "Profilo sconosciuto: $PROFILE (rsa, ecdsa, ed25519)" >&2; exit 1 ;;
+esac
+if ! openssl genpkey "${KEYGEN[@]}" -out /dev/null 2>/dev/null; then
+  echo "Profilo $PROFILE non supportato da $(openssl version)" >&2
+  exit 1
+fi
+
 # Directory destinazione
-CA_DIR="/etc/mosquitto/ca_certificates"
-CERTS_DIR="/etc/mosquitto/certs"
+CA_DIR="/etc/mosquitto/ca_certificates${SUBDIR:+/$SUBDIR}"
+CERTS_DIR="/etc/mosquitto/certs${SUBDIR:+/$SUBDIR}"
 TMPDIR="$(mktemp -d)"
 
 echo "✔ Creazione cartelle se non esistono"
@@ -11,13 +33,14 @@ sudo mkdir -p "$CA_DIR" "$CERTS_DIR"
 sudo chown root:mosquitto "$CA_DIR" "$CERTS_DIR"
 sudo chmod 750 "$CA_DIR" "$CERTS_DIR"
 
+echo "✔ Profilo: $PROFILE"
 echo "✔ Lavoro in: $TMPDIR"
 cd "$TMPDIR"
 
 # 1) CA
 echo "1) Generazione CA"
-openssl genpkey -algorithm RSA -out ca.key
-openssl req -x509 -new -nodes -key ca.key -sha256 -days 3650 -out ca.crt \
+openssl genpkey "${KEYGEN[@]}" -out ca.key
+openssl req -x509 -new -nodes -key ca.key $DIGEST -days 3650 -out ca.crt \
   -subj "/C=IT/ST=Italy/L=Rome/O=MyMQTT/CN=MyCA"
 
 echo "→ Installazione CA in $CA_DIR"
@@ -28,9 +51,7 @@ sudo install -o root -g mosquitto -m 640 ca.key  "$CA_DIR/ca.key"
 echo "2) Generazione broker cert (con SAN)"
 cat > broker.cnf <<EOF
 [req]
-default_bits       = 2048
 prompt             = no
-default_md         = sha256
 distinguished_name = dn
 req_extensions     = req_ext
 
@@ -49,10 +70,10 @@ IP.1  = 127.0.0.1
 DNS.1 = localhost
 EOF
 
-openssl genpkey -algorithm RSA -out broker.key
-openssl req -new -key broker.key -out broker.csr -config broker.cnf
+openssl genpkey "${KEYGEN[@]}" -out broker.key
+openssl req -new -key broker.key $DIGEST -out broker.csr -config broker.cnf
 openssl x509 -req -in broker.csr -CA ca.crt -CAkey ca.key -CAcreateserial \
-    -out broker.crt -days 1095 -sha256 -extensions req_ext -extfile broker.cnf
+    -out broker.crt -days 1095 $DIGEST -extensions req_ext -extfile broker.cnf
 
 echo "→ Installazione Broker cert in $CERTS_DIR"
 sudo install -o root -g mosquitto -m 640 broker.crt  "$CERTS_DIR/broker.crt"
@@ -60,11 +81,11 @@ sudo install -o root -g mosquitto -m 640 broker.key  "$CERTS_DIR/broker.key"
 
 # 3) Client
 echo "3) Generazione client cert"
-openssl genpkey -algorithm RSA -out client.key
-openssl req -new -key client.key -out client.csr \
+openssl genpkey "${KEYGEN[@]}" -out client.key
+openssl req -new -key client.key $DIGEST -out client.csr \
   -subj "/C=IT/ST=Italy/L=Rome/O=MyMQTT/CN=client"
 openssl x509 -req -in client.csr -CA ca.crt -CAkey ca.key -CAcreateserial \
-    -out client.crt -days 1095 -sha256
+    -out client.crt -days 1095 $DIGEST
 
 echo "→ Installazione Client cert in $CERTS_DIR"
 sudo install -o root -g mosquitto -m 640 client.crt  "$CERTS_DIR/client.crt"
@@ -74,17 +95,22 @@ sudo install -o root -g mosquitto -m 640 client.key  "$CERTS_DIR/client.key"
 cd /
 rm -rf "$TMPDIR"
 
-echo "✔ Tutti i certificati sono stati generati e piazzati in:"
+echo "✔ Tutti i certificati ($PROFILE) sono stati generati e piazzati in:"
 echo "    CA:     $CA_DIR/ca.crt, ca.key"
 echo "    Broker: $CERTS_DIR/broker.crt, broker.key"
 echo "    Client: $CERTS_DIR/client.crt, client.key"
 echo
 echo "Ricordati di configurare mosquitto.conf con:"
-echo "  cafile /etc/mosquitto/ca_certificates/ca.crt"
-echo "  certfile /etc/mosquitto/certs/broker.crt"
-echo "  keyfile  /etc/mosquitto/certs/broker.key"
+echo "  cafile $CA_DIR/ca.crt"
+echo "  certfile $CERTS_DIR/broker.crt"
+echo "  keyfile  $CERTS_DIR/broker.key"
 echo
 echo "E, lato client, di usare:"
-echo "  cafile=/etc/mosquitto/ca_certificates/ca.crt"
-echo "  certfile=/etc/mosquitto/certs/client.crt"
-echo "  keyfile=/etc/mosquitto/certs/client.key"
+echo "  cafile=$CA_DIR/ca.crt"
+echo "  certfile=$CERTS_DIR/client.crt"
+echo "  keyfile=$CERTS_DIR/client.key"
+if [ -n "$SUBDIR" ]; then
+  echo
+  echo "Per il benchmark degli handshake (python -m util.connect_benchmark),"
+  echo "aggiungi un listener dedicato (per_listener_settings true) con questi file."
+fi
@@ -0,0 +1,160 @@
+import os
+import ssl
+import json
+import time
+import struct
+import argparse
+import datetime
+import threading
+
+import paho.mqtt.client as mqtt
+
+from util.payload_crypto import PayloadCipher, ALGORITHMS
+
+BROKER = "127.0.0.1"
+PORT_TLS = 8883
+PORT_NO_TLS = 1883
+CERT_CA = "/etc/mosquitto/ca_certificates/ca.crt"
+CERT_FILE = "/etc/mosquitto/certs/client.crt"
+KEY_FILE = "/etc/mosquitto/certs/client.key"
+TOPIC = "bench/crypto"
+
+MODES = ('plain', 'tls', 'aead', 'tls+aead')
+# Payload sizes in bytes: a command, a telemetry frame, a batch, a large blob
+DEFAULT_SIZES = (64, 256, 1024, 4096, 16384)
+DEFAULT_COUNT = 500
+# A message not echoed back by the broker within this time is counted as lost
+RECEIVE_TIMEOUT = 2.0
+# The send time travels in the first 8 bytes of every payload
+STAMP = struct.Struct(">d")
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] if ordered else 0.0
+
+
+def cipher_cost(algorithm, sizes, count):
+    """{size: (seal µs, open µs)} per message, in-process, no network"""
+    key = os.urandom(32)
+    sender = PayloadCipher.for_drone(key, algorithm)
+    receiver = PayloadCipher.for_ground_station(key, algorithm)
+    results = {}
+    for size in sizes:
+        plaintext = os.urandom(size)
+        start = time.perf_counter()
+        sealed = [sender.seal(plaintext) for _ in range(count)]
+        seal_done = time.perf_counter()
+        for payload in sealed:
+            receiver.open(payload)
+        open_done = time.perf_counter()
+        results[size] = ((seal_done - start) / count * 1e6, (open_done - seal_done) / count * 1e6)
+    return results
+
+
+class LoopbackClient:
+    """
+    Publishes to a topic it is subscribed to and waits for each message to
+    come back through the broker before sending the next one, so every
+    sample is one uncontended publish -> broker -> deliver round trip.
+    """
+
+    def __init__(self, use_tls, cipher=None):
+        self.cipher = cipher
+        self.latencies = []
+        self.lost = 0
+        self._received = threading.Event()
+        self._connected = threading.Event()
+        self.client = mqtt.Client()
+        if use_tls:
+            self.client.tls_set(ca_certs=CERT_CA, certfile=CERT_FILE, keyfile=KEY_FILE,
+                                tls_version=ssl.PROTOCOL_TLSv1_2)
+        self.client.on_connect = lambda client, userdata, flags, rc: client.subscribe(TOPIC) if rc == 0 else None
+        self.client.on_subscribe = lambda client, userdata, mid, qos: self._connected.set()
+        self.client.on_message = self._on_message
+        self.client.connect(BROKER, PORT_TLS if use_tls else PORT_NO_TLS, 60)
+        self.client.loop_start()
+        if not self._connected.wait(5.0):
+            self.close()
+            raise ConnectionError(f"No SUBACK from {BROKER} ({'TLS' if use_tls else 'plain'})")
+
+    def _on_message(self, client, userdata, message):
+        payload = self.cipher.open(message.payload) if self.cipher else message.payload
+        self.latencies.append(time.perf_counter() - STAMP.unpack_from(payload)[0])
+        self._received.set()
+
+    def run(self, size, count):
+        """(p50 ms, p99 ms, CPU µs per message, lost) for `count` round trips of `size`-byte payloads"""
+        self.latencies = []
+        self.lost = 0
+        padding = os.urandom(max(size - STAMP.size, 0))
+        cpu_start = time.process_time()
+        for _ in range(count):
+            self._received.clear()
+            payload = STAMP.pack(time.perf_counter()) + padding
+            self.client.publish(TOPIC, self.cipher.seal(payload) if self.cipher else payload)
+            if not self._received.wait(RECEIVE_TIMEOUT):
+                self.lost += 1
+        cpu = (time.process_time() - cpu_start) / count * 1e6
+        latencies_ms = [v * 1000 for v in self.latencies]
+        return percentile(latencies_ms, 50), percentile(latencies_ms, 99), cpu, self.lost
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+def run_modes(modes, algorithm, sizes, count):
+    """{mode: {size: [p50 ms, p99 ms, CPU µs/msg, lost]}}"""
+    key = os.urandom(32)
+    results = {}
+    for mode in modes:
+        # One key for both directions of the loopback: the client opens what it sealed
+        cipher = PayloadCipher(key, algorithm, b"bench", b"bench") if 'aead' in mode else None
+        client = LoopbackClient(mode.startswith('tls'), cipher)
+        try:
+            client.run(sizes[0], min(count, 50))  # Warm-up
+            results[mode] = {size: list(client.run(size, count)) for size in sizes}
+        finally:
+            client.close()
+    return results
+
+
+def result_path(directory="logs", now=None):
+    now = now or datetime.datetime.now()
+    return os.path.join(directory, f"crypto_benchmark_{now:%Y-%m-%d_%H%M%S}.json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Per-message cost of TLS and application-layer AEAD (plain, tls, aead, tls+aead)')
+    parser.add_argument('--modes', default=','.join(MODES), help=f'Comma-separated modes to run through the broker (default: {",".join(MODES)})')
+    parser.add_argument('--aead', choices=list(ALGORITHMS), default='aes-gcm', help='AEAD algorithm (default: aes-gcm)')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES), help='Comma-separated payload sizes in bytes')
+    parser.add_argument('--count', type=int, default=DEFAULT_COUNT, help='Messages per mode and size')
+    parser.add_argument('--offline', action='store_true', help='Only measure the seal/open cost of both algorithms, without a broker')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    print(f"{'algorithm':<10}{'size':>8}{'seal µs':>10}{'open µs':>10}")
+    for algorithm in ALGORITHMS:
+        for size, (seal_us, open_us) in cipher_cost(algorithm, sizes, args.count * 10).items():
+            print(f"{algorithm:<10}{size:>8}{seal_us:>10.2f}{open_us:>10.2f}")
+    if args.offline:
+        raise SystemExit(0)
+
+    modes = [m for m in args.modes.split(',') if m]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"Unknown modes: {', '.join(sorted(unknown))}")
+    results = run_modes(modes, args.aead, sizes, args.count)
+
+    print(f"\n{'mode':<10}{'size':>8}{'p50 ms':>10}{'p99 ms':>10}{'CPU µs/msg':>12}{'lost':>6}")
+    for mode, per_size in results.items():
+        for size, (p50, p99, cpu, lost) in per_size.items():
+            print(f"{mode:<10}{size:>8}{p50:>10.3f}{p99:>10.3f}{cpu:>12.1f}{lost:>6}")
+
+    path = result_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'aead': args.aead, 'count': args.count, 'results': results}, f, indent=2)
+    print(f"\nResults written to {path}")
@@ -0,0 +1,196 @@
+import os
+import re
+import glob
+import time
+import queue
+import atexit
+import logging
+import argparse
+import datetime
+import threading
+
+import numpy as np
+
+from util.telemetry_history import TELEMETRY_FIELDS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+RECORDINGS_DIR = "recordings"
+# A chunk is written when a (vehicle, type) buffer holds this many rows or its oldest row is this old
+FLUSH_ROWS = 5000
+FLUSH_INTERVAL = 10.0  # seconds
+# Columns present for every message type
+BASE_COLUMNS = ('recv_time', 'timestamp', 'backlog')
+# Vehicle IDs and message types become directory names: nothing else is accepted
+SAFE_NAME = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def safe_name(value, fallback='unknown'):
+    """`value` if it is usable as a path component, else `fallback`"""
+    return value if isinstance(value, str) and SAFE_NAME.fullmatch(value) else fallback
+
+
+def session_dir(use_tls, directory=RECORDINGS_DIR, now=None):
+    """recordings/<date>_<time>_<tls>, one directory per ground station run"""
+    now = now or datetime.datetime.now()
+    return os.path.join(directory, f"{now:%Y-%m-%d_%H%M%S}_{'with_tls' if use_tls else 'no_tls'}")
+
+
+class FlightRecorder:
+    """
+    Records decoded telemetry as columnar chunks:
+    <session>/<vehicle>/<type>/chunk_<seq>.parquet (or .npz without pyarrow).
+
+    record() only puts a reference on a queue, so on_message pays for one
+    queue.put(). A writer thread appends the rows to per-(vehicle, type)
+    column lists and writes a chunk when a buffer reaches `flush_rows` rows
+    or `flush_interval` seconds. Columns are the numeric fields of the type
+    (TELEMETRY_FIELDS), plus receive time, drone timestamp and a backlog flag
+    for messages replayed from the drone's spool.
+    """
+
+    def __init__(self, directory, flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL, use_parquet=None):
+        self.directory = directory
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.use_parquet = (pq is not None) if use_parquet is None else use_parquet
+        self.rows_written = 0
+        self._queue = queue.SimpleQueue()
+        self._buffers = {}  # {(vehicle, type): (first row time, {column: list})}
+        self._chunks = {}   # {(vehicle, type): next chunk number}
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, vehicle_id, telemetry_data, receive_time, backlog=False):
+        self._queue.put((vehicle_id, telemetry_data, receive_time, backlog))
+
+    def _columns(self, message_type, telemetry_data):
+        fields = TELEMETRY_FIELDS.get(message_type)
+        if fields is None:
+            # Unknown type: every numeric field of its first message
+            fields = tuple(k for k, v in telemetry_data.items()
+                           if isinstance(v, (int, float)) and not isinstance(v, bool) and k not in BASE_COLUMNS)
+        return BASE_COLUMNS + fields
+
+    def _append(self, vehicle_id, telemetry_data, receive_time, backlog):
+        message_type = safe_name(telemetry_data.get('type'))
+        key = (safe_name(vehicle_id), message_type)
+        entry = self._buffers.get(key)
+        if entry is None:
+            entry = self._buffers[key] = (receive_time, {c: [] for c in self._columns(message_type, telemetry_data)})
+        columns = entry[1]
+        for name, values in columns.items():
+            if name == 'recv_time':
+                values.append(receive_time)
+            elif name == 'backlog':
+                values.append(backlog)
+            else:
+                value = telemetry_data.get(name)
+                values.append(np.nan if value is None else value)
+        if len(columns['recv_time']) >= self.flush_rows:
+            self._flush(key)
+
+    def _flush(self, key):
+        # The buffer is only dropped once its chunk is written, a failed write is retried
+        _, columns = self._buffers[key]
+        arrays = {name: np.asarray(values, dtype=np.bool_ if name == 'backlog' else np.float64)
+                  for name, values in columns.items()}
+        vehicle_id, message_type = key
+        chunk_dir = os.path.join(self.directory, vehicle_id, message_type)
+        os.makedirs(chunk_dir, exist_ok=True)
+        seq = self._chunks.get(key, 0)
+        path = os.path.join(chunk_dir, f"chunk_{seq:06d}")
+        if self.use_parquet:
+            pq.write_table(pa.table(arrays), path + ".parquet")
+        else:
+            np.savez(path + ".npz", **arrays)
+        self._chunks[key] = seq + 1
+        del self._buffers[key]
+        self.rows_written += len(arrays['recv_time'])
+
+    def _flush_due(self, now, force=False):
+        for key, (first_time, _) in list(self._buffers.items()):
+            if force or now - first_time >= self.flush_interval:
+                self._flush(key)
+
+    def _loop(self):
+        while self._running or not self._queue.empty():
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                item = None
+            try:
+                if item:
+                    self._append(*item)
+                self._flush_due(time.time())
+            except Exception:
+                logging.getLogger(__name__).exception("Flight recorder error")
+        self._flush_due(0, force=True)
+
+    def close(self):
+        """Write everything still buffered"""
+        if not self._running:
+            return
+        self._running = False
+        self._thread.join(timeout=10.0)
+
+
+def load_chunks(chunk_dir):
+    """Concatenate the chunks of one (vehicle, type) into {column: array}, sorted by drone timestamp"""
+    paths = sorted(glob.glob(os.path.join(chunk_dir, "chunk_*.parquet")) + glob.glob(os.path.join(chunk_dir, "chunk_*.npz")))
+    parts = []
+    for path in paths:
+        if path.endswith(".parquet"):
+            if pq is None:
+                raise ValueError(f"pyarrow is required to read {path}, pip install pyarrow")
+            table = pq.read_table(path)
+            parts.append({name: table.column(name).to_numpy() for name in table.column_names})
+        else:
+            with np.load(path) as npz:
+                parts.append({name: npz[name] for name in npz.files})
+    if not parts:
+        return {}
+    names = [name for name in parts[0] if all(name in p for p in parts)]
+    data = {name: np.concatenate([p[name] for p in parts]) for name in names}
+    # Backlog replays arrive after live frames sent later: restore the flight order
+    order = np.argsort(data['timestamp'], kind='stable')
+    return {name: values[order] for name, values in data.items()}
+
+
+def load_flight(session, vehicle_id=None, message_type=None):
+    """{(vehicle, type): {column: array}} for a recorded session, optionally for one vehicle and/or type"""
+    flight = {}
+    for chunk_dir in sorted(glob.glob(os.path.join(session, vehicle_id or "*", message_type or "*"))):
+        if os.path.isdir(chunk_dir):
+            vehicle, msg_type = chunk_dir.split(os.sep)[-2:]
+            flight[(vehicle, msg_type)] = load_chunks(chunk_dir)
+    return flight
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Summarize a flight recorded by ground_station.py')
+    parser.add_argument('session', nargs='?', help='Session directory (default: latest in recordings/)')
+    args = parser.parse_args()
+
+    session = args.session
+    if session is None:
+        sessions = sorted(glob.glob(os.path.join(RECORDINGS_DIR, "*")))
+        if not sessions:
+            parser.error(f"No recordings in {RECORDINGS_DIR}/")
+        session = sessions[-1]
+
+    print(f"Session {session}")
+    for (vehicle, msg_type), data in load_flight(session).items():
+        if not data:
+            continue
+        t = data['timestamp'] / 1000
+        duration = t[-1] - t[0]
+        print(f"  {vehicle:<10} {msg_type:<10} {len(t):>8} rows, {duration:>8.1f}s "
+              f"({len(t) / duration if duration > 0 else 0:.1f} Hz), {int(data['backlog'].sum())} from backlog, "
+              f"columns: {', '.join(data)}")
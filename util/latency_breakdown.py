@@ -0,0 +1,121 @@
+import os
+import argparse
+
+import matplotlib
+matplotlib.use("Agg")  # Headless rendering, no display needed
+import matplotlib.pyplot as plt
+import numpy as np
+
+from util.timing_log import parse_stages
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSETS_DIR = os.path.join(PROJECT_DIR, "assets")
+
+# Origin stage of a message: MAVLink receipt for telemetry, creation for commands
+ORIGIN_STAGES = ('mavlink_recv', 'created')
+
+# (component, from stage, to stage), in path order
+SEGMENTS = (
+    ('prepare', 'origin', 'encode_done'),       # Sender: build + JSON encode
+    ('publish', 'encode_done', 'publish_done'),  # Sender: timing log + hand-off to paho
+    ('transport', 'publish_done', 'recv'),       # paho queue, TLS, network and broker
+    ('decode', 'recv', 'decode_done'),           # Receiver: JSON decode
+    ('handler', 'decode_done', 'handler_done'),  # Receiver: state update / MAVLink send
+)
+
+
+def load_stages(filepath):
+    """
+    Join the STAGES lines written by both endpoints by message ID.
+    Returns {msg_id: (msg_type, {stage: timestamp})}; the type is the one given by the sender.
+    """
+    messages = {}
+    with open(filepath, 'r') as f:
+        for line in f:
+            parsed = parse_stages(line)
+            if not parsed:
+                continue
+            _source, msg_id, msg_type, stages = parsed
+            for origin in ORIGIN_STAGES:
+                if origin in stages:
+                    stages['origin'] = stages.pop(origin)
+            if msg_id in messages:
+                prev_type, prev_stages = messages[msg_id]
+                prev_stages.update(stages)
+                if 'origin' in stages:
+                    messages[msg_id] = (msg_type, prev_stages)
+            else:
+                messages[msg_id] = (msg_type, stages)
+    return messages
+
+
+def breakdown(messages):
+    """
+    Per message type, the per-component latencies in ms of every message
+    that has all stages: {msg_type: {component: np.array}}.
+    """
+    per_type = {}
+    for msg_type, stages in messages.values():
+        if not all(s in stages for _, start, end in SEGMENTS for s in (start, end)):
+            continue
+        components = per_type.setdefault(msg_type, {name: [] for name, _, _ in SEGMENTS})
+        for name, start, end in SEGMENTS:
+            components[name].append((stages[end] - stages[start]) * 1000)
+    return {t: {name: np.array(values) for name, values in c.items()} for t, c in sorted(per_type.items())}
+
+
+def print_breakdown(label, result):
+    print(f"\n--- {label} ---")
+    header = f"{'type':<18}{'N':>6}" + "".join(f"{name:>12}" for name, _, _ in SEGMENTS) + f"{'total':>12}"
+    print(header + "   (mean ms)")
+    for msg_type, components in result.items():
+        n = len(components[SEGMENTS[0][0]])
+        means = [components[name].mean() for name, _, _ in SEGMENTS]
+        print(f"{msg_type:<18}{n:>6}" + "".join(f"{m:>12.3f}" for m in means) + f"{sum(means):>12.3f}")
+
+
+def plot_breakdown(results, path):
+    """Stacked bar per (message type, log) with the mean of each component"""
+    bars = [(msg_type, label, components)
+            for label, result in results
+            for msg_type, components in result.items()]
+    bars.sort(key=lambda b: (b[0], b[1]))
+
+    fig, ax = plt.subplots(figsize=(max(8, len(bars) * 0.9), 8))
+    x = np.arange(len(bars))
+    bottom = np.zeros(len(bars))
+    for name, _, _ in SEGMENTS:
+        heights = np.array([components[name].mean() for _, _, components in bars])
+        ax.bar(x, heights, bottom=bottom, label=name)
+        bottom += heights
+    ax.set_xticks(x)
+    ax.set_xticklabels([f"{msg_type}\n{label}" for msg_type, label, _ in bars], fontsize=8)
+    ax.set_ylabel("Mean latency (ms)")
+    ax.set_title("End-to-end latency breakdown per message type")
+    ax.legend(loc='upper left')
+    ax.grid(True, axis='y', linestyle='--', linewidth=0.5)
+    fig.savefig(path, bbox_inches='tight')
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Per-stage latency breakdown from STAGES timing log lines')
+    parser.add_argument('logs', nargs='+', help='Timing log files (e.g. a with_tls and a no_tls run)')
+    parser.add_argument('-o', '--output', help='Figure path (default: assets/latency_breakdown_<first log>.png)')
+    args = parser.parse_args()
+
+    results = []
+    for log_path in args.logs:
+        label = os.path.splitext(os.path.basename(log_path))[0].replace("mqtt_timing_", "")
+        result = breakdown(load_stages(log_path))
+        if not result:
+            print(f"No complete STAGES data in {log_path}")
+            continue
+        print_breakdown(label, result)
+        results.append((label, result))
+
+    if results:
+        output = args.output or os.path.join(ASSETS_DIR, f"latency_breakdown_{results[0][0]}.png")
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        plot_breakdown(results, output)
+        print(f"\nGraph saved to: {output}")
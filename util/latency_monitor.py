@@ -0,0 +1,204 @@
+import os
+import sys
+import time
+import argparse
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from util.timing_log import parse_event, timing_log_path
+
+# Readout/plot refresh period in follow mode (seconds)
+REFRESH_INTERVAL = 1.0
+# Maximum number of SEND events waiting for their RECV
+MAX_PENDING = 10000
+# Number of recent latencies kept for the rolling plot and percentiles
+WINDOW_SIZE = 2000
+PERCENTILES = (50, 90, 99)
+
+
+class LogFollower:
+    """
+    Incrementally reads a growing log file, like `tail -F`.
+    Only the bytes appended since the last call are read, so the cost of a
+    poll does not depend on the size of the file. Truncation and rotation
+    (the path pointing to a new inode) are detected and the file is reopened.
+    """
+
+    def __init__(self, path, from_end=False):
+        self.path = path
+        self.from_end = from_end
+        self._file = None
+        self._inode = None
+        self._partial = ""
+
+    def _open(self):
+        try:
+            self._file = open(self.path, 'r')
+        except FileNotFoundError:
+            self._file = None
+            return False
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        if self.from_end:
+            self._file.seek(0, os.SEEK_END)
+            # Only the first open skips existing content, a rotated file is read from the start
+            self.from_end = False
+        return True
+
+    def _reopen_if_replaced(self):
+        """Return True if the file was rotated or truncated and must be read from the start"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if st.st_ino != self._inode:
+            self._file.close()
+            return self._open()
+        if st.st_size < self._file.tell():
+            self._file.seek(0)
+            self._partial = ""
+            return True
+        return False
+
+    def read_lines(self):
+        """Return the list of complete lines appended since the previous call"""
+        if self._file is None and not self._open():
+            return []
+
+        # Drain the current file before checking for rotation so no line is lost
+        data = self._file.read()
+        if self._reopen_if_replaced():
+            data += self._file.read()
+        if not data:
+            return []
+        data = self._partial + data
+        lines = data.split('\n')
+        # The last element is an incomplete line (or "" if data ended with a newline)
+        self._partial = lines.pop()
+        return lines
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class LatencyWindow:
+    """
+    Matches SEND/RECV events into latencies keeping memory bounded:
+    at most `max_pending` unmatched sends (oldest evicted first) and the
+    last `window_size` latencies.
+    """
+
+    def __init__(self, max_pending=MAX_PENDING, window_size=WINDOW_SIZE):
+        self.max_pending = max_pending
+        self.pending = OrderedDict()  # {msg_id: send timestamp}
+        self.latencies = deque(maxlen=window_size)  # (recv timestamp, latency_ms)
+        self.matched = 0
+        self.evicted = 0
+        self.unmatched_recv = 0
+
+    def feed(self, event):
+        event_type, msg_id, _msg_type, timestamp = event
+        if event_type.endswith("-SEND"):
+            self.pending[msg_id] = timestamp
+            if len(self.pending) > self.max_pending:
+                self.pending.popitem(last=False)
+                self.evicted += 1
+        else:
+            send_time = self.pending.pop(msg_id, None)
+            if send_time is None:
+                self.unmatched_recv += 1
+                return
+            self.latencies.append((timestamp, (timestamp - send_time) * 1000))
+            self.matched += 1
+
+    def feed_lines(self, lines):
+        for line in lines:
+            event = parse_event(line)
+            if event:
+                self.feed(event)
+
+    def percentiles(self, percentiles=PERCENTILES):
+        if not self.latencies:
+            return None
+        values = np.fromiter((lat for _, lat in self.latencies), dtype=float, count=len(self.latencies))
+        return dict(zip(percentiles, np.percentile(values, percentiles)))
+
+    def readout(self):
+        stats = self.percentiles()
+        if stats is None:
+            return f"Matched: {self.matched} | Pending: {len(self.pending)} | No latency data yet"
+        pct = " ".join(f"p{p}: {v:.2f}ms" for p, v in stats.items())
+        return (f"Matched: {self.matched} | Pending: {len(self.pending)} | "
+                f"Window: {len(self.latencies)} | {pct}")
+
+
+def follow(path, from_end=False, plot=True):
+    """Tail the timing log and refresh the rolling plot/percentile readout every second"""
+    follower = LogFollower(path, from_end=from_end)
+    window = LatencyWindow()
+
+    if plot:
+        import matplotlib.pyplot as plt
+        plt.ion()
+        fig, ax = plt.subplots(figsize=(14, 6))
+        line, = ax.plot([], [], linestyle='-', linewidth=1)
+        ax.set_xlabel("Seconds ago")
+        ax.set_ylabel("Latency (ms)")
+        ax.grid(True, which='both', linestyle='--', linewidth=0.5)
+
+    print(f"Following {path} (Ctrl+C to stop)")
+    try:
+        while True:
+            next_refresh = time.monotonic() + REFRESH_INTERVAL
+            window.feed_lines(follower.read_lines())
+
+            readout = window.readout()
+            print(f"\033[2K\r{readout}", end='')
+            sys.stdout.flush()
+
+            if plot:
+                if window.latencies:
+                    now = window.latencies[-1][0]
+                    xs = [ts - now for ts, _ in window.latencies]
+                    ys = [lat for _, lat in window.latencies]
+                    line.set_data(xs, ys)
+                    ax.relim()
+                    ax.autoscale_view()
+                ax.set_title(readout, fontsize=9)
+                plt.pause(max(0.01, next_refresh - time.monotonic()))
+            else:
+                time.sleep(max(0.0, next_refresh - time.monotonic()))
+    except KeyboardInterrupt:
+        print()
+    finally:
+        follower.close()
+
+
+def summarize(path):
+    """One-shot pass over the whole log file"""
+    window = LatencyWindow(max_pending=sys.maxsize, window_size=None)
+    with open(path, 'r') as f:
+        window.feed_lines(f)
+    print(window.readout())
+    if window.pending:
+        print(f"  Unmatched SEND events remaining: {len(window.pending)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='MQTT timing log latency monitor')
+    parser.add_argument('logfile', nargs='?', help='Timing log to read (default: today\'s log)')
+    parser.add_argument('--no-tls', action='store_true', help='Use today\'s no_tls log when no logfile is given')
+    parser.add_argument('--follow', action='store_true', help='Keep reading the log as it grows')
+    parser.add_argument('--from-end', action='store_true', help='In follow mode, skip content already in the log')
+    parser.add_argument('--no-plot', action='store_true', help='In follow mode, only print the percentile readout')
+    args = parser.parse_args()
+
+    log_path = args.logfile or timing_log_path(not args.no_tls)
+    if args.follow:
+        follow(log_path, from_end=args.from_end, plot=not args.no_plot)
+    elif os.path.exists(log_path):
+        summarize(log_path)
+    else:
+        print(f"File not found: {log_path}")
@@ -0,0 +1,132 @@
+import time
+import threading
+
+from pymavlink import mavutil
+
+# Default time to wait for the vehicle to confirm one step (seconds)
+DEFAULT_TIMEOUT = 3.0
+
+
+class PendingCommand:
+    """One step waiting for the vehicle: resolved by the reader thread, waited on by the sender"""
+
+    def __init__(self, tracker, name, match):
+        self.tracker = tracker
+        self.name = name
+        self.match = match
+        self.ok = None
+        self.detail = None
+        self.created = time.time()
+        self.resolved_at = None
+        self._event = threading.Event()
+
+    def resolve(self, ok, detail):
+        self.ok = ok
+        self.detail = detail
+        self.resolved_at = time.time()
+        self._event.set()
+
+    @property
+    def elapsed(self):
+        return (self.resolved_at or time.time()) - self.created
+
+    def wait(self, timeout=DEFAULT_TIMEOUT):
+        """True once the vehicle confirmed the step, False if it refused it or did not answer in time"""
+        if not self._event.wait(timeout):
+            self.tracker.discard(self)
+            self.resolve(False, f"no confirmation after {timeout:g}s")
+        return self.ok
+
+
+class MavlinkCommandTracker:
+    """
+    Correlates MAVLink commands with the messages that confirm them.
+
+    The telemetry loop is the only reader of the connection, so instead of
+    a second recv_match() the sender registers what it expects with
+    expect() before sending, and the reader passes every message to feed().
+    A matcher returns None for unrelated messages and (ok, detail) for the
+    one that settles the step. Matchers only accept messages from the target
+    system, and messages read before a step was registered are not offered
+    to it, so a late answer to an earlier step cannot confirm a new one.
+    """
+
+    def __init__(self):
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def expect(self, name, match):
+        pending = PendingCommand(self, name, match)
+        with self._lock:
+            self._pending.append(pending)
+        return pending
+
+    def resolved(self, name, detail):
+        """A step that needs no MAVLink exchange (already in effect), settled immediately"""
+        pending = PendingCommand(self, name, None)
+        pending.resolve(True, detail)
+        return pending
+
+    def discard(self, pending):
+        with self._lock:
+            if pending in self._pending:
+                self._pending.remove(pending)
+
+    def feed(self, msg, receive_time=None):
+        """Called by the reader for every received message, `receive_time` is when its batch was read"""
+        if not self._pending:
+            return
+        resolved = []
+        with self._lock:
+            for pending in self._pending:
+                if receive_time is not None and receive_time < pending.created:
+                    continue
+                result = pending.match(msg)
+                if result is not None:
+                    resolved.append((pending, result))
+            for pending, _ in resolved:
+                self._pending.remove(pending)
+        for pending, (ok, detail) in resolved:
+            pending.resolve(ok, detail)
+
+
+def result_name(result):
+    entry = mavutil.mavlink.enums['MAV_RESULT'].get(result)
+    return entry.name if entry else str(result)
+
+
+def command_ack(command_id, target_system):
+    """Matches the COMMAND_ACK of a COMMAND_LONG; IN_PROGRESS keeps waiting for the final result"""
+    def match(msg):
+        if msg.get_type() != 'COMMAND_ACK' or msg.command != command_id or msg.get_srcSystem() != target_system:
+            return None
+        if msg.result == mavutil.mavlink.MAV_RESULT_IN_PROGRESS:
+            return None
+        return msg.result == mavutil.mavlink.MAV_RESULT_ACCEPTED, result_name(msg.result)
+    return match
+
+
+def mode_reached(custom_mode, target_system):
+    """Matches the SET_MODE ack, or the first HEARTBEAT of the vehicle reporting the new mode"""
+    def match(msg):
+        msg_type = msg.get_type()
+        if (msg_type == 'COMMAND_ACK' and msg.command == mavutil.mavlink.MAVLINK_MSG_ID_SET_MODE
+                and msg.get_srcSystem() == target_system):
+            return msg.result == mavutil.mavlink.MAV_RESULT_ACCEPTED, result_name(msg.result)
+        if (msg_type == 'HEARTBEAT' and msg.get_srcSystem() == target_system
+                and msg.type != mavutil.mavlink.MAV_TYPE_GCS and msg.custom_mode == custom_mode):
+            return True, "heartbeat"
+        return None
+    return match
+
+
+def mission_ack(target_system):
+    """Matches the MISSION_ACK answering a guided-mode waypoint"""
+    def match(msg):
+        if msg.get_type() != 'MISSION_ACK' or msg.get_srcSystem() != target_system:
+            return None
+        if msg.type == mavutil.mavlink.MAV_MISSION_ACCEPTED:
+            return True, "accepted"
+        entry = mavutil.mavlink.enums['MAV_MISSION_RESULT'].get(msg.type)
+        return False, entry.name if entry else str(msg.type)
+    return match
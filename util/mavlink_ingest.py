@@ -0,0 +1,63 @@
+import select
+import importlib.util
+
+# Bytes read from the socket per recv() call, and at most per wakeup so one
+# burst cannot delay the handlers indefinitely
+READ_CHUNK = 16384
+MAX_BATCH_BYTES = 262144
+
+
+def native_parser_available():
+    """pymavlink's C parser (mavnative) is an optional build, only used for MAVLink 1"""
+    return importlib.util.find_spec("mavnative") is not None
+
+
+class BatchReader:
+    """
+    Reads everything available on the MAVLink link per wakeup.
+
+    read_batch() waits until the socket is readable, then drains it in large
+    recv() calls and lets parse_buffer() turn every complete frame into a
+    message; a partial frame stays in the parser until the next wakeup. Each
+    message goes through the connection's post_message() bookkeeping, as
+    recv_match() would do, so target_system, connection.messages and
+    heartbeat tracking keep working. Links without a selectable file
+    descriptor fall back to one recv_match() per batch.
+    """
+
+    def __init__(self, connection, read_chunk=READ_CHUNK, max_batch_bytes=MAX_BATCH_BYTES):
+        self.connection = connection
+        self.read_chunk = read_chunk
+        self.max_batch_bytes = max_batch_bytes
+        self.fd = getattr(connection, 'fd', None)
+        self.batches = 0
+        self.messages = 0
+
+    def read_batch(self, timeout=1.0):
+        """Every message received since the last call (waiting up to `timeout` for the first one)"""
+        if self.fd is None:
+            msg = self.connection.recv_match(blocking=True, timeout=timeout)
+            return [msg] if msg else []
+
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+
+        conn = self.connection
+        batch = []
+        total = 0
+        while total < self.max_batch_bytes:
+            conn.pre_message()
+            data = conn.recv(self.read_chunk)
+            if not data:
+                break
+            total += len(data)
+            for msg in conn.mav.parse_buffer(data) or ():
+                conn.post_message(msg)
+                batch.append(msg)
+            if len(data) < self.read_chunk:
+                # Socket drained
+                break
+        self.batches += 1
+        self.messages += len(batch)
+        return batch
@@ -0,0 +1,135 @@
+import re
+import time
+import argparse
+from collections import Counter
+
+from pymavlink import mavutil
+
+# Seconds between two DRONE-LINK statistics lines
+STATS_INTERVAL = 10.0
+
+LINK_PATTERN = re.compile(
+    r"DRONE-LINK: streams (\S+) - ([\d.]+) B/s, ([\d.]+) msg/s, decode CPU ([\d.]+)%"
+)
+
+
+def required_streams(telemetry_types, telemetry_streams, internal_streams):
+    """
+    {MAVLink message name: Hz} needed to publish `telemetry_types`, where
+    telemetry_streams maps a telemetry type to its (source message, rate)
+    and internal_streams lists what the bridge itself consumes.
+    """
+    rates = dict(internal_streams)
+    for telemetry_type in telemetry_types:
+        name, hz = telemetry_streams[telemetry_type]
+        rates[name] = max(rates.get(name, 0.0), hz)
+    return rates
+
+
+def request_streams(connection, rates):
+    """
+    Stop every grouped data stream, then ask for each needed message at its
+    own rate with MAV_CMD_SET_MESSAGE_INTERVAL. Fire and forget: this is also
+    called from the telemetry loop, which is the reader of the COMMAND_ACKs.
+    """
+    connection.mav.request_data_stream_send(
+        connection.target_system,
+        connection.target_component,
+        mavutil.mavlink.MAV_DATA_STREAM_ALL,
+        0,  # rate
+        0   # Stop
+    )
+    for name, hz in rates.items():
+        connection.mav.command_long_send(
+            connection.target_system,
+            connection.target_component,
+            mavutil.mavlink.MAV_CMD_SET_MESSAGE_INTERVAL,
+            0,
+            getattr(mavutil.mavlink, f"MAVLINK_MSG_ID_{name}"),
+            int(1e6 / hz),  # interval in microseconds
+            0, 0, 0, 0, 0
+        )
+
+
+class LinkStats:
+    """
+    Bytes, messages and CPU time spent reading and parsing the MAVLink link,
+    reported every `interval` seconds. CPU is thread time, so the time spent
+    blocked waiting for data is not counted.
+    """
+
+    def __init__(self, interval=STATS_INTERVAL):
+        self.interval = interval
+        self._reset(time.monotonic())
+
+    def _reset(self, now):
+        self.started = now
+        self.bytes = 0
+        self.messages = 0
+        self.cpu = 0.0
+        self.wakeups = 0
+        self.types = Counter()
+
+    def record(self, msg, cpu_seconds):
+        self.cpu += cpu_seconds
+        if msg is None:
+            return
+        msg_type = msg.get_type()
+        self.bytes += len(msg.data if msg_type == 'BAD_DATA' else msg.get_msgbuf())
+        self.messages += 1
+        self.types[msg_type] += 1
+
+    def record_batch(self, batch, cpu_seconds):
+        """All the messages read in one wakeup, with the CPU spent reading and parsing them"""
+        self.cpu += cpu_seconds
+        if batch:
+            self.wakeups += 1
+        for msg in batch:
+            self.record(msg, 0.0)
+
+    def due(self, now=None):
+        now = time.monotonic() if now is None else now
+        return now - self.started >= self.interval
+
+    def report(self, now=None):
+        """Rates since the last report, then start a new period"""
+        now = time.monotonic() if now is None else now
+        elapsed = max(now - self.started, 1e-9)
+        stats = {
+            'bytes_per_s': self.bytes / elapsed,
+            'messages_per_s': self.messages / elapsed,
+            'cpu_percent': self.cpu / elapsed * 100,
+            'messages_per_wakeup': self.messages / self.wakeups if self.wakeups else 0.0,
+            'types': dict(self.types.most_common()),
+        }
+        self._reset(now)
+        return stats
+
+
+def format_stats(mode, stats):
+    types = ", ".join(f"{name} {count}" for name, count in stats['types'].items())
+    return (f"DRONE-LINK: streams {mode} - {stats['bytes_per_s']:.0f} B/s, {stats['messages_per_s']:.1f} msg/s, "
+            f"decode CPU {stats['cpu_percent']:.2f}%, {stats['messages_per_wakeup']:.1f} msg/wakeup - types: {types}")
+
+
+def summarize(filepath):
+    """Mean B/s, msg/s and decode CPU per stream mode from the DRONE-LINK lines of a timing log"""
+    per_mode = {}
+    with open(filepath, 'r') as f:
+        for line in f:
+            match = LINK_PATTERN.search(line)
+            if match:
+                per_mode.setdefault(match.group(1), []).append([float(v) for v in match.groups()[1:]])
+    return {mode: [sum(column) / len(rows) for column in zip(*rows)] + [len(rows)]
+            for mode, rows in per_mode.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare MAVLink link load per stream mode (drone_mqtt.py DRONE-LINK lines)')
+    parser.add_argument('logs', nargs='+', help='Timing log files (e.g. a run with --stream-all and one without)')
+    args = parser.parse_args()
+
+    print(f"{'log':<40}{'streams':<10}{'B/s':>10}{'msg/s':>10}{'CPU %':>8}{'periods':>9}")
+    for log_path in args.logs:
+        for mode, (bytes_per_s, messages_per_s, cpu, periods) in summarize(log_path).items():
+            print(f"{log_path[-40:]:<40}{mode:<10}{bytes_per_s:>10.0f}{messages_per_s:>10.1f}{cpu:>8.2f}{periods:>9}")
@@ -0,0 +1,130 @@
+import time
+
+from pymavlink import mavutil
+
+# Upload timeout: a base plus a margin per item (seconds)
+BASE_TIMEOUT = 3.0
+TIMEOUT_PER_ITEM = 0.05
+# Waypoint altitudes are relative to home
+FRAME = mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT_INT
+MISSION_TYPE = mavutil.mavlink.MAV_MISSION_TYPE_MISSION
+
+
+def parse_waypoints(waypoints):
+    """[{lat, lon, alt[, hold, radius]}] -> [(lat, lon, alt, hold, radius)], ValueError if malformed"""
+    if not isinstance(waypoints, list) or not waypoints:
+        raise ValueError("mission needs a non-empty list of waypoints")
+    parsed = []
+    for i, wp in enumerate(waypoints):
+        if not isinstance(wp, dict) or not all(k in wp for k in ('lat', 'lon', 'alt')):
+            raise ValueError(f"waypoint {i} needs lat, lon and alt")
+        parsed.append((float(wp['lat']), float(wp['lon']), float(wp['alt']),
+                       float(wp.get('hold', 0)), float(wp.get('radius', 0))))
+    return parsed
+
+
+def upload_timeout(waypoint_count):
+    """Seconds allowed for uploading `waypoint_count` waypoints (plus the home item)"""
+    return BASE_TIMEOUT + TIMEOUT_PER_ITEM * (waypoint_count + 1)
+
+
+class MissionUpload:
+    """
+    One mission upload: MISSION_COUNT, then a MISSION_ITEM_INT for every
+    MISSION_REQUEST(_INT) of the vehicle, until its MISSION_ACK.
+
+    The items are encoded once up front and match() is fed by the
+    telemetry loop (MavlinkCommandTracker), so each request is answered
+    from the reader thread as soon as it is parsed, without a round trip
+    through the command handler. The whole route is one exchange whatever
+    its length. Item 0 is the home slot, which ArduPilot overwrites, so
+    the first waypoint is sent there too and the route starts at item 1.
+    Only a MISSION_ACK from the target that follows our MISSION_COUNT
+    settles the upload. A refusal (MAV_MISSION_NO_SPACE, DENIED...) may
+    answer the count directly, but an acceptance only counts after at
+    least one item request, so a late ACK of an earlier exchange (a guided
+    goto) is not taken for this upload's success.
+    """
+
+    def __init__(self, connection, waypoints):
+        self.connection = connection
+        mav = connection.mav
+        target = (connection.target_system, connection.target_component)
+        points = [waypoints[0]] + list(waypoints)
+        self.items = [
+            mav.mission_item_int_encode(
+                *target, seq, FRAME, mavutil.mavlink.MAV_CMD_NAV_WAYPOINT,
+                0,       # current
+                1,       # autocontinue
+                hold,    # param1: hold time
+                radius,  # param2: accept radius
+                0,       # param3: pass radius
+                0,       # param4: yaw
+                int(lat * 1e7), int(lon * 1e7), alt,
+                MISSION_TYPE)
+            for seq, (lat, lon, alt, hold, radius) in enumerate(points)
+        ]
+        self.timeout = upload_timeout(len(waypoints))
+        self.requests = 0
+        self.resent = 0
+        self.started = None
+        self.first_request = None
+        self.finished = None
+        self._sent = set()
+
+    def start(self):
+        self.started = time.time()
+        self.connection.mav.mission_count_send(
+            self.connection.target_system,
+            self.connection.target_component,
+            len(self.items),
+            MISSION_TYPE
+        )
+
+    def match(self, msg):
+        """MavlinkCommandTracker matcher: answers item requests, settles on the MISSION_ACK"""
+        msg_type = msg.get_type()
+        if msg_type in ('MISSION_REQUEST_INT', 'MISSION_REQUEST'):
+            if msg.get_srcSystem() != self.connection.target_system or getattr(msg, 'mission_type', MISSION_TYPE) != MISSION_TYPE:
+                return None
+            if msg.seq >= len(self.items):
+                self.finished = time.time()
+                return False, f"vehicle requested item {msg.seq} of {len(self.items)}"
+            self.requests += 1
+            if self.first_request is None:
+                self.first_request = time.time()
+            if msg.seq in self._sent:
+                # Our item was lost or late: the vehicle asks again
+                self.resent += 1
+            self._sent.add(msg.seq)
+            self.connection.mav.send(self.items[msg.seq])
+            return None
+        if msg_type == 'MISSION_ACK' and getattr(msg, 'mission_type', MISSION_TYPE) == MISSION_TYPE:
+            if msg.get_srcSystem() != self.connection.target_system or self.started is None:
+                return None
+            accepted = msg.type == mavutil.mavlink.MAV_MISSION_ACCEPTED
+            if accepted and not self.requests:
+                return None
+            self.finished = time.time()
+            if accepted:
+                return True, f"{len(self.items)} items accepted"
+            entry = mavutil.mavlink.enums['MAV_MISSION_RESULT'].get(msg.type)
+            return False, entry.name if entry else str(msg.type)
+        return None
+
+    def stats(self):
+        end = self.finished or time.time()
+        return {
+            'items': len(self.items),
+            'elapsed_ms': (end - self.started) * 1000 if self.started else 0.0,
+            'first_request_ms': (self.first_request - self.started) * 1000 if self.first_request else None,
+            'requests': self.requests,
+            'resent': self.resent,
+        }
+
+
+def format_upload(stats, ok):
+    first = f"{stats['first_request_ms']:.2f}ms" if stats['first_request_ms'] is not None else "never"
+    rate = stats['items'] / (stats['elapsed_ms'] / 1000) if stats['elapsed_ms'] else 0.0
+    return (f"DRONE-MISSION: {'uploaded' if ok else 'failed'} {stats['items']} items in {stats['elapsed_ms']:.2f}ms "
+            f"({rate:.0f} items/s), first request after {first}, {stats['requests']} requests, {stats['resent']} re-requested")
@@ -0,0 +1,125 @@
+import os
+import hmac
+import struct
+import hashlib
+import argparse
+import threading
+
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+except ImportError:
+    AESGCM = ChaCha20Poly1305 = None
+
+# Algorithm id carried in the first byte of every sealed payload
+ALGORITHMS = {'aes-gcm': 1, 'chacha20': 2}
+DEFAULT_KEY_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "keys", "payload.key")
+
+# Key derivation labels, one key per direction so both ends never share a nonce space
+DRONE_TO_GS = b"drone->gs"
+GS_TO_DRONE = b"gs->drone"
+
+# Sealed payload: algorithm id, 12-byte nonce (8-byte random session prefix + 4-byte sequence), ciphertext + 16-byte tag
+HEADER = struct.Struct(">B8sI")
+TAG_SIZE = 16
+MAX_SEQUENCE = 2 ** 32 - 1
+
+
+class PayloadAuthError(ValueError):
+    """A sealed payload failed authentication, or does not use the expected algorithm"""
+
+
+def hkdf_sha256(key, info, length=32, salt=b""):
+    """RFC 5869 HKDF with SHA-256 (stdlib only)"""
+    prk = hmac.new(salt or b"\0" * 32, key, hashlib.sha256).digest()
+    output, block = b"", b""
+    for counter in range(1, -(-length // 32) + 1):
+        block = hmac.new(prk, block + info + bytes([counter]), hashlib.sha256).digest()
+        output += block
+    return output[:length]
+
+
+def load_master_key(path=DEFAULT_KEY_FILE):
+    """32-byte pre-shared key stored as 64 hex characters"""
+    with open(path, 'r') as f:
+        key = bytes.fromhex(f.read().strip())
+    if len(key) != 32:
+        raise ValueError(f"{path}: expected a 32-byte key (64 hex characters)")
+    return key
+
+
+def generate_key_file(path=DEFAULT_KEY_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(os.urandom(32).hex() + "\n")
+
+
+def _cipher(algorithm, key):
+    if AESGCM is None:
+        raise ValueError("The cryptography package is required for AEAD payloads, pip install cryptography")
+    return AESGCM(key) if algorithm == 'aes-gcm' else ChaCha20Poly1305(key)
+
+
+class PayloadCipher:
+    """
+    End-to-end AEAD for MQTT payloads, independent of the broker TLS hop.
+
+    Each direction has its own key derived from the master key with HKDF,
+    and the cipher objects are built once. The nonce is an 8-byte random
+    prefix chosen at startup followed by a 4-byte message counter, so no
+    nonce repeats within a run and runs do not collide; the prefix is
+    renewed if the counter wraps. The header (algorithm, nonce) is
+    authenticated as associated data. open() works on memoryview slices of
+    the received buffer, the only copy is the ciphertext produced by seal().
+    """
+
+    def __init__(self, master_key, algorithm, send_label, recv_label):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown AEAD algorithm: {algorithm} (choose from {', '.join(ALGORITHMS)})")
+        self.algorithm = algorithm
+        self.algorithm_id = ALGORITHMS[algorithm]
+        self._seal = _cipher(algorithm, hkdf_sha256(master_key, send_label))
+        self._open = _cipher(algorithm, hkdf_sha256(master_key, recv_label))
+        self._prefix = os.urandom(8)
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_drone(cls, master_key, algorithm):
+        return cls(master_key, algorithm, DRONE_TO_GS, GS_TO_DRONE)
+
+    @classmethod
+    def for_ground_station(cls, master_key, algorithm):
+        return cls(master_key, algorithm, GS_TO_DRONE, DRONE_TO_GS)
+
+    def _next_header(self):
+        with self._lock:
+            if self._sequence == MAX_SEQUENCE:
+                self._prefix = os.urandom(8)
+                self._sequence = 0
+            self._sequence += 1
+            return HEADER.pack(self.algorithm_id, self._prefix, self._sequence)
+
+    def seal(self, plaintext):
+        """bytes -> header + ciphertext + tag"""
+        header = self._next_header()
+        return header + self._seal.encrypt(header[1:], plaintext, header)
+
+    def open(self, payload):
+        """header + ciphertext + tag -> plaintext bytes, PayloadAuthError if it does not authenticate"""
+        view = memoryview(payload)
+        if len(view) < HEADER.size + TAG_SIZE or view[0] != self.algorithm_id:
+            raise PayloadAuthError("Not a sealed payload for this algorithm")
+        header = view[:HEADER.size]
+        try:
+            return self._open.decrypt(header[1:], view[HEADER.size:], header)
+        except Exception:
+            raise PayloadAuthError("Payload authentication failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Manage the pre-shared key of the AEAD payload mode')
+    parser.add_argument('key_file', nargs='?', default=DEFAULT_KEY_FILE, help=f'Key file to create (default: {DEFAULT_KEY_FILE})')
+    args = parser.parse_args()
+    generate_key_file(args.key_file)
+    print(f"Key written to {args.key_file}, copy it to the drone and the ground station")
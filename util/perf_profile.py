@@ -0,0 +1,141 @@
+import json
+import threading
+
+from util.timing_sampling import SamplingPolicy
+
+
+def _number(kind, low, high):
+    def check(value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"expected a number, got {value!r}")
+        value = kind(value)
+        if not low <= value <= high:
+            raise ValueError(f"{value} is outside [{low}, {high}]")
+        return value
+    return check
+
+
+def _choice(*options):
+    def check(value):
+        # True == 1 and 1.0 == 1: compare types too, a bool is never a QoS
+        if type(value) not in {type(option) for option in options} or value not in options:
+            raise ValueError(f"{value!r} is not one of {', '.join(map(str, options))}")
+        return value
+    return check
+
+
+def _string(value):
+    if not isinstance(value, str) or not value:
+        raise ValueError(f"expected a non-empty string, got {value!r}")
+    return value
+
+
+def _sampling(value):
+    SamplingPolicy.parse(_string(value))
+    return value
+
+
+def _stream_rates(value):
+    if not isinstance(value, dict):
+        raise ValueError("expected {telemetry type: Hz}")
+    return {str(k): _number(float, 0.1, 50.0)(v) for k, v in value.items()}
+
+
+# name: (default, validator, live). Settings that are not live only take effect at startup
+# (changing them needs a new connection, hence a new TLS handshake)
+SETTINGS = {
+    'rate_limit': (0.5, _number(float, 0.01, 60.0), True),             # seconds between two frames of a type
+    'stream_rates': ({}, _stream_rates, True),                         # {type: Hz}, default 1 / rate_limit
+    'telemetry_qos': (0, _choice(0, 1, 2), True),
+    'ack_qos': (0, _choice(0, 1, 2), True),
+    'encoding': ('json', _choice('json', 'compact'), True),            # compact: JSON without spaces
+    'timing_sample': ('all', _sampling, True),
+    'max_queued_messages': (1000, _number(int, 0, 1000000), True),     # paho queue, 0 is unbounded
+    'spool_flush_rate': (200.0, _number(float, 1.0, 100000.0), True),  # backlog messages per second
+    'spool_flush_batch': (50, _number(int, 1, 10000), True),
+    'mavlink_read_chunk': (16384, _number(int, 1024, 1048576), True),
+    'mavlink_max_batch_bytes': (262144, _number(int, 1024, 16777216), True),
+    'broker': ('localhost', _string, False),
+    'port': (1883, _number(int, 1, 65535), False),
+    'port_tls': (8883, _number(int, 1, 65535), False),
+    'keepalive': (60, _number(int, 5, 3600), False),
+    'cert_ca': ("/etc/mosquitto/ca_certificates/ca.crt", _string, False),
+    'cert_file': ("/etc/mosquitto/certs/client.crt", _string, False),
+    'key_file': ("/etc/mosquitto/certs/client.key", _string, False),
+}
+
+
+class PerformanceProfile:
+    """
+    The tunable settings of the bridge: built-in defaults, then a profile
+    file at startup, then changes received at runtime.
+
+    update() validates every change before applying any of them, so a bad
+    request leaves the profile untouched. The bridge registers a handler per
+    setting with on_change(); handlers run after the new values are stored.
+    """
+
+    def __init__(self, overrides=None):
+        self.values = {name: default for name, (default, _, _) in SETTINGS.items()}
+        self._handlers = {}
+        self._lock = threading.Lock()
+        if overrides:
+            self.update(overrides, live=False)
+
+    @classmethod
+    def load(cls, path, overrides=None):
+        """Profile file (JSON, or YAML if PyYAML is installed) on top of `overrides`"""
+        with open(path, 'r') as f:
+            if path.endswith(('.yaml', '.yml')):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ValueError("PyYAML is required for YAML profiles, use JSON or pip install pyyaml")
+                values = yaml.safe_load(f) or {}
+            else:
+                values = json.load(f)
+        profile = cls(overrides)
+        profile.update(values, live=False)
+        return profile
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def on_change(self, name, handler):
+        self._handlers.setdefault(name, []).append(handler)
+
+    def validate(self, changes, live=True):
+        """Cleaned changes, ValueError listing every invalid setting"""
+        if not isinstance(changes, dict):
+            raise ValueError("expected {setting: value}")
+        clean, errors = {}, []
+        for name, value in changes.items():
+            spec = SETTINGS.get(name)
+            if spec is None:
+                errors.append(f"{name}: unknown setting")
+                continue
+            if live and not spec[2]:
+                errors.append(f"{name}: only applied at startup, restart required")
+                continue
+            try:
+                clean[name] = spec[1](value)
+            except ValueError as e:
+                errors.append(f"{name}: {e}")
+        if errors:
+            raise ValueError("; ".join(errors))
+        return clean
+
+    def update(self, changes, live=True):
+        """Validate then apply `changes`, return {setting: new value} for those that changed"""
+        clean = self.validate(changes, live)
+        with self._lock:
+            changed = {name: value for name, value in clean.items() if self.values[name] != value}
+            self.values.update(changed)
+        if live:
+            for name, value in changed.items():
+                for handler in self._handlers.get(name, ()):
+                    handler(value)
+        return changed
+
+    def live_values(self):
+        return {name: value for name, value in self.values.items() if SETTINGS[name][2]}
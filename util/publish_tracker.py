@@ -0,0 +1,163 @@
+import re
+import time
+import argparse
+import threading
+from collections import OrderedDict
+
+# Publishes waiting for on_publish; beyond this the oldest are forgotten
+MAX_IN_FLIGHT = 4096
+# Completions of untracked publishes are kept this long for a track() that may follow (seconds)
+EARLY_TTL = 1.0
+# Seconds between two *-PUBLISH-HIST lines
+REPORT_INTERVAL = 10.0
+# Upper bounds of the histogram buckets in milliseconds, the last bucket is open
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+HIST_PATTERN = re.compile(r"(\w+)-PUBLISH-HIST: (\w+) n=(\d+) .* buckets (\S+)")
+
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets: O(1) add, mergeable across periods and logs"""
+
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+
+    def add(self, value_ms):
+        for i, bound in enumerate(self.bounds):
+            if value_ms <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value_ms
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (inf for the open bucket)"""
+        target = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= target:
+                return self.bounds[i] if i < len(self.bounds) else float('inf')
+        return 0.0
+
+    def merge(self, counts):
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+
+
+class PublishTracker:
+    """
+    Time from client.publish() to paho's on_publish for the same mid.
+
+    At QoS 0 on_publish fires once the packet is written to the socket, so
+    the latency is the local queueing delay inside paho; at QoS 1 it fires
+    on the broker's PUBACK and also covers the network and the broker. The
+    end-to-end latency minus this one is what the network and broker cost.
+    Latencies go to one histogram per kind (telemetry, command, ...) that
+    is handed to `on_report` every `interval` seconds; `on_complete` gets
+    each message tracked with a message ID (the timed ones), and a publish
+    tracked with `on_delivered` gets that callback once it completed.
+
+    Not every publish is tracked (control acks, untimed paths), so
+    completions with no track() yet are only kept for EARLY_TTL seconds,
+    and one that predates the publish it would match belongs to an
+    earlier message with the same (reused) mid and is dropped.
+    """
+
+    def __init__(self, on_report=None, on_complete=None, max_in_flight=MAX_IN_FLIGHT, interval=REPORT_INTERVAL):
+        self.on_report = on_report
+        self.on_complete = on_complete
+        self.max_in_flight = max_in_flight
+        self.interval = interval
+        self.evicted = 0
+        self._in_flight = OrderedDict()  # {mid: (start, kind, message_id, message_type, on_delivered)}
+        self._early = OrderedDict()      # {mid: completion time} when on_publish beat track()
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._period_start = time.monotonic()
+
+    def track(self, info, kind, start, message_id=None, message_type=None, on_delivered=None):
+        """Register the MQTTMessageInfo returned by publish(); `start` is the perf_counter() before the call"""
+        if info.rc != 0:
+            return
+        with self._lock:
+            done = self._early.pop(info.mid, None)
+            if done is None or done < start:
+                self._in_flight[info.mid] = (start, kind, message_id, message_type, on_delivered)
+                while len(self._in_flight) > self.max_in_flight:
+                    self._in_flight.popitem(last=False)
+                    self.evicted += 1
+                return
+        # paho wrote the packet (and called on_publish) before publish() returned
+        self._complete(done, start, kind, message_id, message_type, on_delivered)
+
+    def on_publish(self, client, userdata, mid):
+        """paho on_publish callback"""
+        now = time.perf_counter()
+        with self._lock:
+            entry = self._in_flight.pop(mid, None)
+            if entry is None:
+                self._early.pop(mid, None)
+                self._early[mid] = now
+                # Oldest first: drop what no track() claimed in time
+                while self._early and (len(self._early) > self.max_in_flight
+                                       or now - next(iter(self._early.values())) > EARLY_TTL):
+                    self._early.popitem(last=False)
+                return
+        self._complete(now, *entry)
+
+    def _complete(self, done, start, kind, message_id, message_type, on_delivered):
+        latency_ms = (done - start) * 1000
+        report = None
+        with self._lock:
+            self._histograms.setdefault(kind, LatencyHistogram()).add(latency_ms)
+            now = time.monotonic()
+            if now - self._period_start >= self.interval:
+                report, self._histograms = self._histograms, {}
+                self._period_start = now
+        if on_delivered:
+            on_delivered()
+        if message_id and self.on_complete:
+            self.on_complete(kind, message_id, message_type, latency_ms)
+        if report and self.on_report:
+            self.on_report(report)
+
+
+def format_histogram(source, kind, histogram):
+    buckets = ",".join(str(n) for n in histogram.counts)
+    mean = histogram.total / histogram.count if histogram.count else 0.0
+    return (f"{source}-PUBLISH-HIST: {kind} n={histogram.count} mean={mean:.3f}ms "
+            f"p50<={histogram.percentile(50)}ms p99<={histogram.percentile(99)}ms buckets {buckets}")
+
+
+def summarize(filepath):
+    """{(source, kind): LatencyHistogram} merged over every *-PUBLISH-HIST line of a timing log"""
+    merged = {}
+    with open(filepath, 'r') as f:
+        for line in f:
+            match = HIST_PATTERN.search(line)
+            if match:
+                source, kind, _, buckets = match.groups()
+                merged.setdefault((source, kind), LatencyHistogram()).merge(int(n) for n in buckets.split(","))
+    return merged
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Publish -> on_publish latency histograms from the timing logs')
+    parser.add_argument('logs', nargs='+', help='Timing log files')
+    args = parser.parse_args()
+
+    labels = [f"<={b}" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]
+    for log_path in args.logs:
+        for (source, kind), histogram in summarize(log_path).items():
+            print(f"{log_path} {source} {kind}: {histogram.count} publishes, "
+                  f"p50<={histogram.percentile(50)}ms p99<={histogram.percentile(99)}ms")
+            peak = max(histogram.counts) or 1
+            for label, n in zip(labels, histogram.counts):
+                print(f"  {label:>8}ms {n:>8} {'#' * round(40 * n / peak)}")
@@ -0,0 +1,183 @@
+import os
+import re
+import glob
+import argparse
+
+import matplotlib
+matplotlib.use("Agg")  # Headless rendering, no display needed
+import matplotlib.pyplot as plt
+import numpy as np
+
+from util.timing_log import parse_event
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOGS_DIR = os.path.join(PROJECT_DIR, "logs")
+ASSETS_DIR = os.path.join(PROJECT_DIR, "assets")
+
+# Time series longer than this are reduced with min/max buckets before plotting
+DOWNSAMPLE_THRESHOLD = 4000
+HIST_BINS = 100
+# Number of quantiles drawn for the CDF, independent of the sample count
+CDF_POINTS = 1000
+
+# mqtt_timing_<date>_<with_tls|no_tls><suffix>.log
+LOG_NAME_PATTERN = re.compile(r"mqtt_timing_(\d{4}-\d{2}-\d{2})_(with_tls|no_tls)(.*)\.log$")
+
+
+def parse_latencies(filepath):
+    """
+    Pair SEND/RECV events of a timing log.
+    Returns (send_times, latencies_ms, is_command) as NumPy arrays in log order.
+    """
+    send_events = {}  # {msg_id: (timestamp, is_command)}
+    send_times, latencies, is_command = [], [], []
+    with open(filepath, 'r') as f:
+        for line in f:
+            event = parse_event(line)
+            if not event:
+                continue
+            event_type, msg_id, _msg_type, timestamp = event
+            if event_type.endswith("-SEND"):
+                send_events[msg_id] = (timestamp, event_type == "GS-SEND")
+            elif msg_id in send_events:
+                send_time, command = send_events.pop(msg_id)
+                send_times.append(send_time)
+                latencies.append((timestamp - send_time) * 1000)
+                is_command.append(command)
+    return np.array(send_times), np.array(latencies), np.array(is_command, dtype=bool)
+
+
+def minmax_downsample(y, n_out=DOWNSAMPLE_THRESHOLD):
+    """
+    Reduce `y` to about `n_out` points keeping the min and max of each bucket,
+    so latency spikes stay visible. Returns (x indices, y values).
+    """
+    n = len(y)
+    x = np.arange(n)
+    if n <= n_out:
+        return x, y
+    buckets = max(1, n_out // 2)
+    size = n // buckets
+    trimmed = y[:buckets * size].reshape(buckets, size)
+    base = np.arange(buckets) * size
+    idx_min = base + trimmed.argmin(axis=1)
+    idx_max = base + trimmed.argmax(axis=1)
+    idx = np.sort(np.concatenate([idx_min, idx_max, np.arange(buckets * size, n)]))
+    return x[idx], y[idx]
+
+
+def stats_text(label, latencies):
+    return (f"{label} Stats:\n"
+            f"Avg: {np.mean(latencies):.2f} ms\n"
+            f"Std: {np.std(latencies):.2f} ms\n"
+            f"p50: {np.percentile(latencies, 50):.2f} ms\n"
+            f"p99: {np.percentile(latencies, 99):.2f} ms\n"
+            f"Max: {np.max(latencies):.2f} ms\n"
+            f"Samples: {len(latencies)}")
+
+
+def plot_timeseries(series, title, path, threshold):
+    fig, ax = plt.subplots(figsize=(14, 8))
+    text_y = 0.95
+    for (label, (_, latencies, is_command)), color in zip(series, ('tab:blue', 'tab:orange')):
+        x, y = minmax_downsample(latencies, threshold)
+        ax.plot(x, y, label=f"{label} (N={len(latencies)})", color=color, alpha=0.7, linewidth=0.8)
+        # Commands are few, draw them all on top of the (possibly downsampled) line
+        cmd_idx = np.flatnonzero(is_command)
+        if len(cmd_idx):
+            ax.scatter(cmd_idx, latencies[cmd_idx], color='green', s=20, zorder=10, label=f"GS-SEND ({label})")
+        ax.text(1.02, text_y, stats_text(label, latencies), transform=ax.transAxes, fontsize=9,
+                va='top', ha='left', bbox=dict(boxstyle='round,pad=0.5', fc=color, alpha=0.3))
+        text_y -= 0.35
+    ax.set_xlabel("Message Sequence Index")
+    ax.set_ylabel("Latency (ms)")
+    ax.set_title(title)
+    ax.legend(loc='upper left')
+    ax.grid(True, which='both', linestyle='--', linewidth=0.5)
+    fig.subplots_adjust(right=0.75)
+    fig.savefig(path, bbox_inches='tight')
+    plt.close(fig)
+
+
+def plot_histogram(series, title, path):
+    fig, ax = plt.subplots(figsize=(14, 8))
+    all_latencies = np.concatenate([latencies for _, (_, latencies, _) in series])
+    bins = np.linspace(0, max(np.percentile(all_latencies, 99.5), 1e-3), HIST_BINS)
+    for label, (_, latencies, _) in series:
+        counts, edges = np.histogram(latencies, bins=bins)
+        ax.stairs(counts, edges, label=f"{label} (N={len(latencies)})", fill=True, alpha=0.4)
+    ax.set_xlabel("Latency (ms)")
+    ax.set_ylabel("Messages")
+    ax.set_title(f"{title} - histogram (up to p99.5)")
+    ax.legend(loc='upper right')
+    ax.grid(True, linestyle='--', linewidth=0.5)
+    fig.savefig(path, bbox_inches='tight')
+    plt.close(fig)
+
+
+def plot_cdf(series, title, path):
+    fig, ax = plt.subplots(figsize=(14, 8))
+    q = np.linspace(0, 1, CDF_POINTS)
+    for label, (_, latencies, _) in series:
+        ax.plot(np.quantile(latencies, q), q, label=f"{label} (N={len(latencies)})")
+    ax.set_xscale('log')
+    ax.set_xlabel("Latency (ms, log scale)")
+    ax.set_ylabel("Fraction of messages")
+    ax.set_title(f"{title} - CDF")
+    ax.legend(loc='lower right')
+    ax.grid(True, which='both', linestyle='--', linewidth=0.5)
+    fig.savefig(path, bbox_inches='tight')
+    plt.close(fig)
+
+
+def find_comparisons(logs_dir):
+    """
+    Group logs by (date, suffix) so each TLS log is compared with the no-TLS
+    log of the same run configuration. Sorted for deterministic output.
+    """
+    groups = {}
+    for path in sorted(glob.glob(os.path.join(logs_dir, "mqtt_timing_*.log"))):
+        match = LOG_NAME_PATTERN.search(os.path.basename(path))
+        if match:
+            date, tls, suffix = match.groups()
+            groups.setdefault((date, suffix), {})[tls] = path
+    return sorted(groups.items())
+
+
+def render_all(logs_dir=LOGS_DIR, assets_dir=ASSETS_DIR, threshold=DOWNSAMPLE_THRESHOLD):
+    os.makedirs(assets_dir, exist_ok=True)
+    written = []
+    for (date, suffix), files in find_comparisons(logs_dir):
+        series = []
+        for tls, label in (("with_tls", "With TLS"), ("no_tls", "Without TLS")):
+            if tls in files:
+                data = parse_latencies(files[tls])
+                if len(data[1]):
+                    series.append((label, data))
+        if not series:
+            print(f"No latency data for {date}{suffix}, skipped")
+            continue
+
+        stem = f"latency_{date}{suffix}"
+        title = f"MQTT Message Latency: {' vs. '.join(label for label, _ in series)} ({date}{suffix})"
+        outputs = {
+            'timeseries': lambda p: plot_timeseries(series, title, p, threshold),
+            'hist': lambda p: plot_histogram(series, title, p),
+            'cdf': lambda p: plot_cdf(series, title, p),
+        }
+        for view, render in outputs.items():
+            path = os.path.join(assets_dir, f"{stem}_{view}.png")
+            render(path)
+            written.append(path)
+            print(f"Graph saved to: {path}")
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Render all latency comparison graphs headlessly')
+    parser.add_argument('--logs-dir', default=LOGS_DIR, help='Directory with mqtt_timing_*.log files')
+    parser.add_argument('--assets-dir', default=ASSETS_DIR, help='Directory where figures are written')
+    parser.add_argument('--threshold', type=int, default=DOWNSAMPLE_THRESHOLD,
+                        help='Downsample time series with more points than this')
+    args = parser.parse_args()
+    render_all(args.logs_dir, args.assets_dir, args.threshold)
@@ -0,0 +1,114 @@
+import sys
+import time
+import shutil
+import threading
+
+DEFAULT_FPS = 4.0
+
+CSI = "\033["
+SAVE_CURSOR = "\0337"
+RESTORE_CURSOR = "\0338"
+
+
+class StatusScreen:
+    """
+    Fixed status area at the top of the terminal, drawn from a cell model.
+
+    Every frame is a list of rows, each row a list of (text, style) spans where
+    style is an SGR parameter string ("" for default, "32" for green, "1;31"
+    for bold red...). The frame is compared cell by cell with the previous
+    one and only the changed runs are written, in a single write() per frame.
+    Frames are produced at most `fps` times per second. The rest of the
+    terminal is set as scroll region, so normal logging keeps working below.
+    """
+
+    def __init__(self, rows, frame_fn, fps=DEFAULT_FPS, out=None):
+        self.rows = rows
+        self.frame_fn = frame_fn
+        self.frame_interval = 1.0 / fps
+        self.out = out or sys.stdout
+        self._cells = None  # Previous frame: rows x width list of (char, style)
+        self._size = None
+        self._running = False
+        self._thread = None
+
+    def _setup_terminal(self, size):
+        width, height = size
+        # Reserve the top rows, logging scrolls in the region below them
+        self.out.write(f"{SAVE_CURSOR}{CSI}{self.rows + 1};{height}r{RESTORE_CURSOR}")
+        if self._size is None:
+            self.out.write(f"{CSI}{height};1H")
+        # Force a full redraw of the status area
+        self._cells = [[("\0", "")] * width for _ in range(self.rows)]
+        self._size = size
+
+    def _to_cells(self, frame, width):
+        cells = []
+        for r in range(self.rows):
+            row = []
+            for text, style in (frame[r] if r < len(frame) else []):
+                row.extend((ch, style) for ch in text)
+            row = row[:width]
+            row.extend([(" ", "")] * (width - len(row)))
+            cells.append(row)
+        return cells
+
+    def render(self, frame):
+        """Draw `frame`, writing only the cells that differ from the previous frame"""
+        size = tuple(shutil.get_terminal_size())
+        if size != self._size:
+            self._setup_terminal(size)
+        width = size[0]
+        cells = self._to_cells(frame, width)
+
+        parts = []
+        for r, (old_row, new_row) in enumerate(zip(self._cells, cells)):
+            c = 0
+            while c < width:
+                if old_row[c] == new_row[c]:
+                    c += 1
+                    continue
+                # Start of a changed run: move there once, then write until the run ends
+                parts.append(f"{CSI}{r + 1};{c + 1}H")
+                style = None
+                while c < width and old_row[c] != new_row[c]:
+                    ch, cell_style = new_row[c]
+                    if cell_style != style:
+                        parts.append(f"{CSI}0;{cell_style}m" if cell_style else f"{CSI}0m")
+                        style = cell_style
+                    parts.append(ch)
+                    c += 1
+        self._cells = cells
+
+        if parts:
+            self.out.write(SAVE_CURSOR + "".join(parts) + f"{CSI}0m" + RESTORE_CURSOR)
+            self.out.flush()
+        return len(parts)
+
+    def _loop(self):
+        next_frame = time.monotonic()
+        while self._running:
+            try:
+                self.render(self.frame_fn())
+            except Exception as e:
+                self.out.write(f"\nStatus screen error: {e}\n")
+            next_frame += self.frame_interval
+            delay = next_frame - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Renderer fell behind: skip the missed frames instead of bursting
+                next_frame = time.monotonic()
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        # Restore full-screen scrolling
+        self.out.write(f"{SAVE_CURSOR}{CSI}r{RESTORE_CURSOR}")
+        self.out.flush()
@@ -0,0 +1,202 @@
+import os
+import json
+import argparse
+import threading
+
+import numpy as np
+
+from util.command_tracker import ACK_OK
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSETS_DIR = os.path.join(PROJECT_DIR, "assets")
+
+DEFAULT_START_RATE = 10.0      # Hz
+DEFAULT_MAX_RATE = 1000.0      # Hz
+DEFAULT_GROWTH = 1.5           # Rate multiplier between levels
+DEFAULT_LEVEL_DURATION = 5.0   # seconds per level
+# Time left to the acks of the last level before the run is closed (seconds)
+ACK_GRACE = 2.0
+# A level is past the knee when its p99 exec latency is this many times the
+# first level's, or when fewer than this fraction of its commands are acked
+KNEE_LATENCY_FACTOR = 5.0
+KNEE_ACK_RATIO = 0.9
+
+# Zero velocity setpoint: keeps the vehicle hovering in GUIDED mode whatever the rate
+STRESS_COMMAND = {'velocity': {"vx": 0.0, "vy": 0.0, "vz": 0.0}}
+
+
+def ramp_rates(start=DEFAULT_START_RATE, maximum=DEFAULT_MAX_RATE, growth=DEFAULT_GROWTH):
+    """Geometric ramp start, start*growth, ... ending exactly at maximum"""
+    if start <= 0 or maximum < start or growth <= 1:
+        raise ValueError("Stress ramp needs 0 < start <= maximum and growth > 1")
+    rates = []
+    rate = start
+    while rate < maximum:
+        rates.append(round(rate, 1))
+        rate *= growth
+    rates.append(maximum)
+    return rates
+
+
+def build_workload(rates, level_duration=DEFAULT_LEVEL_DURATION, command=STRESS_COMMAND):
+    """One workload step per rate level, run by util.workload.WorkloadScheduler"""
+    return {
+        'name': f"stress {rates[0]:g}-{rates[-1]:g}Hz",
+        'steps': [{'command': command, 'type': 'velocity_stress', 'level': i,
+                   'repeat': max(1, int(round(rate * level_duration))), 'rate': rate}
+                  for i, rate in enumerate(rates)]
+    }
+
+
+class StressRecorder:
+    """
+    Collects, per rate level, when each command was published and when its
+    ack came back. Drone-side latency is the ack's exec timestamp minus the
+    command's sent_at, so it grows with the queue in front of on_command.
+    """
+
+    def __init__(self, rates):
+        self.rates = rates
+        self._pending = {}  # {message_id: (level, sent_at)}
+        self._send_times = [[] for _ in rates]
+        self._exec_times = [[] for _ in rates]
+        self._exec_latency = [[] for _ in rates]
+        self._rtt = [[] for _ in rates]
+        self._errors = [0] * len(rates)
+        self._lock = threading.Lock()
+
+    def sent(self, message_id, level, sent_at):
+        with self._lock:
+            self._pending[message_id] = (level, sent_at)
+            self._send_times[level].append(sent_at)
+
+    def ack(self, ack, receive_time):
+        """Record the ack of a stress command, False if the ack is not ours"""
+        with self._lock:
+            entry = self._pending.pop(ack['id'], None)
+            if entry is None:
+                return False
+            level, sent_at = entry
+            self._exec_times[level].append(ack['t'])
+            self._exec_latency[level].append((ack['t'] - sent_at) * 1000)
+            self._rtt[level].append((receive_time - sent_at) * 1000)
+            if ack['s'] != ACK_OK:
+                self._errors[level] += 1
+        return True
+
+    def results(self):
+        """One dict per level: target/publish/exec rates, ack ratio, latency percentiles in ms"""
+        results = []
+        with self._lock:
+            for i, rate in enumerate(self.rates):
+                sends = self._send_times[i]
+                execs = sorted(self._exec_times[i])
+                exec_latency = np.array(self._exec_latency[i])
+                rtt = np.array(self._rtt[i])
+                level = {
+                    'target_rate': rate,
+                    'sent': len(sends),
+                    'acked': len(execs),
+                    'errors': self._errors[i],
+                    'publish_rate': rate_of(sends),
+                    'exec_rate': rate_of(execs),
+                    'ack_ratio': len(execs) / len(sends) if sends else 0.0,
+                }
+                for name, values in (('exec_latency', exec_latency), ('rtt', rtt)):
+                    for q in (50, 99):
+                        level[f'{name}_p{q}_ms'] = float(np.percentile(values, q)) if len(values) else None
+                results.append(level)
+        return results
+
+
+def rate_of(timestamps):
+    """Events per second between the first and the last timestamp"""
+    if len(timestamps) < 2:
+        return 0.0
+    span = max(timestamps) - min(timestamps)
+    return (len(timestamps) - 1) / span if span > 0 else 0.0
+
+
+def find_knee(results, latency_factor=KNEE_LATENCY_FACTOR, ack_ratio=KNEE_ACK_RATIO):
+    """Index of the first level where drone-side latency explodes or acks fall behind, None if none does"""
+    baseline = next((r['exec_latency_p99_ms'] for r in results if r['exec_latency_p99_ms'] is not None), None)
+    for i, r in enumerate(results):
+        if r['ack_ratio'] < ack_ratio:
+            return i
+        if baseline and r['exec_latency_p99_ms'] is not None and r['exec_latency_p99_ms'] > latency_factor * max(baseline, 1.0):
+            return i
+    return None
+
+
+def format_level(r):
+    def ms(value):
+        return f"{value:.2f}" if value is not None else "-"
+    return (f"target {r['target_rate']:g}Hz, published {r['publish_rate']:.1f}/s, executed {r['exec_rate']:.1f}/s, "
+            f"acked {r['acked']}/{r['sent']}, exec latency p50/p99 {ms(r['exec_latency_p50_ms'])}/{ms(r['exec_latency_p99_ms'])}ms, "
+            f"RTT p50/p99 {ms(r['rtt_p50_ms'])}/{ms(r['rtt_p99_ms'])}ms")
+
+
+def stress_result_path(text_log_path):
+    """logs/mqtt_timing_<date>_<tls>.log -> logs/stress_<date>_<tls>.json"""
+    directory, name = os.path.split(text_log_path)
+    return os.path.join(directory, os.path.splitext(name)[0].replace("mqtt_timing_", "stress_") + ".json")
+
+
+def save_results(path, results, use_tls):
+    knee = find_knee(results)
+    with open(path, 'w') as f:
+        json.dump({'tls': use_tls, 'levels': results,
+                   'knee_rate': results[knee]['target_rate'] if knee is not None else None}, f, indent=2)
+
+
+def plot_results(runs, path):
+    """Exec latency p99 and executed rate against target rate, one line per run"""
+    import matplotlib
+    matplotlib.use("Agg")  # Headless rendering, no display needed
+    import matplotlib.pyplot as plt
+
+    fig, (ax_lat, ax_rate) = plt.subplots(2, 1, figsize=(10, 9), sharex=True)
+    for label, run in runs:
+        levels = run['levels']
+        rates = [r['target_rate'] for r in levels]
+        p99 = [r['exec_latency_p99_ms'] if r['exec_latency_p99_ms'] is not None else np.nan for r in levels]
+        line, = ax_lat.plot(rates, p99, marker='o', label=label)
+        ax_rate.plot(rates, [r['exec_rate'] for r in levels], marker='o', color=line.get_color(), label=label)
+        if run.get('knee_rate') is not None:
+            ax_lat.axvline(run['knee_rate'], color=line.get_color(), linestyle='--', linewidth=1)
+    ax_rate.plot(rates, rates, color='gray', linestyle=':', label='target')
+    ax_lat.set_ylabel("Drone exec latency p99 (ms)")
+    ax_lat.set_yscale('log')
+    ax_lat.set_title("Command stress ramp (dashed: knee)")
+    ax_rate.set_ylabel("Executed commands/s")
+    ax_rate.set_xlabel("Target command rate (Hz)")
+    for ax in (ax_lat, ax_rate):
+        ax.set_xscale('log')
+        ax.grid(True, linestyle='--', linewidth=0.5)
+        ax.legend()
+    fig.savefig(path, bbox_inches='tight')
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare command stress runs (ground_station.py --stress results)')
+    parser.add_argument('results', nargs='+', help='Stress result files (e.g. logs/stress_<date>_with_tls.json and _no_tls.json)')
+    parser.add_argument('-o', '--output', help='Figure path (default: assets/stress_<first result>.png)')
+    args = parser.parse_args()
+
+    runs = []
+    for path in args.results:
+        label = os.path.splitext(os.path.basename(path))[0].replace("stress_", "")
+        with open(path, 'r') as f:
+            run = json.load(f)
+        print(f"\n--- {label} ---")
+        for r in run['levels']:
+            print(format_level(r))
+        knee = run.get('knee_rate')
+        print(f"Knee: {f'{knee:g} Hz' if knee is not None else 'not reached'}")
+        runs.append((label, run))
+
+    output = args.output or os.path.join(ASSETS_DIR, f"stress_{runs[0][0]}.png")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    plot_results(runs, output)
+    print(f"\nGraph saved to: {output}")
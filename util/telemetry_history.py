@@ -0,0 +1,126 @@
+import time
+from threading import Lock
+
+import numpy as np
+
+# Samples kept per field: 10 minutes at 5 Hz
+DEFAULT_CAPACITY = 3000
+
+# Numeric telemetry fields recorded per message type
+TELEMETRY_FIELDS = {
+    'position': ('lat', 'lon', 'alt', 'relative_alt', 'heading', 'vx', 'vy', 'vz'),
+    'attitude': ('roll', 'pitch', 'yaw', 'rollspeed', 'pitchspeed', 'yawspeed'),
+    'battery': ('battery_remaining', 'voltage', 'current'),
+}
+
+
+class RingBuffer:
+    """
+    Fixed-capacity time series backed by two preallocated NumPy arrays
+    (timestamps and values). append() is O(1) and never allocates; window
+    queries work on array slices instead of Python lists.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._t = np.zeros(capacity, dtype=np.float64)
+        self._v = np.zeros(capacity, dtype=np.float64)
+        self._next = 0   # Slot for the next sample
+        self._count = 0
+        self._lock = Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, value):
+        with self._lock:
+            self._t[self._next] = timestamp
+            self._v[self._next] = value
+            self._next = (self._next + 1) % self.capacity
+            if self._count < self.capacity:
+                self._count += 1
+
+    def last(self, n=None):
+        """The last `n` samples (all if None) in chronological order, as (timestamps, values)"""
+        with self._lock:
+            n = self._count if n is None else min(n, self._count)
+            start = (self._next - n) % self.capacity
+            if start + n <= self.capacity:
+                return self._t[start:start + n].copy(), self._v[start:start + n].copy()
+            idx = (start + np.arange(n)) % self.capacity
+            return self._t[idx], self._v[idx]
+
+    def latest(self):
+        """(timestamp, value) of the newest sample, or None"""
+        with self._lock:
+            if not self._count:
+                return None
+            i = (self._next - 1) % self.capacity
+            return self._t[i], self._v[i]
+
+    def window(self, seconds, now=None):
+        """Samples of the last `seconds` seconds, as (timestamps, values)"""
+        now = time.time() if now is None else now
+        t, v = self.last()
+        start = np.searchsorted(t, now - seconds, side='left')
+        return t[start:], v[start:]
+
+    def stats(self, seconds, now=None):
+        """{'min', 'max', 'mean', 'count'} over the window, None if empty"""
+        _, v = self.window(seconds, now)
+        if not len(v):
+            return None
+        return {'min': v.min(), 'max': v.max(), 'mean': v.mean(), 'count': len(v)}
+
+    def percentiles(self, q, seconds=None, now=None):
+        """Percentiles `q` of the values in the window (all samples if seconds is None), None if empty"""
+        _, v = self.last() if seconds is None else self.window(seconds, now)
+        if not len(v):
+            return None
+        return np.percentile(v, q)
+
+    def rate(self, seconds, now=None):
+        """Least-squares slope (units per second) over the window, None with fewer than 2 samples"""
+        t, v = self.window(seconds, now)
+        if len(t) < 2:
+            return None
+        t = t - t.mean()
+        denom = np.dot(t, t)
+        if denom == 0:
+            return None
+        return np.dot(t, v - v.mean()) / denom
+
+
+class TelemetryHistory:
+    """One RingBuffer per (vehicle, field), created on first use"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._buffers = {}
+        self._lock = Lock()
+
+    def buffer(self, vehicle_id, field):
+        key = (vehicle_id, field)
+        buf = self._buffers.get(key)
+        if buf is None:
+            with self._lock:
+                buf = self._buffers.setdefault(key, RingBuffer(self.capacity))
+        return buf
+
+    def record(self, vehicle_id, telemetry_data, timestamp):
+        """Append every numeric field of a decoded telemetry message"""
+        for field in TELEMETRY_FIELDS.get(telemetry_data.get('type'), ()):
+            value = telemetry_data.get(field)
+            if value is not None:
+                self.buffer(vehicle_id, field).append(timestamp, value)
+
+    def vehicles(self):
+        with self._lock:
+            keys = list(self._buffers)
+        return sorted({vehicle_id for vehicle_id, _ in keys})
+
+    def rate(self, vehicle_id, field, seconds, now=None):
+        return self.buffer(vehicle_id, field).rate(seconds, now)
+
+    def stats(self, vehicle_id, field, seconds, now=None):
+        return self.buffer(vehicle_id, field).stats(seconds, now)
@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_SEGMENT_BYTES = 1024 * 1024
+# Backlog replay: messages per second, sent in batches
+DEFAULT_FLUSH_RATE = 200.0
+DEFAULT_FLUSH_BATCH = 50
+# Replayed messages not confirmed within this delay are sent again from the cursor (seconds)
+DELIVERY_TIMEOUT = 30.0
+
+SEGMENT_FORMAT = "spool.{:08d}.jsonl"
+CURSOR_FILE = "cursor.json"
+
+
+class TelemetrySpool:
+    """
+    Bounded, disk-backed FIFO of encoded telemetry payloads.
+
+    Payloads are appended as lines to segment files (spool.<seq>.jsonl),
+    a new segment is started every `segment_bytes`. When the spool exceeds
+    `max_bytes` the oldest segment is dropped, so an outage longer than the
+    spool can hold keeps the most recent history. The read position is
+    saved in cursor.json, so whatever was not flushed survives a restart.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, segment_bytes=DEFAULT_SEGMENT_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.dropped = 0  # Messages lost to the size cap
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self._sizes = {}  # {seq: bytes}, oldest first
+        for name in sorted(os.listdir(directory)):
+            if name.startswith("spool.") and name.endswith(".jsonl"):
+                self._sizes[int(name.split(".")[1])] = os.path.getsize(os.path.join(directory, name))
+        if self._sizes:
+            self._repair_tail(max(self._sizes))
+        else:
+            self._sizes[0] = 0
+        self._write_seq = max(self._sizes)
+        self._write = open(self._path(self._write_seq), 'ab')
+        self._read_seq, self._read_offset = self._load_cursor()
+
+    def _path(self, seq):
+        return os.path.join(self.directory, SEGMENT_FORMAT.format(seq))
+
+    def _repair_tail(self, seq):
+        """Cut a line left half-written by a crash"""
+        path = self._path(seq)
+        with open(path, 'rb+') as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end != len(data):
+                f.truncate(end)
+        self._sizes[seq] = end
+
+    def _load_cursor(self):
+        first = min(self._sizes)
+        try:
+            with open(os.path.join(self.directory, CURSOR_FILE), 'r') as f:
+                cursor = json.load(f)
+        except (OSError, ValueError):
+            return first, 0
+        if cursor['segment'] < first or cursor['segment'] not in self._sizes:
+            return first, 0
+        return cursor['segment'], min(cursor['offset'], self._sizes[cursor['segment']])
+
+    def _save_cursor(self):
+        tmp = os.path.join(self.directory, CURSOR_FILE + ".tmp")
+        with open(tmp, 'w') as f:
+            json.dump({'segment': self._read_seq, 'offset': self._read_offset}, f)
+        os.replace(tmp, os.path.join(self.directory, CURSOR_FILE))
+
+    @property
+    def size(self):
+        return sum(self._sizes.values())
+
+    @property
+    def pending(self):
+        """True while some payload has not been flushed"""
+        with self._lock:
+            return self._read_seq != self._write_seq or self._read_offset < self._sizes[self._write_seq]
+
+    def append(self, payload):
+        data = payload.encode() + b"\n"
+        with self._lock:
+            if self._sizes[self._write_seq] and self._sizes[self._write_seq] + len(data) > self.segment_bytes:
+                self._write.close()
+                self._write_seq += 1
+                self._sizes[self._write_seq] = 0
+                self._write = open(self._path(self._write_seq), 'ab')
+            # Flushed to the OS, not fsync'ed: survives a process crash, not a power cut
+            self._write.write(data)
+            self._write.flush()
+            self._sizes[self._write_seq] += len(data)
+            while self.size > self.max_bytes and len(self._sizes) > 1:
+                self._drop_oldest()
+
+    def _drop_oldest(self):
+        seq = min(self._sizes)
+        path = self._path(seq)
+        if self._read_seq == seq:
+            with open(path, 'rb') as f:
+                f.seek(self._read_offset)
+                self.dropped += f.read().count(b"\n")
+            self._read_seq, self._read_offset = min(s for s in self._sizes if s != seq), 0
+        else:
+            with open(path, 'rb') as f:
+                self.dropped += f.read().count(b"\n")
+        del self._sizes[seq]
+        os.remove(path)
+
+    def read(self, max_messages, start=None):
+        """
+        Up to max_messages payloads as (payload, position after it), from the
+        cursor or from `start` (a position returned earlier, if its segment
+        is still there); nothing is removed until commit()
+        """
+        batch = []
+        with self._lock:
+            seq, offset = self._read_seq, self._read_offset
+            if start is not None and start[0] in self._sizes and start >= (seq, offset):
+                seq, offset = start
+            while len(batch) < max_messages:
+                if offset >= self._sizes[seq]:
+                    if seq == self._write_seq:
+                        break
+                    seq, offset = seq + 1, 0
+                    continue
+                with open(self._path(seq), 'rb') as f:
+                    f.seek(offset)
+                    while len(batch) < max_messages and offset < self._sizes[seq]:
+                        line = f.readline()
+                        offset += len(line)
+                        batch.append((line.rstrip(b"\n").decode(), (seq, offset)))
+        return batch
+
+    def commit(self, position):
+        """Everything up to `position` was delivered: move the cursor, delete the consumed segments"""
+        with self._lock:
+            seq, offset = position
+            if seq < self._read_seq or seq not in self._sizes:
+                return  # The segment was dropped meanwhile
+            self._read_seq, self._read_offset = seq, offset
+            for old in [s for s in self._sizes if s < seq]:
+                del self._sizes[old]
+                os.remove(self._path(old))
+            self._save_cursor()
+
+    def close(self):
+        with self._lock:
+            self._write.close()
+
+
+class SpoolFlusher:
+    """
+    Replays the spool in the background while the broker is reachable, at
+    most `rate` messages per second in batches, so live frames (published
+    directly) are never queued behind the backlog.
+
+    publish(payload, on_delivered) returns False when the message could not
+    be handed to the client; the batch then stops there and is retried
+    later. Being accepted by the client only means the message is queued,
+    so the cursor only moves once on_delivered() was called (the broker's
+    PUBACK at QoS 1) for a message and every message before it. At most
+    `batch_size` messages are awaiting delivery. When the connection drops,
+    or nothing was confirmed for DELIVERY_TIMEOUT, the unconfirmed messages
+    are sent again from the cursor: the backlog is delivered at least once.
+    """
+
+    def __init__(self, spool, publish, is_connected, rate=DEFAULT_FLUSH_RATE, batch_size=DEFAULT_FLUSH_BATCH,
+                 delivery_timeout=DELIVERY_TIMEOUT):
+        self.spool = spool
+        self.publish = publish
+        self.is_connected = is_connected
+        self.batch_size = batch_size
+        self.interval = batch_size / rate
+        self.delivery_timeout = delivery_timeout
+        self.flushed = 0  # Messages confirmed and committed
+        self.resent = 0   # Messages sent again after a disconnection or timeout
+        self._sent = deque()  # [position after the message, delivered, send time], in spool order
+        self._next = None     # Where the next read starts, None for the cursor
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+    def _delivered(self, entry):
+        with self._lock:
+            entry[1] = True
+
+    def commit_delivered(self):
+        """Move the cursor past the messages confirmed in order, return how many"""
+        position, count = None, 0
+        with self._lock:
+            while self._sent and self._sent[0][1]:
+                position = self._sent.popleft()[0]
+                count += 1
+        if position:
+            self.spool.commit(position)
+        self.flushed += count
+        return count
+
+    def reset(self):
+        """Forget the unconfirmed messages, the next batch starts again from the cursor"""
+        self.commit_delivered()
+        with self._lock:
+            self.resent += len(self._sent)
+            self._sent.clear()
+            self._next = None
+
+    def flush_batch(self, now=None):
+        """Commit what was confirmed, then send up to one batch; return the number of messages sent"""
+        now = time.monotonic() if now is None else now
+        self.commit_delivered()
+        with self._lock:
+            stalled = bool(self._sent) and now - self._sent[0][2] >= self.delivery_timeout
+            room, start = self.batch_size - len(self._sent), self._next
+        if stalled:
+            self.reset()
+            return 0
+        if room <= 0:
+            return 0
+        sent = 0
+        for payload, after in self.spool.read(room, start):
+            entry = [after, False, now]
+            with self._lock:
+                self._sent.append(entry)
+            if not self.publish(payload, lambda entry=entry: self._delivered(entry)):
+                with self._lock:
+                    if self._sent and self._sent[-1] is entry:
+                        self._sent.pop()
+                break
+            with self._lock:
+                self._next = after
+            sent += 1
+        return sent
+
+    def _loop(self):
+        was_pending = False
+        while self._running:
+            pending = self.spool.pending
+            connected = self.is_connected()
+            if not connected and self._sent:
+                # Whatever paho still held is not confirmed, replay it after reconnecting
+                self.reset()
+            if pending and connected:
+                if not was_pending:
+                    logging.getLogger(__name__).info(f"Flushing telemetry backlog ({self.spool.size} bytes)")
+                self.flush_batch()
+            elif was_pending and not pending:
+                logging.getLogger(__name__).info(f"Telemetry backlog flushed, {self.flushed} messages so far, {self.spool.dropped} dropped")
+            was_pending = pending
+            time.sleep(self.interval)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
@@ -0,0 +1,66 @@
+import os
+import re
+import datetime
+
+# Default directory where both endpoints write their timing logs
+LOG_DIR = "logs"
+
+# Regex to capture:
+# Group 1: Event type (e.g., DRONE-SEND, GS-RECV)
+# Group 2: Message ID
+# Group 3: Message type (e.g., position, velocity)
+# Group 4: Timestamp (epoch seconds)
+EVENT_PATTERN = re.compile(
+    r"^\S+\s+\S+\s+-\s+(DRONE-SEND|GS-SEND|DRONE-RECV|GS-RECV):\s+"
+    r"Message ID ([\w-]+)\s+type\s+(\w+)\s+(?:sent|received) at ([\d.]+)"
+)
+
+
+def timing_log_path(use_tls, date=None, log_dir=LOG_DIR):
+    """Return the path of the timing log written by drone_mqtt.py / ground_station.py"""
+    if date is None:
+        date = datetime.datetime.now().strftime("%Y-%m-%d")
+    tls_suffix = "with_tls" if use_tls else "no_tls"
+    return os.path.join(log_dir, f"mqtt_timing_{date}_{tls_suffix}.log")
+
+
+def parse_event(line):
+    """
+    Parse a single SEND/RECV line of the timing log.
+    Returns (event_type, msg_id, msg_type, timestamp) or None if the line is not a timing event.
+    """
+    match = EVENT_PATTERN.search(line)
+    if not match:
+        return None
+    event_type, msg_id, msg_type, timestamp_str = match.groups()
+    return event_type, msg_id, msg_type, float(timestamp_str)
+
+
+# Per-message stage timestamps, e.g.
+# DRONE-STAGES: Message ID <id> type position mavlink_recv=<ts> encode_done=<ts> publish_done=<ts>
+STAGES_PATTERN = re.compile(
+    r"^\S+\s+\S+\s+-\s+(DRONE|GS)-STAGES:\s+"
+    r"Message ID ([\w-]+)\s+type\s+(\w+)\s+(.*)$"
+)
+
+
+def format_stages(source, message_id, message_type, stages):
+    """Build the STAGES line for a message, `stages` maps stage name -> epoch seconds"""
+    fields = " ".join(f"{name}={timestamp:.6f}" for name, timestamp in stages.items())
+    return f"{source}-STAGES: Message ID {message_id} type {message_type} {fields}"
+
+
+def parse_stages(line):
+    """
+    Parse a STAGES line of the timing log.
+    Returns (source, msg_id, msg_type, {stage: timestamp}) or None.
+    """
+    match = STAGES_PATTERN.search(line)
+    if not match:
+        return None
+    source, msg_id, msg_type, fields = match.groups()
+    stages = {}
+    for field in fields.split():
+        name, _, value = field.partition("=")
+        stages[name] = float(value)
+    return source, msg_id, msg_type, stages
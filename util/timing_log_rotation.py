@@ -0,0 +1,278 @@
+import os
+import glob
+import gzip
+import json
+import time
+import heapq
+import logging
+import argparse
+import datetime
+import threading
+
+# Rotate the active segment when it reaches this size (bytes) or age (seconds)
+MAX_BYTES = 16 * 1024 * 1024
+MAX_AGE = 3600
+# Lines per independently decompressible gzip block of a compressed segment
+BLOCK_LINES = 2000
+
+ASCTIME_FORMAT = "%Y-%m-%d %H:%M:%S,%f"
+WINDOW_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def segment_dir(text_log_path):
+    """Directory holding the rotated segments of a timing log, e.g. logs/mqtt_timing_<date>_<tls>/"""
+    return os.path.splitext(text_log_path)[0]
+
+
+def line_time(line):
+    """Epoch seconds of the asctime prefix of a timing log line, None if it has none"""
+    try:
+        return datetime.datetime.strptime(line[:23], ASCTIME_FORMAT).timestamp()
+    except ValueError:
+        return None
+
+
+def _block_range(lines):
+    times = [t for t in (line_time(lines[0]), line_time(lines[-1])) if t is not None]
+    if not times:
+        times = [t for t in map(line_time, lines) if t is not None] or [0.0]
+    return min(times), max(times)
+
+
+def compress_segment(plain_path, index_path, index_lock):
+    """
+    Compress a closed segment into a sequence of gzip members of BLOCK_LINES
+    lines each, and append one index entry per member. Every member is a
+    complete gzip stream, so a reader can seek to its offset and decompress
+    only the blocks overlapping the time window it needs.
+    """
+    gz_path = plain_path + ".gz"
+    segment = os.path.basename(gz_path)
+    entries = []
+
+    with open(plain_path, 'r') as src, open(gz_path, 'wb') as dst:
+        block = []
+
+        def write_block():
+            start, end = _block_range(block)
+            data = gzip.compress("".join(block).encode())
+            entries.append({
+                'segment': segment,
+                'offset': dst.tell(),
+                'length': len(data),
+                'start': start,
+                'end': end,
+                'lines': len(block)
+            })
+            dst.write(data)
+
+        for line in src:
+            block.append(line)
+            if len(block) >= BLOCK_LINES:
+                write_block()
+                block = []
+        if block:
+            write_block()
+
+    with index_lock:
+        with open(index_path, 'a') as index:
+            for entry in entries:
+                index.write(json.dumps(entry) + "\n")
+    os.remove(plain_path)
+
+
+class RotatingTimingLogHandler(logging.Handler):
+    """
+    Logging handler writing the timing log of one process into its own
+    segment files: <directory>/<component>.<seq>.log. When the active
+    segment exceeds `max_bytes` or `max_age` seconds it is closed and
+    compressed in a background thread, so emit() never waits on gzip.
+    """
+
+    def __init__(self, directory, component, max_bytes=MAX_BYTES, max_age=MAX_AGE):
+        super().__init__()
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.component = component
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.index_path = os.path.join(directory, f"{component}.index.jsonl")
+        self._index_lock = threading.Lock()
+        self._compress_threads = []
+        self._stream = None
+
+        self._recover()
+        self._seq = self._next_sequence()
+        self._open_segment()
+
+    def _segment_path(self, seq):
+        return os.path.join(self.directory, f"{self.component}.{seq:05d}.log")
+
+    def _next_sequence(self):
+        pattern = os.path.join(self.directory, f"{self.component}.*.log*")
+        seqs = [int(os.path.basename(p).split('.')[1]) for p in glob.glob(pattern)]
+        return max(seqs) + 1 if seqs else 0
+
+    def _recover(self):
+        """Compress plain segments left behind by a previous run that did not shut down cleanly"""
+        indexed = {entry['segment'] for entry in read_index(self.index_path)}
+        for plain_path in sorted(glob.glob(os.path.join(self.directory, f"{self.component}.*.log"))):
+            if os.path.basename(plain_path) + ".gz" in indexed:
+                os.remove(plain_path)
+                continue
+            if os.path.getsize(plain_path) == 0:
+                os.remove(plain_path)
+                continue
+            compress_segment(plain_path, self.index_path, self._index_lock)
+
+    def _open_segment(self):
+        self._path = self._segment_path(self._seq)
+        self._stream = open(self._path, 'a')
+        self._size = 0
+        self._opened_at = time.monotonic()
+
+    def _close_segment(self, background=True):
+        self._stream.close()
+        self._stream = None
+        if self._size == 0:
+            os.remove(self._path)
+            return
+        if background:
+            thread = threading.Thread(
+                target=compress_segment,
+                args=(self._path, self.index_path, self._index_lock),
+                name=f"compress-{os.path.basename(self._path)}"
+            )
+            thread.start()
+            self._compress_threads = [t for t in self._compress_threads if t.is_alive()] + [thread]
+        else:
+            compress_segment(self._path, self.index_path, self._index_lock)
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + "\n"
+            if self._size and (self._size + len(msg) > self.max_bytes
+                               or time.monotonic() - self._opened_at >= self.max_age):
+                self._close_segment()
+                self._seq += 1
+                self._open_segment()
+            self._stream.write(msg)
+            self._stream.flush()
+            self._size += len(msg)
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        self.acquire()
+        try:
+            if self._stream:
+                self._close_segment(background=False)
+            for thread in self._compress_threads:
+                thread.join()
+            self._compress_threads = []
+        finally:
+            self.release()
+        super().close()
+
+
+def read_index(index_path):
+    if not os.path.exists(index_path):
+        return []
+    with open(index_path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _filter_lines(lines, start, end):
+    """Yield (time, line) for lines inside [start, end]; lines without a timestamp inherit the previous one"""
+    last_time = None
+    for line in lines:
+        t = line_time(line)
+        if t is None:
+            t = last_time
+        else:
+            last_time = t
+        if t is None or t < start:
+            continue
+        if t > end:
+            break
+        yield t, line
+
+
+def _iter_blocks(directory, entries, start, end):
+    for entry in sorted(entries, key=lambda e: (e['segment'], e['offset'])):
+        if entry['end'] < start or entry['start'] > end:
+            continue
+        with open(os.path.join(directory, entry['segment']), 'rb') as f:
+            f.seek(entry['offset'])
+            data = gzip.decompress(f.read(entry['length'])).decode()
+        yield from _filter_lines(data.splitlines(keepends=True), start, end)
+
+
+def _iter_component(directory, component, start, end):
+    """
+    Compressed blocks, then the plain segments. compress_segment() indexes
+    a segment before removing its plain file, so a plain segment whose
+    blocks were already read is skipped; one removed after the index was
+    read is taken from the index again.
+    """
+    index_path = os.path.join(directory, f"{component}.index.jsonl")
+    index = read_index(index_path)
+    indexed = {entry['segment'] for entry in index}
+    yield from _iter_blocks(directory, index, start, end)
+
+    plain_paths = sorted(glob.glob(os.path.join(directory, f"{component}.*.log")))
+    listed = {os.path.basename(path) + ".gz" for path in plain_paths}
+    # Compressed, indexed and removed between the index read and the listing
+    yield from _iter_blocks(directory, [entry for entry in read_index(index_path)
+                                        if entry['segment'] not in indexed and entry['segment'] not in listed], start, end)
+
+    # Active segments, and closed ones still being compressed
+    for plain_path in plain_paths:
+        segment = os.path.basename(plain_path) + ".gz"
+        if segment in indexed:
+            continue
+        try:
+            f = open(plain_path, 'r')
+        except FileNotFoundError:
+            # Compressed and indexed since the index was read
+            entries = [entry for entry in read_index(index_path) if entry['segment'] == segment]
+            yield from _iter_blocks(directory, entries, start, end)
+            continue
+        with f:
+            yield from _filter_lines(f, start, end)
+
+
+def iter_window(directory, start=None, end=None):
+    """
+    Yield the timing log lines of all processes between `start` and `end`
+    (epoch seconds, None for unbounded), merged in time order. Only the
+    compressed blocks whose range overlaps the window are decompressed.
+    """
+    start = float('-inf') if start is None else start
+    end = float('inf') if end is None else end
+    components = {os.path.basename(p).split('.')[0] for p in glob.glob(os.path.join(directory, "*.*"))}
+    streams = [_iter_component(directory, c, start, end) for c in sorted(components)]
+    for _, line in heapq.merge(*streams, key=lambda item: item[0]):
+        yield line
+
+
+def _parse_window_time(value):
+    if value is None:
+        return None
+    return datetime.datetime.strptime(value, WINDOW_TIME_FORMAT).timestamp()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Extract a time window from rotated timing logs')
+    parser.add_argument('directory', help='Segment directory, e.g. logs/mqtt_timing_2025-06-05_with_tls')
+    parser.add_argument('--start', help=f'Window start ("{WINDOW_TIME_FORMAT}", local time)')
+    parser.add_argument('--end', help=f'Window end ("{WINDOW_TIME_FORMAT}", local time)')
+    parser.add_argument('-o', '--output', required=True, help='Text timing log to write, readable by the graph scripts')
+    args = parser.parse_args()
+
+    count = 0
+    with open(args.output, 'w') as out:
+        for line in iter_window(args.directory, _parse_window_time(args.start), _parse_window_time(args.end)):
+            out.write(line if line.endswith("\n") else line + "\n")
+            count += 1
+    print(f"Extracted {count} lines to {args.output}")
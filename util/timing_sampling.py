@@ -0,0 +1,85 @@
+import time
+import zlib
+import argparse
+
+# Payload key carrying the sender's sampling decision
+TIMED_KEY = 'timed'
+
+MODES = ('all', 'ratio', 'rate', 'commands')
+
+
+class SamplingPolicy:
+    """
+    Decides which messages get timing instrumentation.
+
+    Modes (as given on the command line with --timing-sample):
+        all         every message is timed (default)
+        ratio:N     1 message in N, chosen by a hash of the message ID
+        rate:R      at most R timed messages per second for each message type
+        commands:N  commands always, telemetry 1 in N by message ID hash
+
+    The sender takes the decision once per message ID and stores it in the
+    payload under TIMED_KEY, so both endpoints time exactly the same messages
+    and SEND/RECV pairs still match in the analysers.
+    """
+
+    def __init__(self, mode='all', value=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown timing sampling mode: {mode}")
+        if mode != 'all' and (value is None or value <= 0):
+            raise ValueError(f"Timing sampling mode {mode} needs a positive value")
+        self.mode = mode
+        self.value = value
+        self._last_timed = {}  # {message type: time of last timed message}, rate mode only
+
+    @classmethod
+    def parse(cls, spec):
+        """Build a policy from 'all', 'ratio:N', 'rate:R' or 'commands:N'"""
+        mode, _, value = spec.partition(':')
+        if mode == 'all':
+            return cls()
+        try:
+            if mode not in MODES:
+                raise ValueError(f"unknown mode {mode}")
+            return cls(mode, float(value) if mode == 'rate' else int(value))
+        except ValueError as e:
+            raise ValueError(f"invalid timing sampling policy {spec!r} ({e}), expected all, ratio:N, rate:R or commands:N") from None
+
+    @property
+    def enabled(self):
+        return self.mode != 'all'
+
+    def _hash_sampled(self, message_id):
+        return zlib.crc32(message_id.encode()) % self.value == 0
+
+    def should_time(self, message_id, message_type, is_command=False):
+        if self.mode == 'all':
+            return True
+        if self.mode == 'ratio':
+            return self._hash_sampled(message_id)
+        if self.mode == 'commands':
+            return is_command or self._hash_sampled(message_id)
+        # rate
+        now = time.monotonic()
+        last = self._last_timed.get(message_type)
+        if last is not None and now - last < 1.0 / self.value:
+            return False
+        self._last_timed[message_type] = now
+        return True
+
+    def __str__(self):
+        return self.mode if self.mode == 'all' else f"{self.mode}:{self.value:g}"
+
+
+def sampling_spec(spec):
+    """argparse type of --timing-sample: the spec unchanged once it parses"""
+    try:
+        SamplingPolicy.parse(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return spec
+
+
+def is_timed(payload):
+    """Receiver side: follow the sender's decision, messages without it are always timed"""
+    return bool(payload.get(TIMED_KEY, 1))
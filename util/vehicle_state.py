@@ -0,0 +1,94 @@
+import time
+import threading
+
+from pymavlink import mavutil
+
+# Without a HEARTBEAT for this long the mirror is not trusted to skip a transition (seconds)
+STALE_AFTER = 3.0
+
+
+class VehicleState:
+    """
+    Mirror of the vehicle state, updated by the telemetry loop from HEARTBEAT
+    (flight mode, armed flag, system status) and SYS_STATUS (sensor health,
+    battery, load). Command handlers consult it to skip transitions that are
+    already in effect, e.g. switching to GUIDED when the vehicle is in GUIDED.
+
+    A confirmed transition is applied with assume() right away, so a second
+    command does not have to wait for the next 1 Hz HEARTBEAT to see it.
+    """
+
+    def __init__(self, stale_after=STALE_AFTER):
+        self.stale_after = stale_after
+        self.target_system = None
+        self.custom_mode = None
+        self.armed = None
+        self.system_status = None
+        self.last_heartbeat = 0.0
+        self.sensors_health = None
+        self.voltage = None           # V
+        self.battery_remaining = None  # %
+        self.load = None              # % of the main loop time
+        self.last_sys_status = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, msg):
+        """
+        Called by the reader for every received message. Returns True for a
+        vehicle HEARTBEAT arriving after the mirror went stale (link restored
+        or vehicle rebooted), when its settings may have to be applied again.
+        """
+        msg_type = msg.get_type()
+        if msg_type == 'HEARTBEAT':
+            if msg.type == mavutil.mavlink.MAV_TYPE_GCS:
+                return False
+            if self.target_system is not None and msg.get_srcSystem() != self.target_system:
+                return False
+            resumed = bool(self.last_heartbeat) and not self.fresh
+            with self._lock:
+                self.custom_mode = msg.custom_mode
+                self.armed = bool(msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED)
+                self.system_status = msg.system_status
+                self.last_heartbeat = time.time()
+            return resumed
+        if msg_type == 'SYS_STATUS':
+            with self._lock:
+                self.sensors_health = msg.onboard_control_sensors_health
+                self.voltage = msg.voltage_battery / 1000.0
+                self.battery_remaining = msg.battery_remaining
+                self.load = msg.load / 10.0
+                self.last_sys_status = time.time()
+        return False
+
+    @property
+    def fresh(self):
+        return time.time() - self.last_heartbeat < self.stale_after
+
+    def in_mode(self, custom_mode):
+        with self._lock:
+            return self.fresh and self.custom_mode == custom_mode
+
+    def is_armed(self, armed=True):
+        with self._lock:
+            return self.fresh and self.armed is not None and self.armed == armed
+
+    def assume(self, custom_mode=None, armed=None):
+        """Apply a transition the vehicle just confirmed, until the next HEARTBEAT reports it"""
+        with self._lock:
+            if custom_mode is not None:
+                self.custom_mode = custom_mode
+            if armed is not None:
+                self.armed = armed
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'custom_mode': self.custom_mode,
+                'armed': self.armed,
+                'system_status': self.system_status,
+                'heartbeat_age': time.time() - self.last_heartbeat if self.last_heartbeat else None,
+                'sensors_health': self.sensors_health,
+                'voltage': self.voltage,
+                'battery_remaining': self.battery_remaining,
+                'load': self.load,
+            }
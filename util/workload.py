@@ -0,0 +1,138 @@
+import json
+import time
+
+# Sleep until this close to a deadline, then spin for the remainder (seconds)
+SPIN_THRESHOLD = 0.001
+
+
+def load_workload(path):
+    """
+    Load a workload file (JSON, or YAML if PyYAML is installed).
+
+    A workload is {"name": ..., "steps": [...]} where each step is one of:
+        {"wait": seconds}
+        {"command": {...}, "type": "velocity_forward", "repeat": N, "rate": Hz,
+         "vertical_movement": bool, "log": "text"}
+        {"repeat": N, "steps": [...]}   (group repeated N times)
+        {"profile": {...}}              (live settings for the drone bridge)
+    A command step lasts repeat / rate seconds (0 if no rate is given), a
+    profile step is sent at its offset and takes no time.
+    """
+    with open(path, 'r') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("PyYAML is required for YAML workloads, use JSON or pip install pyyaml")
+            workload = yaml.safe_load(f)
+        else:
+            workload = json.load(f)
+    validate_steps(workload.get('steps'), path)
+    return workload
+
+
+def _check_repeat(step, where, i):
+    repeat = step.get('repeat', 1)
+    if isinstance(repeat, bool) or not isinstance(repeat, int) or repeat < 1:
+        raise ValueError(f"{where}: step {i}: repeat must be an integer >= 1")
+
+
+def validate_steps(steps, where):
+    if not isinstance(steps, list):
+        raise ValueError(f"{where}: 'steps' must be a list")
+    for i, step in enumerate(steps):
+        if 'wait' in step:
+            if step['wait'] < 0:
+                raise ValueError(f"{where}: step {i}: negative wait")
+        elif 'command' in step:
+            _check_repeat(step, where, i)
+            if 'rate' in step and step['rate'] <= 0:
+                raise ValueError(f"{where}: step {i}: rate must be > 0")
+        elif 'steps' in step:
+            _check_repeat(step, where, i)
+            validate_steps(step['steps'], f"{where}: group {i}")
+        elif 'profile' in step:
+            if not isinstance(step['profile'], dict):
+                raise ValueError(f"{where}: step {i}: profile must be an object of settings")
+        else:
+            raise ValueError(f"{where}: step {i}: expected 'wait', 'command', 'profile' or 'steps'")
+
+
+def schedule(steps, start=0.0):
+    """
+    Yield (offset, step, index) for every command to send, with offsets in
+    seconds from the start of the run, and return the total duration.
+    Offsets are computed as start + i / rate, never by accumulating sleeps,
+    so rounding does not add up over long runs.
+    """
+    offset = start
+    for step in steps:
+        if 'wait' in step:
+            offset += step['wait']
+        elif 'command' in step:
+            repeat = step.get('repeat', 1)
+            rate = step.get('rate')
+            for i in range(repeat):
+                yield offset + (i / rate if rate else 0.0), step, i
+            if rate:
+                offset += repeat / rate
+        elif 'profile' in step:
+            yield offset, step, 0
+        else:
+            for _ in range(step.get('repeat', 1)):
+                offset = yield from schedule(step['steps'], offset)
+    return offset
+
+
+class WorkloadScheduler:
+    """
+    Runs a workload against absolute monotonic deadlines. The time spent
+    publishing and logging a command does not delay the following ones, so
+    pacing stays exact at 1 Hz or 100 Hz. Records how late every command was
+    released (jitter) and reports it at the end.
+    """
+
+    def __init__(self, spin_threshold=SPIN_THRESHOLD):
+        self.spin_threshold = spin_threshold
+        self.lateness = []
+
+    def _wait_until(self, deadline):
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if remaining > self.spin_threshold:
+                time.sleep(remaining - self.spin_threshold)
+
+    def run(self, workload, execute, should_stop=None):
+        """Call execute(step, index) for every command at its deadline, return the jitter report"""
+        self.lateness = []
+        t0 = time.monotonic()
+        for offset, step, index in schedule(workload['steps']):
+            if should_stop and should_stop():
+                break
+            deadline = t0 + offset
+            self._wait_until(deadline)
+            self.lateness.append(time.monotonic() - deadline)
+            execute(step, index)
+        return self.report()
+
+    def report(self):
+        if not self.lateness:
+            return None
+        values = sorted(v * 1000 for v in self.lateness)
+        n = len(values)
+        return {
+            'count': n,
+            'mean_ms': sum(values) / n,
+            'p50_ms': values[n // 2],
+            'p99_ms': values[min(n - 1, int(n * 0.99))],
+            'max_ms': values[-1],
+        }
+
+
+def format_report(report):
+    if report is None:
+        return "no commands executed"
+    return (f"{report['count']} commands, lateness mean {report['mean_ms']:.3f}ms, "
+            f"p50 {report['p50_ms']:.3f}ms, p99 {report['p99_ms']:.3f}ms, max {report['max_ms']:.3f}ms")